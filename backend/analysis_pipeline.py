@@ -0,0 +1,153 @@
+import os
+
+from sqlalchemy import insert
+
+from database import SessionLocal
+from file_processor import process_lease_features, process_lease_file
+import instrumentation
+import lease_registry
+import lease_zones
+from models import LeaseResult, Pit
+from phase1_detection import run_unified_detection
+from progress import ProgressTracker
+import pit_vectors
+import result_cache
+
+# --- CONFIGURATION ---
+# Get public URL from environment or default to localhost
+API_PUBLIC_URL = os.getenv("API_PUBLIC_URL", "http://localhost:8000")
+UPLOAD_DIR = "static/uploads"
+OUTPUT_DIR = "static/outputs"
+# The API builds artifacts on first download (see artifact_store.py)
+ARTIFACT_MODE = os.getenv("ARTIFACT_MODE", "lazy")
+
+
+def artifact_url(job_id, artifact_name):
+    """Public URL of a job artifact, or None when it was not generated."""
+    if not artifact_name:
+        return None
+    return f"{API_PUBLIC_URL}/static/outputs/{job_id}/{artifact_name}"
+
+
+def save_lease_results(db, job_id, lease_results, leases):
+    """One lease_results row per lease, linked to the job's inspection."""
+    geometries = {lease["lease_id"]: lease["geometry"] for lease in leases}
+    db.add_all([
+        LeaseResult(job_id=job_id, geometry=pit_vectors.to_db_geometry(geometries.get(row["lease_id"])), **row)
+        for row in lease_results
+    ])
+    db.commit()
+
+
+def save_pits(db, job_id, pits):
+    """The job's pit inventory, one pits row each (one bulk INSERT)."""
+    if not pits:
+        return
+    db.execute(insert(Pit), [
+        {"job_id": job_id, **{k: v for k, v in pit.items() if k != "centroid"},
+         "centroid": "SRID=4326;POINT({} {})".format(*pit["centroid"])}
+        for pit in pits
+    ])
+    db.commit()
+
+
+def run_analysis(job_id, file_path, user_filename, start_date, end_date, progress=None,
+                 per_lease=False, lease_id_field=None):
+    """
+    The full /api/analyze pipeline for one uploaded lease file. Runs on a job
+    worker thread and returns the Inspection fields to save for the job.
+    Stage events (with timings) are reported through `progress`.
+    With `per_lease`, every feature of the file is scored as its own lease
+    (results in result["leases"] and the lease_results table).
+    Hot-path timings of the job (see instrumentation.py) go in result["timings"].
+    """
+    with instrumentation.job_timings() as timings:
+        fields = _analyze(job_id, file_path, user_filename, start_date, end_date, progress,
+                          per_lease, lease_id_field)
+    fields["result"]["timings"] = timings.timings
+    return fields
+
+
+def _analyze(job_id, file_path, user_filename, start_date, end_date, progress, per_lease, lease_id_field):
+    progress = progress or ProgressTracker()
+    print(f"📥 Processing Job: {job_id} | File: {user_filename}")
+
+    # 1. Process File
+    lease_report = {}
+    leases = None
+    with instrumentation.timer("ingest_seconds", kind="features" if per_lease else "union"):
+        if per_lease:
+            leases = process_lease_features(file_path, id_field=lease_id_field)
+            lease_geojson = lease_zones.lease_union(leases) if leases else None
+        else:
+            lease_geojson = process_lease_file(file_path, report=lease_report)
+    progress.stage("file_parsed", lease_found=lease_geojson is not None, simplification=lease_report or None,
+                   **({"leases": len(leases or [])} if per_lease else {}))
+
+    # 2. Run AI Engine (or reuse a cached result for the same lease + parameters)
+    job_output_dir = os.path.join(OUTPUT_DIR, job_id)
+    key = result_cache.cache_key(lease_geojson, start_date, end_date, leases=leases)
+
+    db = SessionLocal()
+    try:
+        cached = result_cache.lookup(db, key)
+        if cached:
+            print(f"⚡ Cache hit for job {job_id} (source job {cached.job_id})")
+            result = result_cache.materialize(cached, job_output_dir)
+            progress.stage("metrics", metrics=result["metrics"], cache="hit")
+        else:
+            result = run_unified_detection(
+                lease_geojson,
+                filename=user_filename,
+                output_dir=job_output_dir,
+                start_date=start_date,
+                end_date=end_date,
+                progress=progress,
+                artifact_mode=ARTIFACT_MODE,
+                leases=leases
+            )
+            result_cache.store(db, key, job_id, result, job_output_dir)
+            result["cache"] = {"status": "miss"}
+        if leases and result.get("leases"):
+            save_lease_results(db, job_id, result["leases"], leases)
+        save_pits(db, job_id, result.get("pits"))
+    finally:
+        db.close()
+
+    # 3. Legality of every pit against all registered leases (not just this upload)
+    registry = lease_registry.get_registry(SessionLocal)
+    if len(registry):
+        result["legality"] = lease_registry.classify_pits(registry, result.get("vectors"), lease_geojson)
+        progress.stage("legality", **result["legality"]["area_m2"])
+
+    metrics = result["metrics"]
+    artifacts = result.get("artifacts", {})
+    # Pit polygons go to the geometry columns, not the JSON result
+    vectors = result.pop("vectors", None) or {}
+
+    # 4. Construct URLs using the dynamic API_PUBLIC_URL
+    # (the local backend may not produce every artifact)
+    urls = {
+        "report": artifact_url(job_id, artifacts.get('report_url')),
+        "map": artifact_url(job_id, artifacts.get('map_url')),
+        "3d_model": artifact_url(job_id, artifacts.get('model_url'))
+    }
+    result["job_id"] = job_id
+    result["lease_simplification"] = lease_report or None
+    result["urls"] = urls
+    result["stages"] = list(progress.stages)
+
+    # 5. Fields saved on the Inspection row by the job store
+    return {
+        "illegal_area_m2": metrics["illegal_area_m2"],
+        "volume_m3": metrics["volume_m3"],
+        "avg_depth_m": metrics["avg_depth_m"],
+        "truckloads": metrics["truckloads"],
+        "status": result["status"],
+        "report_url": urls["report"],
+        "map_url": urls["map"],
+        "model_url": urls["3d_model"],
+        "geometry": pit_vectors.to_db_geometry(vectors.get("illegal")),
+        "legal_geometry": pit_vectors.to_db_geometry(vectors.get("legal")),
+        "result": result
+    }
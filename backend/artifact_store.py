@@ -0,0 +1,150 @@
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from phase1_detection import ARTIFACT_FILES, ARTIFACT_INPUTS_FILE, build_artifact
+
+# --- CONFIGURATION ---
+OUTPUT_DIR = "static/outputs"
+CAS_DIR = "static/cas"              # Content-addressed blobs: cas/<2 hex>/<sha256>.gz
+MANIFEST_FILE = "artifacts.json"    # Per job: artifact name -> digest / size / created
+
+LAZY_ARTIFACTS = frozenset(ARTIFACT_FILES.values())
+
+# Striped locks: a fixed number, shared by hash, however many jobs the server sees.
+# Builds and manifest updates use separate stripes (a build updates the manifest).
+LOCK_STRIPES = 64
+_build_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+_manifest_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+
+class ArtifactNotFound(Exception):
+    """The job or artifact does not exist, or cannot be built for this job."""
+
+
+def blob_path(digest):
+    return os.path.join(CAS_DIR, digest[:2], f"{digest}.gz")
+
+
+def put_file(path):
+    """
+    Stores a file in the CAS (gzip-compressed) and returns its sha256 digest.
+    Identical outputs from different jobs map to the same blob.
+    """
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    target = blob_path(digest)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+        with os.fdopen(fd, "wb") as raw, open(path, "rb") as src:
+            with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) as gz:
+                shutil.copyfileobj(src, gz)
+        os.replace(tmp, target)  # Atomic: concurrent writers of the same blob are harmless
+    return digest
+
+
+def _job_dir(job_id):
+    # job IDs are uuid prefixes; refuse anything that could escape OUTPUT_DIR
+    if not job_id or os.path.basename(job_id) != job_id or job_id in (".", ".."):
+        raise ArtifactNotFound(job_id)
+    return os.path.join(OUTPUT_DIR, job_id)
+
+
+def _read_manifest(job_dir):
+    path = os.path.join(job_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(job_dir, manifest):
+    fd, tmp = tempfile.mkstemp(dir=job_dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(job_dir, MANIFEST_FILE))
+
+
+def _lock_for(job_id, name):
+    return _build_locks[hash((job_id, name)) % LOCK_STRIPES]
+
+
+def _record(job_dir, name, source_path):
+    digest = put_file(source_path)
+    entry = {
+        "digest": digest,
+        "size": os.path.getsize(source_path),
+        "created": datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
+    }
+    # Builds of different artifacts of one job run concurrently: serialize the manifest update
+    with _manifest_locks[hash(job_dir) % LOCK_STRIPES]:
+        manifest = _read_manifest(job_dir)
+        manifest[name] = entry
+        _write_manifest(job_dir, manifest)
+    return entry
+
+
+def get_or_build(job_id, name):
+    """
+    Returns the manifest entry of a job artifact, building it on first request.
+    Eagerly generated files are moved into the CAS the first time they are served.
+    """
+    if name not in LAZY_ARTIFACTS:
+        raise ArtifactNotFound(name)
+    job_dir = _job_dir(job_id)
+    if not os.path.isdir(job_dir):
+        raise ArtifactNotFound(job_id)
+
+    entry = _read_manifest(job_dir).get(name)
+    if entry:
+        return entry
+
+    with _lock_for(job_id, name):
+        entry = _read_manifest(job_dir).get(name)
+        if entry:
+            return entry
+
+        # 1. Built eagerly during the run: just ingest it
+        eager_path = os.path.join(job_dir, name)
+        if os.path.exists(eager_path):
+            entry = _record(job_dir, name, eager_path)
+            os.remove(eager_path)
+            return entry
+
+        # 2. Build from the persisted intermediate inputs
+        inputs_path = os.path.join(job_dir, ARTIFACT_INPUTS_FILE)
+        if not os.path.exists(inputs_path):
+            raise ArtifactNotFound(f"{job_id}/{name}")
+        with open(inputs_path) as f:
+            inputs = json.load(f)
+
+        print(f"🛠️ Building {name} for job {job_id} on demand...")
+        with tempfile.TemporaryDirectory(dir=job_dir) as tmp_dir:
+            output_path = os.path.join(tmp_dir, name)
+            try:
+                build_artifact(name, inputs, output_path)
+            except ValueError as e:
+                raise ArtifactNotFound(str(e))
+            if not os.path.exists(output_path):
+                raise ArtifactNotFound(f"{job_id}/{name} could not be generated")
+            # Files written next to it (the 3D model's manifest and meshes) are served as is
+            for extra in os.listdir(tmp_dir):
+                if extra != name:
+                    os.replace(os.path.join(tmp_dir, extra), os.path.join(job_dir, extra))
+            return _record(job_dir, name, output_path)
+
+
+def read_blob(entry):
+    """Uncompressed bytes, for the rare client without gzip support."""
+    with gzip.open(blob_path(entry["digest"]), "rb") as f:
+        return f.read()
@@ -0,0 +1,211 @@
+import csv
+import datetime
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from checkpoints import append_record, load_checkpoint, write_json
+from file_processor import HAS_ARROW, process_lease_file
+from phase1_detection import DEFAULT_END, DEFAULT_START, DETECTION_BACKEND, DETECTION_BACKENDS, run_unified_detection
+
+# --- CONFIGURATION ---
+BATCH_DIR = os.getenv("BATCH_DIR", "static/batches")
+BATCH_INGEST_WORKERS = int(os.getenv("BATCH_INGEST_WORKERS", "4"))    # Files read at once
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "2"))                  # Detections at once
+LEASE_EXTENSIONS = (".zip", ".kml", ".geojson", ".json")
+
+# Files in each batch's directory
+MANIFEST_FILE = "manifest.json"
+CHECKPOINT_FILE = "leases.jsonl"
+SUMMARY_FILE = "summary.json"
+OUTPUTS_DIR = "outputs"          # One artifact directory per lease
+RESULTS_FILE = "metrics"         # .csv / .parquet
+
+RESULT_COLUMNS = ("lease_id", "path", "digest", "illegal_area_m2", "legal_area_m2", "volume_m3", "total_vol_m3",
+                  "avg_depth_m", "truckloads", "remote_calls", "elapsed_s", "finished_at")
+RESULT_FORMATS = ("csv", "parquet")
+
+
+def lease_files(source):
+    """
+    Lease files of a batch as {lease_id: path}: every lease file under a directory,
+    or the paths listed in a manifest (one per line, '#' comments, relative to it).
+    The lease ID is the path relative to the directory / manifest.
+    """
+    if os.path.isdir(source):
+        root = source
+        paths = [os.path.join(d, name) for d, _, names in os.walk(source) for name in names
+                 if name.lower().endswith(LEASE_EXTENSIONS)]
+    else:
+        root = os.path.dirname(os.path.abspath(source))
+        with open(source) as f:
+            lines = [line.split("#", 1)[0].strip() for line in f]
+        paths = [line if os.path.isabs(line) else os.path.join(root, line) for line in lines if line]
+    return {os.path.relpath(path, root): path for path in sorted(paths)}
+
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def batch_id(source, start_date, end_date, backend):
+    """Same inputs, window and backend -> same batch (and the same checkpoint to resume)."""
+    return hashlib.sha256(f"{os.path.abspath(source)}|{start_date}|{end_date}|{backend}".encode()).hexdigest()[:16]
+
+
+# --- PER-LEASE STEPS ---
+
+def ingest_lease(path, done_digest=None):
+    """
+    Reads one lease file; returns (digest, GeoJSON or None). A file whose digest
+    is `done_digest` (already detected) is not parsed again.
+    """
+    digest = file_digest(path)
+    return digest, (process_lease_file(path) if digest != done_digest else None)
+
+
+def detect_lease(lease_id, path, digest, lease_geojson, start_date, end_date, backend, output_dir, artifact_mode):
+    """Runs the detection of one lease; returns its checkpoint record."""
+    started = time.perf_counter()
+    result = run_unified_detection(lease_geojson, filename=path, output_dir=output_dir, start_date=start_date,
+                                   end_date=end_date, backend=backend, artifact_mode=artifact_mode)
+    return {
+        "lease_id": lease_id, "path": path, "digest": digest, **result["metrics"],
+        "remote_calls": result.get("diagnostics", {}).get("remote_calls"),
+        "elapsed_s": round(time.perf_counter() - started, 3),
+        "finished_at": datetime.datetime.utcnow().isoformat() + "Z",
+    }
+
+
+# --- RESULTS ---
+
+def write_results(records, path_stem, formats=("csv",)):
+    """One row per lease, in RESULT_COLUMNS order; returns the files written."""
+    rows = [{column: record.get(column) for column in RESULT_COLUMNS} for record in records]
+    written = []
+    if "csv" in formats:
+        with open(f"{path_stem}.csv", "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+        written.append(f"{path_stem}.csv")
+    if "parquet" in formats:
+        if not HAS_ARROW:
+            raise RuntimeError("Parquet output needs pyarrow")
+        import pyarrow
+        import pyarrow.parquet
+
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows), f"{path_stem}.parquet")
+        written.append(f"{path_stem}.parquet")
+    return written
+
+
+# --- BATCH ---
+
+def run_batch(source, start_date=DEFAULT_START, end_date=DEFAULT_END, backend=None, workers=BATCH_WORKERS,
+              ingest_workers=BATCH_INGEST_WORKERS, out_dir=BATCH_DIR, formats=("csv",), artifact_mode="lazy",
+              limit=None):
+    """
+    Runs the detection on every lease file of a directory or manifest. Files are
+    read `ingest_workers` at a time and each lease goes to the detection pool
+    (`workers` at a time) as soon as it is read. Every finished lease is appended
+    to the batch's checkpoint, so running the same batch again skips the leases
+    already done (unless their file changed); `limit` caps the leases run now.
+    Writes the consolidated metrics table and a summary, and returns the summary.
+    """
+    backend = backend or DETECTION_BACKEND
+    if backend not in DETECTION_BACKENDS:
+        raise ValueError(f"Unknown detection backend '{backend}'")
+    files = lease_files(source)
+    if not files:
+        raise ValueError(f"No lease files in {source}")
+    bid = batch_id(source, start_date, end_date, backend)
+    batch_dir = os.path.join(out_dir, bid)
+    os.makedirs(batch_dir, exist_ok=True)
+    write_json(os.path.join(batch_dir, MANIFEST_FILE), {
+        "batch_id": bid, "source": os.path.abspath(source), "start_date": start_date, "end_date": end_date,
+        "backend": backend, "leases": len(files),
+    })
+
+    checkpoint = os.path.join(batch_dir, CHECKPOINT_FILE)
+    done = {lease_id: record for lease_id, record in load_checkpoint(checkpoint, key="lease_id").items()
+            if lease_id in files}
+    print(f"📦 Batch {bid}: {len(files)} leases, {len(done)} already done, "
+          f"{workers} detections at a time ({backend})")
+
+    # Local detections are CPU-bound (processes); Earth Engine ones wait on the network (threads)
+    executor = ProcessPoolExecutor if backend == "local" else ThreadPoolExecutor
+    started = time.perf_counter()
+    failed, detected = {}, 0
+    with open(checkpoint, "a") as f, ThreadPoolExecutor(max_workers=ingest_workers) as readers, \
+            executor(max_workers=workers) as pool:
+        # Every file is hashed (a changed file is detected again); a lease goes to
+        # the detection pool as soon as it is read, and is checkpointed as it finishes
+        ingests = {readers.submit(ingest_lease, path, done.get(lease_id, {}).get("digest")): lease_id
+                   for lease_id, path in files.items()}
+        detections, submitted = {}, 0
+        pending = set(ingests)
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                if future in ingests:
+                    lease_id = ingests[future]
+                    try:
+                        digest, lease_geojson = future.result()
+                    except OSError as e:
+                        failed[lease_id] = str(e)
+                        continue
+                    if done.get(lease_id, {}).get("digest") == digest or (limit is not None and submitted >= limit):
+                        continue
+                    if not lease_geojson:
+                        failed[lease_id] = "could not read the lease boundary"
+                        continue
+                    output_dir = os.path.join(batch_dir, OUTPUTS_DIR, re.sub(r"[^\w.-]+", "_", lease_id))
+                    detection = pool.submit(detect_lease, lease_id, files[lease_id], digest, lease_geojson,
+                                            start_date, end_date, backend, output_dir, artifact_mode)
+                    detections[detection] = lease_id
+                    pending.add(detection)
+                    submitted += 1
+                    continue
+
+                lease_id = detections[future]
+                try:
+                    record = future.result()
+                except Exception as e:
+                    failed[lease_id] = str(e)
+                    print(f"⚠️ Lease {lease_id} failed (will be retried on resume): {e}")
+                    continue
+                append_record(f, record)
+                done[lease_id] = record
+                detected += 1
+                rate = detected / (time.perf_counter() - started) * 3600
+                print(f"🧾 {len(done)}/{len(files)} leases | {lease_id}: {record['illegal_area_m2']:.0f} m² illegal "
+                      f"| {rate:.0f} leases/hour")
+
+    elapsed = time.perf_counter() - started
+    records = [done[lease_id] for lease_id in files if lease_id in done]
+    results = write_results(records, os.path.join(batch_dir, RESULTS_FILE), formats)
+    summary = {
+        "batch_id": bid,
+        "complete": len(done) == len(files),
+        "leases": len(files),
+        "leases_done": len(done),
+        "leases_failed": failed,
+        "leases_detected": detected,
+        "elapsed_s": round(elapsed, 2),
+        "leases_per_hour": round(detected / elapsed * 3600, 1) if detected and elapsed > 0 else None,
+        "illegal_area_m2": round(sum(r["illegal_area_m2"] for r in records), 2),
+        "volume_m3": round(sum(r["volume_m3"] for r in records), 2),
+        "results": results,
+        "finished_at": datetime.datetime.utcnow().isoformat() + "Z",
+    }
+    write_json(os.path.join(batch_dir, SUMMARY_FILE), summary)
+    rate = summary["leases_per_hour"] if summary["leases_per_hour"] is not None else "n/a"
+    print(f"✅ Batch {bid}: {len(done)}/{len(files)} leases, {rate} leases/hour -> {', '.join(results)}")
+    return summary
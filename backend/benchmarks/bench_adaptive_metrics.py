@@ -0,0 +1,74 @@
+"""
+Adaptive metrics benchmark: coarse-to-fine vs the fixed 10 m reduction (Earth Engine).
+
+    python benchmarks/bench_adaptive_metrics.py --half-km 1 3 6 10 --budget-s 20
+
+Needs Earth Engine credentials (see phase1_detection.initialize_earth_engine).
+For square leases of growing size around the default ROI, reports the latency of
+the fixed-scale metrics, the adaptive mode's first estimate and its final result,
+the scales it picked, and the area error of each against the fixed-scale result
+(and whether the estimate's error falls within its own error estimate).
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics_engine  # noqa: E402
+from benchmarks.synthetic_scene import lease_polygon  # noqa: E402
+from phase1_detection import (  # noqa: E402
+    DEFAULT_END, DEFAULT_START, _ensure_earth_engine, build_detection_layers, search_zone_area_m2,
+)
+from progress import ProgressTracker  # noqa: E402
+
+
+def error(value, reference):
+    return abs(value - reference) / reference if reference else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--half-km", type=float, nargs="+", default=[1, 3, 6, 10])
+    parser.add_argument("--budget-s", type=float, default=metrics_engine.METRICS_LATENCY_BUDGET_S)
+    args = parser.parse_args()
+    _ensure_earth_engine()
+
+    print("lease km²   fixed s  estimate s  adaptive s  scales      estimate err (est.)   adaptive err")
+    for half_km in args.half_km:
+        lease = lease_polygon(half_km * 1000)
+        layers = build_detection_layers(lease, DEFAULT_START, DEFAULT_END)
+        bands = (layers["status_band"], layers["raw_depth"], layers["smooth_surface"], layers["search_zone"])
+
+        start = time.perf_counter()
+        fixed = metrics_engine.compute_metrics(*bands, vectorize=True)
+        fixed_s = time.perf_counter() - start
+
+        estimate_at = []
+        progress = ProgressTracker(lambda event: event["stage"] == "metrics_estimate" and estimate_at.append(
+            time.perf_counter()))
+        start = time.perf_counter()
+        adaptive = metrics_engine.compute_metrics_adaptive(*bands, search_zone_area_m2(lease), vectorize=True,
+                                                           progress=progress, budget_s=args.budget_s)
+        adaptive_s = time.perf_counter() - start
+
+        plan = adaptive["adaptive"]
+        reference = fixed["illegal_area_m2"] + fixed["legal_area_m2"]
+        final_err = error(adaptive["illegal_area_m2"] + adaptive["legal_area_m2"], reference)
+        if "coarse_estimate" in plan:
+            coarse = plan["coarse_estimate"]
+            bound = sum(coarse["error_estimate"].values())
+            coarse_area = coarse["illegal_area_m2"] + coarse["legal_area_m2"]
+            estimate = f"{error(coarse_area, reference):6.1%} ({bound / reference if reference else 0:6.1%})"
+            within = abs(coarse_area - reference) <= bound
+            scales = f"{plan['coarse_scale']}→{plan['scale']} m"
+            estimate_s = f"{estimate_at[0] - start:10.1f}"
+        else:
+            estimate, within, scales, estimate_s = "   (single pass)    ", True, f"{plan['scale']} m", " " * 10
+        print(f"{(2 * half_km) ** 2:9.0f}  {fixed_s:8.1f}  {estimate_s}  {adaptive_s:10.1f}  {scales:10}  "
+              f"{estimate}{'' if within else ' !'}  {final_err:12.2%}")
+
+
+if __name__ == "__main__":
+    main()
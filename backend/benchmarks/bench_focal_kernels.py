@@ -0,0 +1,87 @@
+"""
+Focal kernel benchmark: focal_kernels vs scipy.ndimage across radii and raster sizes.
+
+    python benchmarks/bench_focal_kernels.py --sizes 512 1024 2048 --radii 1 5 10 25
+
+scipy is run as the direct NaN-aware correlation (sum / count with a disk kernel),
+which is what a naive local focal_mean costs. Runs above --max-scipy-ops are skipped.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import ndimage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import focal_kernels  # noqa: E402
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def scipy_circular_mean(values, radius):
+    valid = np.isfinite(values)
+    y, x = np.ogrid[-radius:radius + 1, -radius:radius + 1]
+    kernel = ((x * x + y * y) <= radius * radius).astype(np.float64)
+    total = ndimage.correlate(np.where(valid, values, 0.0), kernel, mode="constant")
+    count = ndimage.correlate(valid.astype(np.float64), kernel, mode="constant")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / count, np.nan)
+
+
+def scipy_binary_mode(mask, radius):
+    y, x = np.ogrid[-radius:radius + 1, -radius:radius + 1]
+    kernel = ((x * x + y * y) <= radius * radius).astype(np.int32)
+    ones = ndimage.correlate(mask.astype(np.int32), kernel, mode="constant")
+    counts = ndimage.correlate(np.ones(mask.shape, np.int32), kernel, mode="constant")
+    return 2 * ones > counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[512, 1024, 2048])
+    parser.add_argument("--radii", type=int, nargs="+", default=[1, 5, 10, 25])
+    parser.add_argument("--bands", type=int, default=6, help="band count for the O(1) approximation")
+    parser.add_argument("--max-scipy-ops", type=float, default=5e9)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    header = f"{'size':>6} {'r':>4} | {'scipy':>8} {'exact':>8} {'approx':>8} {'box':>8} | {'exact err':>9} {'approx err':>10} | {'mode scipy':>10} {'mode sat':>8} {'same':>5}"
+    print(header)
+    print("-" * len(header))
+    for size in args.sizes:
+        dem = 300 + rng.normal(0, 5, (size, size)).cumsum(axis=1) / 50
+        dem[rng.random(dem.shape) < 0.02] = np.nan
+        mask = rng.random((size, size)) < 0.4
+        for radius in args.radii:
+            kernel_px = (2 * radius + 1) ** 2
+            run_scipy = size * size * kernel_px <= args.max_scipy_ops
+
+            exact, t_exact = _timed(focal_kernels.circular_mean, dem, radius)
+            approx, t_approx = _timed(focal_kernels.circular_mean, dem, radius, bands=args.bands)
+            _, t_box = _timed(focal_kernels.box_mean, dem, radius)
+            mode, t_mode = _timed(focal_kernels.binary_mode, mask, radius)
+
+            if run_scipy:
+                ref, t_scipy = _timed(scipy_circular_mean, dem, radius)
+                ref_mode, t_scipy_mode = _timed(scipy_binary_mode, mask, radius)
+                exact_err = f"{np.nanmax(np.abs(exact - ref)):9.1e}"
+                approx_err = f"{np.nanmax(np.abs(approx - ref)):10.1e}"
+                same = str(bool(np.array_equal(mode, ref_mode)))
+                scipy_cols = f"{t_scipy:8.3f}", f"{t_scipy_mode:10.3f}"
+            else:
+                exact_err, approx_err, same = f"{'-':>9}", f"{'-':>10}", "-"
+                scipy_cols = f"{'skipped':>8}", f"{'skipped':>10}"
+
+            print(f"{size:>6} {radius:>4} | {scipy_cols[0]} {t_exact:8.3f} {t_approx:8.3f} {t_box:8.3f} | "
+                  f"{exact_err} {approx_err} | {scipy_cols[1]} {t_mode:8.3f} {same:>5}")
+
+
+if __name__ == "__main__":
+    main()
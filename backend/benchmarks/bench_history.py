@@ -0,0 +1,131 @@
+"""
+History endpoint benchmark: keyset pages and aggregate summary vs the old full scans.
+
+    DATABASE_URL=postgresql://... python benchmarks/bench_history.py --rows 1000000
+
+Seeds synthetic finished inspections (run it against a scratch database), rebuilds
+the per-day aggregates, then times the first page, a deep page (keyset vs OFFSET),
+the summary (aggregate table vs SUM over inspections) and, with --legacy, the old
+"load every row" query.
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import func, insert, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import history_queries  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import Inspection  # noqa: E402
+
+SEED_BATCH = 10_000
+EPOCH = datetime.datetime(2022, 1, 1)
+
+REBUILD_STATS = [
+    "DELETE FROM inspection_daily_stats",
+    """INSERT INTO inspection_daily_stats (day, inspections, illegal_area_m2, volume_m3, truckloads)
+       SELECT CAST(created_at AS DATE), COUNT(*), COALESCE(SUM(illegal_area_m2), 0),
+              COALESCE(SUM(volume_m3), 0), COALESCE(SUM(truckloads), 0)
+       FROM inspections WHERE state = 'done' GROUP BY CAST(created_at AS DATE)""",
+]
+
+
+def seed(n_rows, seed=0):
+    """Bulk-inserts n_rows synthetic inspections spread over three years."""
+    rng = np.random.default_rng(seed)
+    table = Inspection.__table__
+    start = time.perf_counter()
+    for offset in range(0, n_rows, SEED_BATCH):
+        n = min(SEED_BATCH, n_rows - offset)
+        seconds = rng.integers(0, 3 * 365 * 86400, n)
+        area = rng.gamma(1.5, 20_000, n) * (rng.random(n) < 0.6)
+        depth = rng.uniform(2.0, 12.0, n)
+        rows = [{
+            "job_id": f"bench-{offset + i:08d}",
+            "filename": f"lease_{offset + i}.zip",
+            "state": "done" if rng.random() < 0.95 else "failed",
+            "status": "success",
+            "illegal_area_m2": float(area[i]),
+            "volume_m3": float(area[i] * depth[i]),
+            "avg_depth_m": float(depth[i]) if area[i] else 0.0,
+            "truckloads": int(area[i] * depth[i] / 15),
+            "created_at": EPOCH + datetime.timedelta(seconds=int(seconds[i])),
+        } for i in range(n)]
+        with engine.begin() as conn:
+            conn.execute(insert(table), rows)
+    with engine.begin() as conn:
+        for statement in REBUILD_STATS:
+            conn.execute(text(statement))
+    print(f"seeded {n_rows:,} rows in {time.perf_counter() - start:.1f}s")
+
+
+def timed(label, fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    print(f"{label:<34} {min(times) * 1000:10.2f} ms (best of {repeat})")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skip-seed", action="store_true", help="reuse previously seeded rows")
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--depth", type=float, default=0.5, help="deep page position (fraction of rows)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--legacy", action="store_true", help="also time the old full ORM fetch")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    if not args.skip_seed:
+        seed(args.rows)
+
+    db = SessionLocal()
+    try:
+        done = db.query(Inspection.id).filter(Inspection.state == "done")
+        total = done.count()
+        print(f"{total:,} finished inspections")
+
+        timed("first page (keyset)", lambda: history_queries.history_page(db, args.page), args.repeat)
+
+        # Cursor of the row just before the deep page (computed once, untimed)
+        offset = int(total * args.depth)
+        anchor = (db.query(Inspection.created_at, Inspection.id)
+                  .filter(Inspection.state == "done")
+                  .order_by(Inspection.created_at.desc(), Inspection.id.desc())
+                  .offset(max(offset - 1, 0)).limit(1).one())
+        cursor = history_queries.encode_cursor(anchor.created_at, anchor.id)
+        keyset = timed(f"page at row {offset:,} (keyset)",
+                       lambda: history_queries.history_page(db, args.page, cursor), args.repeat)
+        paged = timed(f"page at row {offset:,} (OFFSET)",
+                      lambda: (db.query(*history_queries.HISTORY_COLUMNS)
+                               .filter(Inspection.state == "done")
+                               .order_by(Inspection.created_at.desc(), Inspection.id.desc())
+                               .offset(offset).limit(args.page).all()), args.repeat)
+        assert [item["id"] for item in keyset["items"]] == [row.id for row in paged]
+
+        fast = timed("summary (aggregate table)", lambda: history_queries.summary(db), args.repeat)
+        slow = timed("summary (full scan)", lambda: db.query(
+            func.count(Inspection.id), func.sum(Inspection.illegal_area_m2),
+            func.sum(Inspection.volume_m3), func.sum(Inspection.truckloads),
+        ).filter(Inspection.state == "done").one(), args.repeat)
+        assert fast["inspections"] == slow[0] and fast["truckloads"] == slow[3]
+
+        if args.legacy:
+            timed("legacy: every ORM row", lambda: db.query(Inspection)
+                  .filter(Inspection.state == "done")
+                  .order_by(Inspection.created_at.desc()).all(), 1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Concurrent lease ingestion benchmark: correctness under parallel load and throughput.
+
+    python benchmarks/bench_ingest.py --files 32 --workers 8 --features 20000
+
+1. The old extract-to-"temp_shapefile_extract" reader, run in parallel, to show
+   how many uploads come back with another upload's geometry.
+2. process_lease_file (/vsizip/ reads, no shared state), serial and parallel;
+   every result must match its own file.
+3. A large multi-feature zip read with and without the Arrow path (needs pyarrow).
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import geopandas as gpd
+import shapely.geometry
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import file_processor  # noqa: E402
+from benchmarks.synthetic_leases import make_lease_zips, write_lease_zip, lease_parts  # noqa: E402
+
+
+def legacy_process_lease_file(file_path):
+    """The pre-/vsizip/ reader: every call shares one extraction directory."""
+    extract_path = "temp_shapefile_extract"
+    try:
+        if os.path.exists(extract_path):
+            shutil.rmtree(extract_path, ignore_errors=True)
+        with zipfile.ZipFile(file_path, "r") as zip_ref:
+            zip_ref.extractall(extract_path)
+        shp_file = next(os.path.join(root, f) for root, _, files in os.walk(extract_path)
+                        for f in files if f.endswith(".shp"))
+        gdf = gpd.read_file(shp_file).to_crs(epsg=4326)
+        return shapely.geometry.mapping(gdf.unary_union)
+    except Exception:
+        return None
+    finally:
+        shutil.rmtree(extract_path, ignore_errors=True)
+
+
+def same(a, b):
+    if a is None or b is None:
+        return False
+    return shapely.geometry.shape(a).equals_exact(shapely.geometry.shape(b), 1e-9)
+
+
+def run(label, fn, paths, workers, expected=None):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(fn, paths))
+    elapsed = time.perf_counter() - start
+    wrong = sum(not same(r, e) for r, e in zip(results, expected)) if expected else 0
+    print(f"{label:<32} {len(paths) / elapsed:8.1f} files/s   wrong results: {wrong}/{len(paths)}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--vertices", type=int, default=256)
+    parser.add_argument("--features", type=int, default=20000, help="features in the large zip")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_lease_zips(os.path.join(tmp, "leases"), args.files, vertices=args.vertices)
+
+        # Ground truth: each file read on its own
+        expected = [file_processor.process_lease_file(p) for p in paths]
+        expected_legacy = [legacy_process_lease_file(p) for p in paths]
+
+        os.chdir(tmp)  # The legacy reader writes into the working directory
+        run("legacy, serial", legacy_process_lease_file, paths, 1, expected_legacy)
+        run(f"legacy, {args.workers} threads", legacy_process_lease_file, paths, args.workers, expected_legacy)
+        run("vsizip, serial", file_processor.process_lease_file, paths, 1, expected)
+        run(f"vsizip, {args.workers} threads", file_processor.process_lease_file, paths, args.workers, expected)
+
+        big = write_lease_zip(os.path.join(tmp, "big.zip"), lease_parts(0, args.features, vertices=16))
+        shp = file_processor._find_shapefile(big)
+        for use_arrow in ((False, True) if file_processor.HAS_ARROW else (False,)):
+            start = time.perf_counter()
+            gdf = gpd.read_file(shp, engine="pyogrio", columns=[], use_arrow=use_arrow)
+            print(f"{args.features} features, arrow={use_arrow!s:<5}  {time.perf_counter() - start:8.3f}s "
+                  f"({len(gdf)} rows)")
+        if not file_processor.HAS_ARROW:
+            print("pyarrow not installed: Arrow path skipped")
+
+
+if __name__ == "__main__":
+    main()
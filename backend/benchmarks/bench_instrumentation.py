@@ -0,0 +1,71 @@
+"""
+Instrumentation overhead benchmark: cost of a timed block and of rendering /metrics.
+
+    python benchmarks/bench_instrumentation.py --calls 200000 --threads 1 8
+
+Times an empty `with instrumentation.timer(...)` block (with and without a job
+collecting per-job timings) against the bare loop, from one and from several
+threads sharing the registry lock, then renders the Prometheus text for a
+registry with as many series as a busy API process has.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instrumentation  # noqa: E402
+
+LABELS = ("metrics", "map_center", "map_id", "estimate", "refine")
+
+
+def loop(calls, timed, in_job):
+    def body():
+        for i in range(calls):
+            if timed:
+                with instrumentation.timer("ee_fetch_seconds", call=LABELS[i % len(LABELS)]):
+                    pass
+    if not in_job:
+        return body()
+    with instrumentation.job_timings():
+        body()
+
+
+def per_call_ns(calls, threads, timed, in_job):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda _: loop(calls, timed, in_job), range(threads)))
+    return (time.perf_counter() - start) / (calls * threads) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=200000, help="timed blocks per thread")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    args = parser.parse_args()
+
+    print("threads   bare ns   timer ns   timer+job ns   overhead/call")
+    for threads in args.threads:
+        bare = per_call_ns(args.calls, threads, False, False)
+        timed = per_call_ns(args.calls, threads, True, False)
+        in_job = per_call_ns(args.calls, threads, True, True)
+        print(f"{threads:7d}  {bare:8.0f}  {timed:9.0f}  {in_job:13.0f}  {(in_job - bare) / 1000:10.2f} µs")
+
+    for stage in ("read", "reproject", "clean"):
+        instrumentation.observe("ingest_stage_seconds", 0.1, stage=stage)
+    for artifact in ("map_2d", "model_3d", "pdf"):
+        instrumentation.observe("artifact_build_seconds", 1.0, artifact=artifact)
+    for seconds in (0.01, 0.02, 0.5):
+        instrumentation.observe("db_commit_seconds", seconds)
+    start = time.perf_counter()
+    renders = 200
+    for _ in range(renders):
+        text = instrumentation.render()
+    print(f"\n/metrics render: {(time.perf_counter() - start) / renders * 1000:.2f} ms "
+          f"({text.count(chr(10))} lines, {len(text) / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Lease normalization microbenchmark: recursive _sanitize_coords vs shapely 2 array ops.
+
+    python benchmarks/bench_lease_normalization.py --vertices 100000
+
+Builds a synthetic 3D survey boundary, then times the old pure-Python Z strip
+against force_2d + set_precision + to_geojson, and the vertex-budget
+simplification with its area error.
+"""
+import argparse
+import json
+import math
+import numbers
+import os
+import sys
+import time
+
+import numpy as np
+import shapely
+import shapely.geometry
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import file_processor  # noqa: E402
+
+
+def _is_coord_list(obj):
+    return isinstance(obj, (list, tuple)) and len(obj) >= 2 and all(isinstance(x, numbers.Number) for x in obj)
+
+
+def legacy_sanitize_coords(obj):
+    """The recursive Z strip that process_lease_file used before the shapely 2 path."""
+    if isinstance(obj, dict):
+        return {k: legacy_sanitize_coords(v) for k, v in obj.items()}
+    if _is_coord_list(obj):
+        return [float(obj[0]), float(obj[1])]
+    if isinstance(obj, (list, tuple)):
+        return [legacy_sanitize_coords(v) for v in obj]
+    if isinstance(obj, numbers.Number):
+        if float(obj).is_integer():
+            return int(obj)
+        return float(obj)
+    return obj
+
+
+def survey_polygon(vertices, seed=0):
+    """A ~2 km wide lease near Dhanbad with a jittery 3D boundary of `vertices` points."""
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * math.pi, vertices, endpoint=False)
+    radius_deg = 0.01 * (1 + 0.05 * np.sin(7 * angles) + 0.002 * rng.standard_normal(vertices))
+    lon = 86.43 + radius_deg * np.cos(angles)
+    lat = 23.79 + radius_deg * np.sin(angles)
+    z = 180 + rng.random(vertices)
+    return shapely.geometry.Polygon(np.column_stack([lon, lat, z]))
+
+
+def timed(label, fn, repeat):
+    best = min(_once(fn) for _ in range(repeat))
+    print(f"{label:<40} {best * 1000:10.1f} ms")
+    return best
+
+
+def _once(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vertices", type=int, default=100_000)
+    parser.add_argument("--budget", type=int, nargs="+", default=[20_000, 2_000, 500])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    geom = survey_polygon(args.vertices)
+    mapping = shapely.geometry.mapping(geom)
+    print(f"{args.vertices:,} vertices, has_z={geom.has_z}")
+
+    legacy = timed("recursive _sanitize_coords (mapping)", lambda: legacy_sanitize_coords(
+        shapely.geometry.mapping(geom)), args.repeat)
+    vectorized = timed("force_2d + set_precision + to_geojson", lambda: json.loads(
+        shapely.to_geojson(file_processor.normalize_geometry(geom))), args.repeat)
+    print(f"speedup: {legacy / vectorized:.1f}x")
+
+    old = np.asarray(legacy_sanitize_coords(mapping)["coordinates"][0], dtype=float)
+    new = shapely.get_coordinates(file_processor.normalize_geometry(geom))
+    print(f"max coordinate difference: {np.abs(old - new).max():.2e} deg")
+
+    flat = file_processor.normalize_geometry(geom)
+    for budget in args.budget:
+        start = time.perf_counter()
+        _, report = file_processor.simplify_geometry(flat, max_vertices=budget)
+        print(f"budget {budget:>6}: {report['vertices_out']:>6} vertices, tolerance {report['tolerance_m']:g} m, "
+              f"area error {report['area_error_m2']:.1f} m² ({report['area_error_pct']}%) "
+              f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
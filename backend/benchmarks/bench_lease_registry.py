@@ -0,0 +1,95 @@
+"""
+Lease registry benchmark: pit classification throughput against every known lease.
+
+    python benchmarks/bench_lease_registry.py --leases 100000 --pits 20000
+
+Builds a registry of synthetic leases tiled over a region (with gaps between
+them, and some overlapping neighbours), then times the STRtree build, bulk
+classification of random pits, a per-pit loop over every lease (on a sample),
+and an incremental add. A sample of pits is checked against the brute force.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import shapely
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lease_registry  # noqa: E402
+
+ORIGIN = (85.0, 22.0)       # Jharkhand-ish, EPSG:4326
+CELL_DEG = 0.01             # ~1 km lease grid
+
+
+def make_leases(n, seed=0):
+    """n jittered boxes on a ~1 km grid; roughly one in ten overlaps its neighbour."""
+    rng = np.random.default_rng(seed)
+    side = int(np.ceil(np.sqrt(n)))
+    i, j = np.divmod(np.arange(n), side)
+    x0 = ORIGIN[0] + i * CELL_DEG + rng.uniform(0, 0.002, n)
+    y0 = ORIGIN[1] + j * CELL_DEG + rng.uniform(0, 0.002, n)
+    size = np.where(rng.random(n) < 0.1, 0.012, rng.uniform(0.005, 0.008, n))
+    return [f"LEASE-{k:06d}" for k in range(n)], shapely.box(x0, y0, x0 + size, y0 + size)
+
+
+def make_pits(n, extent, seed=1):
+    """n small pits (20-80 m across) scattered over the lease grid."""
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(ORIGIN[0], ORIGIN[0] + extent, n)
+    y = rng.uniform(ORIGIN[1], ORIGIN[1] + extent, n)
+    return shapely.buffer(shapely.points(x, y), rng.uniform(0.0001, 0.0004, n), quad_segs=4)
+
+
+def brute_force(pit, geometries):
+    """Share of the pit covered by any lease, the slow way."""
+    covered = sum(shapely.area(shapely.intersection(pit, lease)) for lease in geometries
+                  if shapely.intersects(pit, lease))
+    return min(covered / shapely.area(pit), 1.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--leases", type=int, default=100_000)
+    parser.add_argument("--pits", type=int, default=20_000)
+    parser.add_argument("--add", type=int, default=1_000, help="leases added incrementally")
+    parser.add_argument("--check", type=int, default=50, help="pits checked against brute force")
+    args = parser.parse_args()
+
+    lease_ids, geometries = make_leases(args.leases + args.add)
+    extent = np.ceil(np.sqrt(args.leases + args.add)) * CELL_DEG
+    pits = make_pits(args.pits, extent)
+
+    registry = lease_registry.LeaseRegistry()
+    start = time.perf_counter()
+    registry.add_many(lease_ids[:args.leases], geometries[:args.leases])
+    print(f"build: {args.leases:,} leases in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    classes, fractions, matched = registry.classify(pits)
+    elapsed = time.perf_counter() - start
+    print(f"bulk classify: {args.pits:,} pits in {elapsed:.2f}s ({args.pits / elapsed:,.0f} pits/s)")
+    for name in (lease_registry.OTHER_LICENSED, lease_registry.UNLICENSED):
+        print(f"  {name:<15} {int((classes == name).sum()):>8,}")
+
+    # The naive way: every pit against every lease (on a sample, it's O(pits x leases))
+    sample = pits[:args.check]
+    start = time.perf_counter()
+    expected = [brute_force(pit, geometries[:args.leases]) for pit in sample]
+    elapsed = time.perf_counter() - start
+    print(f"brute force: {len(sample)} pits in {elapsed:.2f}s ({len(sample) / elapsed:,.1f} pits/s)")
+
+    # Pits in overlapping leases are counted once per lease by both, so compare sums
+    errors = np.abs(np.minimum(fractions[:args.check, 1], 1.0) - np.array(expected))
+    print(f"max licensed-fraction error vs brute force: {errors.max():.2e}")
+    assert errors.max() < 1e-9
+
+    start = time.perf_counter()
+    registry.add_many(lease_ids[args.leases:], geometries[args.leases:])
+    print(f"incremental add: {args.add:,} leases (tree rebuild) in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+3D model benchmark: level-of-detail binary meshes vs one full-resolution mesh.
+
+    python benchmarks/bench_mesh_lod.py --sizes 257 513 1025 --errors 4 1 0.25
+
+The grid is synthetic: a round search zone of gently rolling ground with a few
+pits of 10-40 m, half inside the lease (legal) and half outside (illegal). The
+baseline is the monolithic output: every pixel a vertex, two triangles per
+cell, embedded in the HTML page as JSON arrays (x, y, z, i, j, k, status) the
+way a plotting-library mesh page carries it; its .glb size is shown as well.
+Each row: triangles, bytes (raw and gzip, as the artifact store serves them)
+and generation time.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mesh_lod  # noqa: E402
+
+PIXEL_SIZE_M = 30.0
+PITS = ((0.35, 0.4, 0.06, 25.0), (0.6, 0.55, 0.1, 40.0), (0.7, 0.25, 0.04, 12.0), (0.3, 0.7, 0.05, 18.0))
+
+
+def synthetic_grid(size, noise_m, seed=0):
+    y, x = np.mgrid[0:size, 0:size] / (size - 1)
+    ground = 3 * np.sin(7 * x) * np.cos(5 * y)
+    depth = np.zeros((size, size))
+    for cx, cy, radius, pit_depth in PITS:
+        depth += pit_depth * np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / (2 * radius ** 2))
+    depth = depth - ground + np.random.default_rng(seed).normal(0, noise_m, (size, size))
+    status = np.where(depth > 2, np.where(x < 0.5, 2, 1), 0).astype(np.uint8)
+    depth[np.hypot(x - 0.5, y - 0.5) > 0.5] = np.nan
+    return depth.astype(np.float32), status
+
+
+def full_mesh(depth, status):
+    """Every valid pixel a vertex, two triangles per cell with four valid corners."""
+    height, width = depth.shape
+    index = np.arange(height * width).reshape(height, width)
+    tl, tr, bl, br = index[:-1, :-1], index[:-1, 1:], index[1:, :-1], index[1:, 1:]
+    triangles = np.concatenate((np.stack((tl, br, tr), -1).reshape(-1, 3), np.stack((br, tl, bl), -1).reshape(-1, 3)))
+    valid = np.isfinite(depth).ravel()
+    triangles = triangles[valid[triangles].all(axis=1)]
+    vertices, inverse = np.unique(triangles, return_inverse=True)
+    rows, cols = np.divmod(vertices, width)
+    positions = np.stack((cols * PIXEL_SIZE_M, -rows * PIXEL_SIZE_M, -depth.ravel()[vertices]), axis=1)
+    return positions.astype(np.float32), status.ravel()[vertices], inverse.reshape(-1, 3)
+
+
+def html_payload(positions, status, triangles):
+    arrays = {"x": positions[:, 0], "y": positions[:, 1], "z": np.round(positions[:, 2], 2),
+              "i": triangles[:, 0], "j": triangles[:, 1], "k": triangles[:, 2], "status": status}
+    return ("<html><body><script>const mesh = " + json.dumps({k: v.tolist() for k, v in arrays.items()})
+            + ";</script></body></html>").encode()
+
+
+def report(name, triangles, payload, seconds):
+    print(f"  {name:26} {triangles:>10,} {len(payload) / 1024:>10.0f} {len(gzip.compress(payload, 6)) / 1024:>9.0f}"
+          f" {seconds * 1000:>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[257, 513, 1025], help="grid pixels a side")
+    parser.add_argument("--errors", type=float, nargs="+", default=list(mesh_lod.MESH_LOD_ERRORS_M),
+                        help="level tolerances (m)")
+    parser.add_argument("--noise", type=float, default=0.1, help="DEM noise (m, standard deviation)")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        depth, status = synthetic_grid(size, args.noise)
+        print(f"\n{size} x {size} grid ({PIXEL_SIZE_M:.0f} m pixels)")
+        print(f"  {'':26} {'triangles':>10} {'KB':>10} {'KB gzip':>9} {'ms':>9}")
+
+        start = time.perf_counter()
+        positions, vertex_status, triangles = full_mesh(depth, status)
+        page = html_payload(positions, vertex_status, triangles)
+        report("full resolution, HTML", len(triangles), page, time.perf_counter() - start)
+        start = time.perf_counter()
+        glb = mesh_lod.to_glb(positions, vertex_status, triangles)
+        report("full resolution, .glb", len(triangles), glb, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        rtin = mesh_lod.RTIN(depth, status)
+        print(f"  {'RTIN errors':26} {'':>10} {'':>10} {'':>9} {(time.perf_counter() - start) * 1000:>9.0f}")
+        for max_error in sorted(args.errors, reverse=True):
+            start = time.perf_counter()
+            vertices, lod_triangles = rtin.mesh(max_error)
+            glb = mesh_lod.to_glb(rtin.positions(vertices, PIXEL_SIZE_M), rtin.classes[vertices], lod_triangles)
+            report(f"LOD ±{max_error:g} m, .glb", len(lod_triangles), glb, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Monitoring benchmark: monthly refresh as an incremental job vs a full recompute.
+
+    DATABASE_URL=postgresql://... python benchmarks/bench_monitoring.py --size 2000 --months 12
+
+Writes a synthetic scene with one optical composite per month (pits appearing
+over time, all already in the DEM) and times, on the local backend:
+  1. a full recompute of one window (DEM focal mean + optical), the old per-run cost;
+  2. the first monitoring run, which backfills every window but the last;
+  3. the monthly refresh once the last window's composite arrives (one window,
+     cached depth layer), checked against a full recompute of that window.
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import local_detection  # noqa: E402
+import monitoring  # noqa: E402
+from benchmarks.synthetic_scene import make_scene  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import MonitoredLease, MonitoringWindow  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=2000, help="scene width/height in 10m pixels")
+    parser.add_argument("--months", type=int, default=12)
+    args = parser.parse_args()
+
+    starts = [monitoring._add_months(datetime.date(2024, 1, 1), k) for k in range(args.months)]
+    until = monitoring._add_months(starts[-1], 1)
+    Base.metadata.create_all(bind=engine)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scene_dir = os.path.join(tmp, "scene")
+        lease = make_scene(scene_dir, size_px=args.size, n_pits=args.size // 20, windows=starts)
+        local_detection.LOCAL_RASTER_DIR = scene_dir
+        monitoring.MONITOR_DIR = os.path.join(tmp, "monitoring")
+
+        # The last window's composite "arrives" after the first run
+        latest = os.path.join(scene_dir, monitoring.WINDOWS_SUBDIR, starts[-1].isoformat())
+        held_back = latest + ".pending"
+        os.rename(latest, held_back)
+
+        paths = local_detection.resolve_raster_paths(
+            {"DEM": os.path.join(scene_dir, "DEM.tif")},
+            raster_dir=os.path.join(scene_dir, monitoring.WINDOWS_SUBDIR, starts[-2].isoformat()))
+        start = time.perf_counter()
+        local_detection.compute_local_metrics(lease, paths, vectorize=True)
+        full_s = time.perf_counter() - start
+        print(f"full recompute, one window:   {full_s:8.2f}s")
+
+        db = SessionLocal()
+        try:
+            key = monitoring.register_lease(db, lease, "bench", since=starts[0], backend="local").lease_key
+            start = time.perf_counter()
+            first = monitoring.run_monitoring(db, key, until)
+            backfill_s = time.perf_counter() - start
+            print(f"first run, {first['windows_computed']} windows:      {backfill_s:8.2f}s "
+                  f"({backfill_s / max(first['windows_computed'], 1):.2f}s/window)")
+
+            os.rename(held_back, latest)
+            start = time.perf_counter()
+            refresh = monitoring.run_monitoring(db, key, until)
+            refresh_s = time.perf_counter() - start
+            print(f"monthly refresh, {refresh['windows_computed']} window:   {refresh_s:8.2f}s "
+                  f"({full_s / refresh_s:.1f}x faster than a full recompute)")
+
+            paths = local_detection.resolve_raster_paths({"DEM": os.path.join(scene_dir, "DEM.tif")},
+                                                         raster_dir=latest)
+            expected = monitoring.window_metrics(local_detection.compute_local_metrics(lease, paths))
+            last = refresh["series"][-1]
+            assert all(last[name] == value for name, value in expected.items()), (last, expected)
+
+            print("\nwindow        illegal m²     Δ m²       volume m³")
+            for item in refresh["series"]:
+                delta = item["illegal_area_delta_m2"]
+                print(f"{item['window_start']}  {item['illegal_area_m2']:>10,.0f}  "
+                      f"{'' if delta is None else f'{delta:+,.0f}':>9}  {item['volume_m3']:>12,.0f}")
+        finally:
+            db.query(MonitoringWindow).filter(MonitoringWindow.lease_key == key).delete()
+            db.query(MonitoredLease).filter(MonitoredLease.lease_key == key).delete()
+            db.commit()
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
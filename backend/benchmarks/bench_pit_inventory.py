@@ -0,0 +1,109 @@
+"""
+Pit inventory benchmark: run-based union-find labelling vs scipy label + per-pit loops.
+
+    python benchmarks/bench_pit_inventory.py --pits 10000 --block 1024
+
+Draws a raster with N disc-shaped pits (random radius and depth, some
+touching so they merge, a lease covering the left half), then builds the
+inventory the way the tiled pipeline does (block_runs per block, one
+union-find over all runs) and checks it against scipy.ndimage.label with
+per-pit statistics gathered in a Python loop over find_objects() slices.
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+from affine import Affine
+from scipy import ndimage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pit_inventory  # noqa: E402
+from benchmarks.synthetic_scene import SCENE_CRS  # noqa: E402
+
+TRANSFORM = Affine(10, 0, 580000, 0, -10, 2630000)
+PIXEL_AREA = 100.0
+
+
+def pit_raster(n_pits, seed=0):
+    """Mining mask, depth and lease mask with n_pits discs on a jittered grid."""
+    rng = np.random.default_rng(seed)
+    cells = math.ceil(math.sqrt(n_pits))
+    size = cells * 40
+    mining = np.zeros((size, size), dtype=bool)
+    depth = np.zeros((size, size))
+    centres = (np.arange(cells) * 40 + 20)
+    for k in range(n_pits):
+        cy, cx = centres[k // cells] + rng.integers(-6, 7), centres[k % cells] + rng.integers(-6, 7)
+        r = int(rng.integers(2, 20))
+        y0, y1, x0, x1 = max(cy - r, 0), min(cy + r + 1, size), max(cx - r, 0), min(cx + r + 1, size)
+        yy, xx = np.ogrid[y0:y1, x0:x1]
+        d2 = (yy - cy) ** 2 + (xx - cx) ** 2
+        disc = d2 <= r * r
+        mining[y0:y1, x0:x1] |= disc
+        depth[y0:y1, x0:x1] = np.where(disc, np.maximum(depth[y0:y1, x0:x1], 2 + 8 * (1 - d2 / (r * r + 1))),
+                                       depth[y0:y1, x0:x1])
+    inside = np.zeros_like(mining)
+    inside[:, :size // 2] = True
+    return mining, depth, inside
+
+
+def tiled_inventory(mining, depth, inside, block):
+    parts = []
+    for r in range(0, mining.shape[0], block):
+        for c in range(0, mining.shape[1], block):
+            window = (slice(r, r + block), slice(c, c + block))
+            parts.append(pit_inventory.block_runs(mining[window], inside[window], depth[window], r, c))
+    runs = pit_inventory.concat_runs(parts)
+    return pit_inventory.build_inventory(runs, TRANSFORM, SCENE_CRS, PIXEL_AREA, min_area_m2=0)
+
+
+def scipy_inventory(mining, depth, inside):
+    """The naive version: label, then one masked reduction per pit."""
+    labels, n = ndimage.label(mining, structure=np.ones((3, 3)))
+    pits = []
+    for index, window in enumerate(ndimage.find_objects(labels), start=1):
+        pit = labels[window] == index
+        pit_depth = depth[window][pit]
+        rows, cols = np.nonzero(pit)
+        pits.append({"area_m2": pit.sum() * PIXEL_AREA, "volume_m3": pit_depth.sum() * PIXEL_AREA,
+                     "max_depth_m": pit_depth.max(), "inside_area_m2": inside[window][pit].sum() * PIXEL_AREA,
+                     "centroid_px": (rows.mean() + window[0].start, cols.mean() + window[1].start)})
+    return pits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pits", type=int, default=10000)
+    parser.add_argument("--block", type=int, nargs="+", default=[1024, 256])
+    args = parser.parse_args()
+
+    mining, depth, inside = pit_raster(args.pits)
+    print(f"raster {mining.shape[0]}x{mining.shape[1]}, {mining.sum():,} mining pixels, {args.pits:,} discs")
+
+    start = time.perf_counter()
+    reference = scipy_inventory(mining, depth, inside)
+    scipy_s = time.perf_counter() - start
+    print(f"scipy label + per-pit loop: {scipy_s:7.2f}s  {len(reference):,} pits")
+
+    for block in args.block:
+        start = time.perf_counter()
+        pits = tiled_inventory(mining, depth, inside, block)
+        inventory_s = time.perf_counter() - start
+        print(f"run union-find, {block:4d} px blocks: {inventory_s:7.2f}s  {len(pits):,} pits "
+              f"({scipy_s / inventory_s:.1f}x faster)")
+
+        assert len(pits) == len(reference)
+        for key in ("area_m2", "volume_m3", "inside_area_m2"):
+            got = np.sort([p[key] for p in pits])
+            assert np.allclose(got, np.sort([p[key] for p in reference]), atol=0.01), key
+        assert np.allclose(np.sort([p["max_depth_m"] for p in pits]),
+                           np.sort([round(p["max_depth_m"], 2) for p in reference]))
+    print("inventories match")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+API start-up benchmark: import time, time to live (/healthz) and to ready (/readyz).
+
+    python benchmarks/bench_startup.py --runs 3 --auth-timeout 10
+
+Each run is a fresh interpreter. Reports the wall time of `import server`
+(median over runs), the slowest modules from `python -X importtime`, the cost
+of the imports deferred to first use (ee, geemap, geopandas, pandas), then
+starts uvicorn and times the first 200 from /healthz and the final /readyz
+answer (ready, or Earth Engine failed within EE_AUTH_TIMEOUT_S without credentials).
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFERRED = ("ee", "geemap", "geopandas", "pandas")
+
+
+def env(workdir, auth_timeout):
+    return {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, (BACKEND_DIR, os.getenv("PYTHONPATH")))),
+            "DATABASE_URL": os.getenv("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}"),
+            "EE_AUTH_TIMEOUT_S": str(auth_timeout)}
+
+
+def timed_import(code, workdir, auth_timeout):
+    """Seconds to run `code` in a fresh interpreter, measured inside it (no interpreter start-up)."""
+    script = f"import time; t = time.perf_counter(); {code}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", script], cwd=workdir, env=env(workdir, auth_timeout),
+                         capture_output=True, text=True, check=True).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def slowest_imports(workdir, auth_timeout, top):
+    """(cumulative s, module) of the top-level imports of server.py, from -X importtime."""
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", "import server"], cwd=workdir,
+                         env=env(workdir, auth_timeout), capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if name.startswith("   ") and not name.startswith("    "):    # Direct imports of server
+            rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=2) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def serve(workdir, auth_timeout):
+    """Starts uvicorn; returns (s to first /healthz 200, s to final /readyz, final /readyz body)."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "server:app", "--port", str(port)], cwd=workdir,
+                            env=env(workdir, auth_timeout), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    live_s = None
+    try:
+        while time.perf_counter() - start < auth_timeout + 60:
+            try:
+                if live_s is None:
+                    if get(f"{base}/healthz")[0] == 200:
+                        live_s = time.perf_counter() - start
+                    continue
+                status, body = get(f"{base}/readyz")
+                if status == 200 or body["earth_engine"]["state"] == "failed":
+                    return live_s, time.perf_counter() - start, body
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.05)
+        raise TimeoutError("server never settled")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8, help="slowest direct imports to list")
+    parser.add_argument("--auth-timeout", type=float, default=10, help="EE_AUTH_TIMEOUT_S for the server")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.makedirs(os.path.join(workdir, "static"))
+        lazy = [timed_import("import server", workdir, args.auth_timeout) for _ in range(args.runs)]
+        eager = [timed_import(f"import server, {', '.join(DEFERRED)}", workdir, args.auth_timeout)
+                 for _ in range(args.runs)]
+        print(f"import server          {statistics.median(lazy):6.2f}s  (median of {args.runs})")
+        print(f"  + deferred imports   {statistics.median(eager):6.2f}s  ({', '.join(DEFERRED)}: what start-up used to pay)")
+        print("\nslowest imports of server.py (cumulative):")
+        for seconds, name in slowest_imports(workdir, args.auth_timeout, args.top):
+            print(f"  {seconds:6.3f}s  {name}")
+
+        live_s, ready_s, body = serve(workdir, args.auth_timeout)
+        print(f"\nuvicorn: live (/healthz) after {live_s:.2f}s, /readyz '{body['status']}' after {ready_s:.2f}s")
+        print(f"  earth engine: {body['earth_engine']['state']} in {body['earth_engine']['seconds']}s"
+              f" (method: {body['earth_engine']['method']})")
+        print(f"  timings: {body['timings_s']}  deferred imports: {body['deferred_imports_s']}")
+
+
+if __name__ == "__main__":
+    main()
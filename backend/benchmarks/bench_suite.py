@@ -0,0 +1,299 @@
+"""
+End-to-end benchmark suite, offline (Earth Engine is faked), with JSON results.
+
+    python benchmarks/bench_suite.py --out results.json
+    python benchmarks/bench_suite.py --scenarios analyze --clients 8 --ee-latency 0.5 --baseline results.json
+
+Scenarios:
+  ingest   process_lease_file on synthetic leases of 10 to 100k vertices (zip, KML,
+           GeoJSON), and process_lease_features on multi-feature zips
+  analyze  POST /api/analyze through FastAPI's TestClient from concurrent clients,
+           polled to completion; Earth Engine is benchmarks/fake_ee.FakeEarthEngine
+           (configurable latency, every ee call counted)
+  history  GET /api/history pages and /api/history/summary over seeded inspections
+  batch    batch.run_batch (python main.py <dir>) over --jobs lease files with --clients
+           detections at a time, then the same batch again (resume: nothing to detect)
+
+Runs in a temporary working directory. The database is DATABASE_URL (use a scratch
+PostGIS database) or, by default, a temporary SQLite file with the spatial SQL
+functions stubbed out, so geometry writes cost nothing there. Every result row has
+a unique "name" and "seconds"; --baseline prints the change against an earlier run.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.fake_ee import FakeEarthEngine, FakeEEService, install  # noqa: E402
+from benchmarks.synthetic_leases import (  # noqa: E402
+    FORMATS, VERTEX_COUNTS, lease_parts, write_lease, write_lease_zip,
+)
+
+SCENARIOS = ("ingest", "analyze", "history", "batch")
+# Spatial SQL the models emit, as no-ops for SQLite without SpatiaLite: geometries
+# are stored as their EWKT text and read back as NULL
+SQLITE_SPATIAL_FUNCTIONS = {
+    "write": ("GeomFromEWKT", "ST_GeomFromEWKT"),
+    "read": ("AsBinary", "ST_AsBinary", "AsEWKB", "ST_AsEWKB"),
+    "ddl": ("RecoverGeometryColumn", "CreateSpatialIndex", "DiscardGeometryColumn", "CheckSpatialIndex"),
+}
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] if ordered else None
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, times
+
+
+def row(name, times, **extra):
+    return {"name": name, "seconds": round(statistics.median(times), 4), "min_s": round(min(times), 4),
+            "repeat": len(times), **extra}
+
+
+# --- SCENARIOS ---
+
+def run_ingest(args, workdir):
+    import file_processor
+
+    rows = []
+    for vertices in args.vertices:
+        parts = lease_parts(0, 1, vertices)
+        for fmt in FORMATS:
+            path = write_lease(os.path.join(workdir, f"lease_{vertices}.{fmt}"), parts, fmt)
+            result, times = timed(lambda: file_processor.process_lease_file(path),
+                                  1 if vertices >= 10_000 else args.repeat)
+            assert result is not None, f"{path} did not parse"
+            rows.append(row(f"ingest/{fmt}/{vertices}v", times, format=fmt, vertices=vertices, features=1,
+                            bytes=os.path.getsize(path)))
+    for features in args.features:
+        path = write_lease_zip(os.path.join(workdir, f"multi_{features}.zip"), lease_parts(0, features, 64))
+        result, times = timed(lambda: file_processor.process_lease_features(path), args.repeat)
+        assert len(result) == features
+        rows.append(row(f"ingest/features/{features}f", times, format="zip", vertices=64, features=features,
+                        bytes=os.path.getsize(path)))
+    return rows
+
+
+def run_analyze(args, workdir, fake):
+    from fastapi.testclient import TestClient
+
+    import server
+
+    paths = [write_lease_zip(os.path.join(workdir, f"upload_{i:04d}.zip"), lease_parts(i, 1, 64))
+             for i in range(args.jobs)]
+
+    def one_job(client, path):
+        start = time.perf_counter()
+        with open(path, "rb") as f:
+            response = client.post("/api/analyze", files={"file": (os.path.basename(path), f)},
+                                   data={"start_date": "2024-01-01", "end_date": "2024-04-30"})
+        if response.status_code != 202:
+            return {"state": f"http {response.status_code}", "seconds": time.perf_counter() - start}
+        job_id = response.json()["job_id"]
+        while True:
+            job = client.get(f"/api/jobs/{job_id}", params={"timings": True}).json()
+            if job["state"] in ("done", "failed"):
+                return {"state": job["state"], "seconds": time.perf_counter() - start,
+                        "timings": (job.get("result") or {}).get("timings") or {}}
+            time.sleep(args.poll_s)
+
+    with TestClient(server.app) as client:
+        requests_before = fake.service.counts["requests"]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            jobs = list(pool.map(lambda path: one_job(client, path), paths))
+        wall = time.perf_counter() - start
+        ee_requests = fake.service.counts["requests"] - requests_before
+
+    done = [job for job in jobs if job["state"] == "done"]
+    latencies = [job["seconds"] for job in done]
+    stage_seconds = {}
+    for job in done:
+        for metric, entries in job["timings"].items():
+            for label, entry in entries.items():
+                stage_seconds.setdefault(f"{metric}/{label}", []).append(entry["seconds"])
+    return [{
+        "name": f"analyze/{args.clients}c", "seconds": round(statistics.median(latencies), 4) if latencies else None,
+        "p95_s": round(percentile(latencies, 0.95), 4) if latencies else None,
+        "wall_s": round(wall, 3), "jobs": args.jobs, "failed": len(jobs) - len(done), "clients": args.clients,
+        "jobs_per_s": round(len(done) / wall, 3), "ee_latency_s": args.ee_latency,
+        "ee_requests_per_job": round(ee_requests / max(len(jobs), 1), 2),
+        "ee_calls": dict(fake.calls),
+        "stage_median_s": {name: round(statistics.median(v), 4) for name, v in sorted(stage_seconds.items())},
+    }]
+
+
+def run_history(args, workdir):
+    from fastapi.testclient import TestClient
+    from sqlalchemy import text
+
+    import server
+    from benchmarks import bench_history
+    from database import engine
+
+    if engine.dialect.name == "sqlite":
+        bench_history.REBUILD_STATS = [s.replace("CAST(created_at AS DATE)", "date(created_at)")
+                                       for s in bench_history.REBUILD_STATS]
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM inspections WHERE job_id LIKE 'bench-%'"))
+    bench_history.seed(args.history_rows)
+
+    rows = []
+    with TestClient(server.app) as client:
+        first, times = timed(lambda: client.get("/api/history", params={"limit": args.page}).json(), args.repeat)
+        rows.append(row("history/first_page", times, rows=args.history_rows, page=args.page))
+        cursor = first.get("next_cursor")
+        for _ in range(args.deep_pages - 1):
+            cursor = client.get("/api/history", params={"limit": args.page, "cursor": cursor}).json()["next_cursor"]
+        _, times = timed(lambda: client.get("/api/history", params={"limit": args.page, "cursor": cursor}).json(),
+                         args.repeat)
+        rows.append(row(f"history/page_{args.deep_pages}", times, rows=args.history_rows, page=args.page))
+        _, times = timed(lambda: client.get("/api/history/summary").json(), args.repeat)
+        rows.append(row("history/summary", times, rows=args.history_rows))
+    return rows
+
+
+def run_batch(args, workdir, fake):
+    import batch
+
+    lease_dir = os.path.join(workdir, "batch_leases")
+    os.makedirs(lease_dir, exist_ok=True)
+    for i in range(args.jobs):
+        write_lease_zip(os.path.join(lease_dir, f"lease_{i:04d}.zip"), lease_parts(1000 + i, 1, 64))
+
+    rows = []
+    for name in ("batch/run", "batch/resume"):
+        requests_before = fake.service.counts["requests"]
+        start = time.perf_counter()
+        summary = batch.run_batch(lease_dir, backend="ee", workers=args.clients,
+                                  out_dir=os.path.join(workdir, "batches"))
+        wall = time.perf_counter() - start
+        rows.append({"name": name, "seconds": round(wall, 4), "leases": summary["leases"],
+                     "detected": summary["leases_detected"], "failed": len(summary["leases_failed"]),
+                     "workers": args.clients, "ee_latency_s": args.ee_latency,
+                     "leases_per_hour": summary["leases_per_hour"],
+                     "ee_requests": fake.service.counts["requests"] - requests_before})
+    return rows
+
+
+# --- SET-UP AND REPORTING ---
+
+def stub_sqlite_spatial(engine):
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "connect")
+    def _functions(connection, _):
+        for name in SQLITE_SPATIAL_FUNCTIONS["write"]:
+            connection.create_function(name, 1, lambda value: value)
+        for name in SQLITE_SPATIAL_FUNCTIONS["read"]:
+            connection.create_function(name, 1, lambda value: None)
+        for name in SQLITE_SPATIAL_FUNCTIONS["ddl"]:
+            connection.create_function(name, -1, lambda *values: 1)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {r["name"]: r for rows in json.load(f)["scenarios"].values() for r in rows}
+    print(f"\n{'name':32} {'baseline s':>11} {'now s':>9} {'change':>8}")
+    for rows in results["scenarios"].values():
+        for r in rows:
+            old = baseline.get(r["name"], {}).get("seconds")
+            if old and r["seconds"] is not None:
+                print(f"{r['name']:32} {old:11.4f} {r['seconds']:9.4f} {(r['seconds'] - old) / old:+8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", help="earlier --out file to compare against")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--vertices", type=int, nargs="+", default=list(VERTEX_COUNTS))
+    parser.add_argument("--features", type=int, nargs="+", default=[10, 100, 1000], help="multi-feature zips")
+    parser.add_argument("--jobs", type=int, default=16,
+                        help="analyze: uploads (distinct leases, no cache hits); batch: lease files")
+    parser.add_argument("--clients", type=int, default=4, help="analyze: concurrent clients; batch: BATCH_WORKERS")
+    parser.add_argument("--job-workers", type=int, default=2, help="analyze: JOB_WORKERS")
+    parser.add_argument("--ee-latency", type=float, default=0.3, help="fake EE seconds per request")
+    parser.add_argument("--artifact-mode", choices=("lazy", "eager"), default="eager",
+                        help="eager also builds the (fake) geemap map in every job")
+    parser.add_argument("--poll-s", type=float, default=0.05)
+    parser.add_argument("--history-rows", type=int, default=100_000)
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--deep-pages", type=int, default=20)
+    args = parser.parse_args()
+    out = os.path.abspath(args.out)
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+
+    workdir = tempfile.mkdtemp(prefix="mineguard-bench-")
+    os.chdir(workdir)
+    os.makedirs("static", exist_ok=True)
+    sqlite = "DATABASE_URL" not in os.environ
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    os.environ.update({"DETECTION_BACKEND": "ee", "ARTIFACT_MODE": args.artifact_mode,
+                       "JOB_WORKERS": str(args.job_workers), "JOB_QUEUE_DEPTH": str(args.jobs)})
+    fake = FakeEarthEngine(FakeEEService(latency_s=args.ee_latency, jitter_s=args.ee_latency / 4))
+    install(fake)
+
+    import database
+    import models  # noqa: F401  (registers the tables)
+    if sqlite:
+        stub_sqlite_spatial(database.engine)
+    database.Base.metadata.create_all(database.engine)
+
+    results = {"meta": {"created": datetime.datetime.utcnow().isoformat() + "Z", "commit": git_commit(),
+                        "python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count(), "database": database.engine.dialect.name, "args": vars(args)},
+               "scenarios": {}}
+    for scenario in args.scenarios:
+        print(f"▶ {scenario}", flush=True)
+        if scenario == "ingest":
+            rows = run_ingest(args, workdir)
+        elif scenario == "analyze":
+            rows = run_analyze(args, workdir, fake)
+        elif scenario == "batch":
+            rows = run_batch(args, workdir, fake)
+        else:
+            rows = run_history(args, workdir)
+        results["scenarios"][scenario] = rows
+        for r in rows:
+            print(f"  {r['name']:32} {r['seconds']} s")
+
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    os.chdir(BACKEND_DIR)
+    shutil.rmtree(workdir, ignore_errors=True)
+    print(f"\nresults: {out}")
+    if baseline:
+        compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
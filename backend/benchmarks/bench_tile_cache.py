@@ -0,0 +1,105 @@
+"""
+Tile cache benchmark: overlapping leases with and without cached input tiles.
+
+    python benchmarks/bench_tile_cache.py --size 3000 --leases 8 --budget-mb 16
+
+Writes a synthetic scene and runs a row of overlapping leases (each shifted half
+a lease width from the last) on the local backend, uncached and then with a cold
+and a warm tile cache, reporting seconds per lease and the tile hit rate. Legal
+area must match the uncached run; illegal area may differ slightly only within
+one smoothing radius of each search-zone edge (cached depth is smoothed over the
+whole DEM). Finally reruns with a small budget to show LRU eviction.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from pyproj import Transformer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import local_detection  # noqa: E402
+import tile_cache  # noqa: E402
+from benchmarks.synthetic_scene import SCENE_CENTRE, SCENE_CRS, make_scene  # noqa: E402
+
+
+def shifted_lease(half_width_m, dx_m):
+    """Square lease like synthetic_scene.lease_polygon(), moved dx_m east."""
+    to_utm = Transformer.from_crs("EPSG:4326", SCENE_CRS, always_xy=True)
+    to_wgs = Transformer.from_crs(SCENE_CRS, "EPSG:4326", always_xy=True)
+    cx, cy = to_utm.transform(*SCENE_CENTRE)
+    cx += dx_m
+    ring = [(cx - half_width_m, cy - half_width_m), (cx + half_width_m, cy - half_width_m),
+            (cx + half_width_m, cy + half_width_m), (cx - half_width_m, cy + half_width_m)]
+    ring = [list(to_wgs.transform(x, y)) for x, y in ring]
+    return {"type": "Polygon", "coordinates": [ring + [ring[0]]]}
+
+
+def run(leases, paths, workers):
+    start = time.perf_counter()
+    results = [local_detection.compute_local_metrics(lease, paths, workers=workers,
+                                                     start_date="2024-01-01", end_date="2024-12-31")
+               for lease in leases]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=3000, help="scene width/height in 10m pixels")
+    parser.add_argument("--leases", type=int, default=8)
+    parser.add_argument("--lease-km", type=float, default=2)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--budget-mb", type=float, default=16, help="budget for the eviction run")
+    args = parser.parse_args()
+
+    half = args.lease_km * 500
+    span = half * (args.leases - 1)     # Leases overlap by half their width
+    leases = [shifted_lease(half, -span / 2 + k * half) for k in range(args.leases)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scene_dir = os.path.join(tmp, "scene")
+        make_scene(scene_dir, size_px=args.size, n_pits=args.size // 20)
+        paths = local_detection.resolve_raster_paths(raster_dir=scene_dir)
+
+        tile_cache.TILE_CACHE_DIR = ""
+        uncached_s, uncached = run(leases, paths, args.workers)
+
+        tile_cache.TILE_CACHE_DIR = os.path.join(tmp, "tiles")
+        cold_s, cold = run(leases, paths, args.workers)
+        cold_stats = tile_cache.get_stats()
+        warm_s, warm = run(leases, paths, args.workers)
+        warm_stats = tile_cache.get_stats()
+
+        n = len(leases)
+        print(f"uncached:    {uncached_s:8.2f}s ({uncached_s / n:.2f}s/lease)")
+        print(f"cold cache:  {cold_s:8.2f}s ({cold_s / n:.2f}s/lease), hit rate {cold_stats['hit_rate']:.0%}, "
+              f"{cold_stats['tiles']} tiles, {cold_stats['size_mb']} MB")
+        warm_hits = warm_stats["hits"] - cold_stats["hits"]
+        warm_rate = warm_hits / (warm_hits + warm_stats["misses"] - cold_stats["misses"])
+        print(f"warm cache:  {warm_s:8.2f}s ({warm_s / n:.2f}s/lease), hit rate {warm_rate:.0%}, "
+              f"{uncached_s / warm_s:.1f}x faster than uncached")
+
+        worst = 0.0
+        for base, a, b in zip(uncached, cold, warm):
+            assert a["legal_area_m2"] == base["legal_area_m2"], "cached tiles changed the legal area"
+            assert a["illegal_area_m2"] == b["illegal_area_m2"], "warm run differs from cold run"
+            if base["illegal_area_m2"]:
+                worst = max(worst, abs(a["illegal_area_m2"] - base["illegal_area_m2"]) / base["illegal_area_m2"])
+        print(f"illegal area vs uncached: max {worst:.2%} difference (search-zone edge smoothing)")
+
+        # Eviction: a fresh cache with a budget below one pass's tiles
+        tile_cache.TILE_CACHE_DIR = os.path.join(tmp, "small")
+        tile_cache.TILE_CACHE_MB, tile_cache.TILE_GRACE_S = args.budget_mb, 0
+        tile_cache._index = None
+        tile_cache._stats.update(hits=0, misses=0, writes=0, evictions=0)
+        small_s, small = run(leases, paths, args.workers)
+        stats = tile_cache.get_stats()
+        assert all(a["illegal_area_m2"] == b["illegal_area_m2"] for a, b in zip(small, cold))
+        print(f"{args.budget_mb:g} MB budget: {small_s:8.2f}s, {stats['evictions']} evictions, "
+              f"{stats['size_mb']} MB kept, hit rate {stats['hit_rate']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
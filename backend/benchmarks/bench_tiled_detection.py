@@ -0,0 +1,49 @@
+"""
+Scaling benchmark for the tiled local detection path.
+
+    python benchmarks/bench_tiled_detection.py --size 3000 --tile 512
+
+Runs the untiled pass once, then the process-pool path at 1/2/4/8 workers,
+and checks every run is bit-identical to the untiled metrics.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import local_detection  # noqa: E402
+from benchmarks.synthetic_scene import make_scene  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=3000, help="scene width/height in 10m pixels")
+    parser.add_argument("--tile", type=int, default=512, help="tile size in pixels (halo excluded)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scene_dir:
+        lease = make_scene(scene_dir, size_px=args.size, n_pits=args.size // 20)
+        paths = local_detection.resolve_raster_paths(raster_dir=scene_dir)
+
+        start = time.perf_counter()
+        baseline = local_detection.compute_local_metrics(lease, paths, block_size=args.size * 2, workers=1)
+        untiled_s = time.perf_counter() - start
+        print(f"untiled          {untiled_s:8.2f}s")
+
+        for workers in args.workers:
+            start = time.perf_counter()
+            metrics = local_detection.compute_local_metrics(lease, paths, block_size=args.tile, workers=workers)
+            elapsed = time.perf_counter() - start
+            identical = metrics == baseline
+            print(f"{workers} worker(s)      {elapsed:8.2f}s  speedup x{untiled_s / elapsed:5.2f}  "
+                  f"bit-identical={identical}")
+            if not identical:
+                raise SystemExit(f"❌ Tiled result differs: {metrics} != {baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Local stand-in for the Earth Engine service, for exercising ee_scheduler.py.
+Computed objects answer getInfo()/getMapId() after a sampled latency and fail
+the way the real service does: "Too many concurrent aggregations" past the
+concurrency quota, HTTP 429 past the request rate, and random transient 503s.
+
+FakeEarthEngine goes one step further: a fake of the `ee` (and `geemap`) module
+surface used by run_unified_detection, installed with install(), so the whole
+Earth Engine backend runs offline with a recorded, configurable latency.
+"""
+import random
+import sys
+import threading
+import time
+import types
+from collections import Counter, deque
+
+import numpy as np
+import shapely.geometry
+
+
+class EEException(Exception):
+    """Same name as ee.EEException, which the real client raises for every server error."""
+
+
+class FakeTileFetcher:
+    def __init__(self, url_format):
+        self.url_format = url_format
+
+
+class FakeEEService:
+    def __init__(self, latency_s=0.3, jitter_s=0.2, max_concurrent=10, rate_per_s=None, error_rate=0.0, seed=0):
+        self.latency_s, self.jitter_s = latency_s, jitter_s
+        self.max_concurrent, self.rate_per_s, self.error_rate = max_concurrent, rate_per_s, error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent = deque()       # Request times over the last second
+        self.in_flight = self.peak_in_flight = 0
+        self.counts = {"requests": 0, "ok": 0, "concurrency_429": 0, "rate_429": 0, "transient_503": 0}
+
+    def _admit(self):
+        with self._lock:
+            self.counts["requests"] += 1
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            if self.in_flight >= self.max_concurrent:
+                self.counts["concurrency_429"] += 1
+                raise EEException("Too many concurrent aggregations.")
+            if self.rate_per_s and len(self._recent) >= self.rate_per_s:
+                self.counts["rate_429"] += 1
+                raise EEException("<HttpError 429 when requesting ... returned \"Too Many Requests\">")
+            if self._rng.random() < self.error_rate:
+                self.counts["transient_503"] += 1
+                raise EEException("<HttpError 503 when requesting ... returned \"Service Unavailable\">")
+            self._recent.append(now)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return max(0.0, self._rng.gauss(self.latency_s, self.jitter_s))
+
+    def request(self, value):
+        latency = self._admit()
+        try:
+            time.sleep(latency)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.counts["ok"] += 1
+        return value
+
+    def computed(self, value):
+        return FakeComputedObject(self, value)
+
+
+class FakeComputedObject:
+    """An ee.ComputedObject / ee.Image whose result is known in advance."""
+
+    def __init__(self, service, value):
+        self.service, self.value = service, value
+
+    def getInfo(self):
+        return self.service.request(self.value)
+
+    def getMapId(self, vis_params=None):
+        mapid = f"fake-{id(self):x}"
+        return self.service.request({"mapid": mapid, "token": "",
+                                     "tile_fetcher": FakeTileFetcher(f"https://fake.ee/{mapid}/{{z}}/{{x}}/{{y}}")})
+
+
+# --- FAKE `ee` / `geemap` MODULES ---
+
+class FakeNode:
+    """
+    A lazy ee object (Image, Geometry, Reducer, ...). Every method call returns
+    a new node remembering the call, like the real client building its graph;
+    getInfo() answers from the op at the top of the graph.
+    """
+
+    def __init__(self, fake, op, parent=None, args=(), kwargs=None):
+        self._fake, self._op, self._parent = fake, op, parent
+        self._args, self._kwargs = args, kwargs or {}
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        def method(*args, **kwargs):
+            self._fake.record(name)
+            return FakeNode(self._fake, name, self, args, kwargs)
+        return method
+
+    def getInfo(self):
+        self._fake.record("getInfo")
+        return self._fake.service.request(self._fake.evaluate(self))
+
+    def getMapId(self, vis_params=None):
+        self._fake.record("getMapId")
+        return self._fake.service.computed(None).getMapId(vis_params)
+
+    def root(self):
+        """The node this chain started from (e.g. the ee.Geometry of a buffered search zone)."""
+        node = self
+        while node._parent is not None:
+            node = node._parent
+        return node
+
+
+class FakeConstructor:
+    """ee.Image, ee.Geometry, ...: callable, with static constructors (ee.Image.constant)."""
+
+    def __init__(self, fake, name):
+        self._fake, self._name = fake, name
+
+    def __call__(self, *args, **kwargs):
+        self._fake.record(self._name)
+        return FakeNode(self._fake, self._name, None, args, kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        def constructor(*args, **kwargs):
+            self._fake.record(f"{self._name}.{name}")
+            return FakeNode(self._fake, f"{self._name}.{name}", None, args, kwargs)
+        return constructor
+
+
+class FakeMap:
+    """geemap.Map: records the layers, writes a small HTML page."""
+
+    def __init__(self, *args, **kwargs):
+        self.center, self.layers = None, []
+
+    def set_center(self, lon, lat, zoom=None):
+        self.center = (lon, lat, zoom)
+
+    def add_tile_layer(self, url, name=None, attribution=None, **kwargs):
+        self.layers.append((name, url))
+
+    def to_html(self, path):
+        with open(path, "w") as f:
+            f.write("<html><body>" + "".join(f"<p>{name}: {url}</p>" for name, url in self.layers)
+                    + "</body></html>")
+
+
+class FakeEarthEngine:
+    """
+    Answers for the EE detection graph: one illegal pit outside the lease and
+    one legal pit inside it, with fixed areas and volumes, per-lease zone sums,
+    and map tiles. Requests go through a FakeEEService (latency, quotas, errors);
+    `calls` counts every ee constructor, method and request by name.
+    """
+
+    def __init__(self, service=None, illegal_area_m2=42_000.0, legal_area_m2=96_000.0, depth_m=6.0,
+                 lid_elevation_m=180.0):
+        self.service = service or FakeEEService(latency_s=0.0, jitter_s=0.0, max_concurrent=10_000)
+        self.illegal_area_m2, self.legal_area_m2 = illegal_area_m2, legal_area_m2
+        self.depth_m, self.lid_elevation_m = depth_m, lid_elevation_m
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, name):
+        with self._lock:
+            self.calls[name] += 1
+
+    def modules(self):
+        """(ee, geemap) module objects backed by this fake."""
+        ee = types.ModuleType("ee")
+        for name in ("Image", "ImageCollection", "Geometry", "Feature", "FeatureCollection", "Filter",
+                     "Reducer", "Dictionary", "Number", "List", "String", "Projection"):
+            setattr(ee, name, FakeConstructor(self, name))
+        ee.EEException = EEException
+        ee.data = types.SimpleNamespace(computePixels=self.compute_pixels)
+        ee.Initialize = lambda *args, **kwargs: self.record("Initialize")
+        ee.ServiceAccountCredentials = lambda *args, **kwargs: object()
+        geemap = types.ModuleType("geemap")
+        geemap.Map = FakeMap
+        return ee, geemap
+
+    # Results, by the op that was fetched
+    def evaluate(self, node):
+        if isinstance(node, dict):
+            return {key: self.evaluate(value) for key, value in node.items()}
+        if not isinstance(node, FakeNode):
+            return node
+        parent = node._parent
+        if node._op == "Dictionary":
+            return self.evaluate(node._args[0]) if node._args else {}
+        if node._op == "reduceRegion":
+            return self._metrics()
+        if node._op == "map" and parent is not None and parent._op == "reduceToVectors":
+            return self._vectors(parent._kwargs.get("geometry"))
+        if node._op == "select" and parent is not None and parent._op == "reduceRegions":
+            return self._zone_sums(parent._kwargs.get("collection"))
+        if node._op == "coordinates":
+            lease = self._lease(node.root())
+            return list(lease.centroid.coords[0]) if lease is not None else [86.425, 23.725]
+        return {}
+
+    def compute_pixels(self, request):
+        """ee.data.computePixels(): the depth/status grid of the 3D model."""
+        self.record("data.computePixels")
+        dims = request["grid"]["dimensions"]
+        return self.service.request(self._model_grid(dims["height"], dims["width"]))
+
+    def _model_grid(self, height, width):
+        """A round search zone with a legal pit at the centre and an illegal one off to the side."""
+        y, x = np.mgrid[0:height, 0:width] / max(height, width)
+        grid = np.zeros((height, width), dtype=[("depth", "<f4"), ("status", "<f4")])
+        for cx, cy, radius, status in ((0.5, 0.5, 0.08, 2), (0.75, 0.3, 0.05, 1)):
+            distance = np.hypot(x - cx, y - cy) / radius
+            pit = distance < 1
+            grid["depth"] += np.where(pit, 2 * self.depth_m * (1 - distance ** 2), 0)
+            grid["status"][pit] = status
+        grid["depth"][np.hypot(x - 0.5, y - 0.5) > 0.5] = -9999
+        return grid
+
+    def _metrics(self):
+        def group(status, area):
+            return {"status": status, "sum": [area, area * self.depth_m], "mean": self.lid_elevation_m}
+        return {"groups": [group(1, self.illegal_area_m2), group(2, self.legal_area_m2)]}
+
+    @staticmethod
+    def _lease(geometry_node):
+        if geometry_node is None or not geometry_node._args or not isinstance(geometry_node._args[0], dict):
+            return None
+        return shapely.geometry.shape(geometry_node._args[0])
+
+    def _vectors(self, region):
+        lease = self._lease(region.root()) if region is not None else None
+        if lease is None:
+            return {"type": "FeatureCollection", "features": []}
+        minx, miny, maxx, maxy = lease.bounds
+        size = min(maxx - minx, maxy - miny) / 4
+        inside = lease.representative_point().buffer(size / 2, cap_style=3)
+        outside = shapely.geometry.box(maxx + size, miny, maxx + 2 * size, miny + size)
+        return {"type": "FeatureCollection", "features": [
+            {"type": "Feature", "geometry": shapely.geometry.mapping(geom), "properties": {"status": status}}
+            for status, geom in ((1, outside), (2, inside))
+        ]}
+
+    def _zone_sums(self, collection):
+        features = []
+        for feature in (collection._args[0] if collection is not None and collection._args else []):
+            props = feature._args[1] if len(feature._args) > 1 else {}
+            area = self.legal_area_m2 if props.get("zone") == "legal" else self.illegal_area_m2
+            features.append({"type": "Feature", "geometry": None, "properties": {
+                **props, "area_sum": area, "volume_sum": area * self.depth_m, "lid_mean": self.lid_elevation_m}})
+        return {"type": "FeatureCollection", "features": features}
+
+
+def install(fake):
+    """
+    Makes `import ee` / `import geemap` resolve to `fake`. Call it before their
+    first use (phase1_detection and metrics_engine import them lazily).
+    """
+    ee, geemap = fake.modules()
+    sys.modules["ee"], sys.modules["geemap"] = ee, geemap
+    for name in ("phase1_detection", "metrics_engine"):
+        module = sys.modules.get(name)
+        if module is not None:
+            module.ee = ee
+            if name == "phase1_detection":
+                module.geemap = geemap
+    return ee, geemap
@@ -0,0 +1,87 @@
+"""
+Synthetic lease files (zipped shapefiles, KML, GeoJSON) for the ingestion benchmarks.
+"""
+import json
+import math
+import os
+import tempfile
+import zipfile
+
+import geopandas as gpd
+import numpy as np
+import shapely
+import shapely.geometry
+from pyproj import Transformer
+
+LEASE_CRS = "EPSG:32645"   # Leases usually arrive in UTM; ingestion reprojects to EPSG:4326
+VERTEX_COUNTS = (10, 100, 1_000, 10_000, 100_000)
+FORMATS = ("zip", "kml", "geojson")
+
+
+def lease_parts(index=0, n_features=1, vertices=64, radius_m=400.0, seed=0):
+    """n_features wobbly polygons (UTM 45N metres), at a distinct location per `index`."""
+    rng = np.random.default_rng(seed + index)
+    cx, cy = 300_000 + (index % 100) * 5_000, 2_600_000 + (index // 100) * 5_000
+    parts = []
+    for k in range(n_features):
+        ox, oy = (k % 50) * 3 * radius_m, (k // 50) * 3 * radius_m
+        angles = np.linspace(0, 2 * math.pi, vertices, endpoint=False)
+        radii = radius_m * (1 + 0.2 * rng.random(vertices))
+        parts.append(shapely.geometry.Polygon(
+            np.column_stack([cx + ox + radii * np.cos(angles), cy + oy + radii * np.sin(angles)])
+        ))
+    return parts
+
+
+def write_lease_zip(path, parts, crs=LEASE_CRS):
+    """Writes `parts` as a shapefile and zips its sidecar files into `path`."""
+    with tempfile.TemporaryDirectory() as tmp:
+        shp = os.path.join(tmp, "lease.shp")
+        gpd.GeoDataFrame({"part": list(range(len(parts)))}, geometry=parts, crs=crs).to_file(shp)
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name in sorted(os.listdir(tmp)):
+                zf.write(os.path.join(tmp, name), arcname=name)
+    return path
+
+
+def make_lease_zips(out_dir, count, n_features=1, vertices=64):
+    """`count` distinct lease zips; returns their paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    return [write_lease_zip(os.path.join(out_dir, f"lease_{i:04d}.zip"),
+                            lease_parts(i, n_features, vertices))
+            for i in range(count)]
+
+
+def to_wgs84(parts, crs=LEASE_CRS):
+    """`parts` in lon/lat (KML and GeoJSON files are always EPSG:4326)."""
+    forward = Transformer.from_crs(crs, "EPSG:4326", always_xy=True)
+    return [shapely.transform(part, lambda xy: np.column_stack(forward.transform(xy[:, 0], xy[:, 1])))
+            for part in parts]
+
+
+def write_lease_kml(path, parts, crs=LEASE_CRS):
+    """One Placemark per part."""
+    placemarks = []
+    for i, part in enumerate(to_wgs84(parts, crs)):
+        coords = " ".join(f"{x:.9f},{y:.9f}" for x, y in part.exterior.coords)
+        placemarks.append(f"<Placemark><name>part {i}</name><Polygon><outerBoundaryIs><LinearRing>"
+                          f"<coordinates>{coords}</coordinates></LinearRing></outerBoundaryIs></Polygon></Placemark>")
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<kml xmlns="http://www.opengis.net/kml/2.2"><Document>'
+                + "".join(placemarks) + "</Document></kml>\n")
+    return path
+
+
+def write_lease_geojson(path, parts, crs=LEASE_CRS):
+    with open(path, "w") as f:
+        json.dump({"type": "FeatureCollection", "features": [
+            {"type": "Feature", "properties": {"part": i}, "geometry": json.loads(shapely.to_geojson(part))}
+            for i, part in enumerate(to_wgs84(parts, crs))
+        ]}, f)
+    return path
+
+
+def write_lease(path, parts, fmt, crs=LEASE_CRS):
+    """Writes `parts` as a zipped shapefile, KML or GeoJSON ("zip", "kml", "geojson")."""
+    writers = {"zip": write_lease_zip, "kml": write_lease_kml, "geojson": write_lease_geojson}
+    return writers[fmt](path, parts, crs)
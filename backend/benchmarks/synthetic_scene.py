@@ -0,0 +1,79 @@
+"""
+Synthetic Sentinel-2 (B4/B8/B11) + DEM GeoTIFFs for the local backend benchmarks.
+Pits are bare, unvegetated and 8m deep, so they pass all three locks.
+"""
+import os
+
+import numpy as np
+import rasterio
+from pyproj import Transformer
+from rasterio.transform import from_origin
+
+SCENE_CRS = "EPSG:32645"       # UTM 45N, covers the default Jharkhand coal belt ROI
+SCENE_CENTRE = (86.425, 23.725)
+
+
+def make_scene(out_dir, size_px=900, n_pits=40, pit_depth=8.0, seed=0, windows=None):
+    """
+    Writes B4/B8/B11 (10m) and DEM (30m) around SCENE_CENTRE and returns the lease GeoJSON.
+    With `windows` (window start dates), the optical bands are written once per window
+    to windows/<start>/ instead: every pit is in the DEM, but they show up optically
+    a batch per window, as for monitoring.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    to_utm = Transformer.from_crs("EPSG:4326", SCENE_CRS, always_xy=True)
+    cx, cy = to_utm.transform(*SCENE_CENTRE)
+    west, north = cx - size_px * 5, cy + size_px * 5
+
+    yy, xx = np.mgrid[0:size_px, 0:size_px]
+    pit_masks = []
+    for _ in range(n_pits):
+        py, px = rng.integers(50, size_px - 50, size=2)
+        radius = rng.integers(5, 25)
+        pit_masks.append((yy - py) ** 2 + (xx - px) ** 2 < radius * radius)
+    pits = np.logical_or.reduce(pit_masks) if pit_masks else np.zeros((size_px, size_px), dtype=bool)
+
+    noise = lambda: rng.normal(0, 50, (size_px, size_px))
+    optical = lambda visible: {
+        "B4": np.where(visible, 1800, 800) + noise(),
+        "B8": np.where(visible, 2000, 3000) + noise(),
+        "B11": np.where(visible, 3000, 2500) + noise(),
+    }
+    bands = optical(pits) if not windows else {}
+    dem_px = size_px // 3
+    dem = 300 + rng.normal(0, 0.3, (dem_px, dem_px))
+    dem -= np.where(pits[::3, ::3][:dem_px, :dem_px], pit_depth, 0.0)
+
+    transform10, transform30 = from_origin(west, north, 10, 10), from_origin(west, north, 30, 30)
+    for name, arr in bands.items():
+        _write_band(out_dir, name, arr, transform10)
+    _write_band(out_dir, "DEM", dem, transform30)
+    for index, start in enumerate(windows or []):
+        shown = (index + 1) * n_pits // len(windows)
+        visible = np.logical_or.reduce(pit_masks[:shown]) if shown else np.zeros_like(pits)
+        for name, arr in optical(visible).items():
+            _write_band(os.path.join(out_dir, "windows", str(start)), name, arr, transform10)
+
+    return lease_polygon(size_px * 10 / 4)
+
+
+def _write_band(out_dir, name, arr, transform):
+    os.makedirs(out_dir, exist_ok=True)
+    profile = dict(driver="GTiff", height=arr.shape[0], width=arr.shape[1], count=1,
+                   dtype="float32", crs=SCENE_CRS, transform=transform, nodata=-9999,
+                   tiled=True, blockxsize=256, blockysize=256)
+    with rasterio.open(os.path.join(out_dir, f"{name}.tif"), "w", **profile) as dst:
+        dst.write(arr.astype("float32"), 1)
+
+
+def lease_polygon(half_width_m):
+    """Square lease of the given half width centred on the scene."""
+    to_utm = Transformer.from_crs("EPSG:4326", SCENE_CRS, always_xy=True)
+    to_wgs = Transformer.from_crs(SCENE_CRS, "EPSG:4326", always_xy=True)
+    cx, cy = to_utm.transform(*SCENE_CENTRE)
+    ring = [(cx - half_width_m, cy - half_width_m), (cx + half_width_m, cy - half_width_m),
+            (cx + half_width_m, cy + half_width_m), (cx - half_width_m, cy + half_width_m)]
+    ring = [list(to_wgs.transform(x, y)) for x, y in ring]
+    return {"type": "Polygon", "coordinates": [ring + [ring[0]]]}
@@ -0,0 +1,39 @@
+import json
+import os
+
+# Append-only JSONL checkpoints and atomic JSON files, shared by the resumable
+# runs (sweep.py cells, batch.py leases): one record per finished unit of work,
+# fsynced as it is written, so a crashed run resumes where it stopped.
+
+
+def load_checkpoint(path, key):
+    """Completed records by `key`. A line torn by a crash is cut off so appends stay valid."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+    for line in data.splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        done[record[key]] = record
+    return done
+
+
+def append_record(f, record):
+    """Appends one record to an open checkpoint and makes it durable."""
+    f.write(json.dumps(record) + "\n")
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def write_json(path, data):
+    """Writes `path` atomically (temporary file, then rename)."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
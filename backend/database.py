@@ -3,6 +3,8 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
+import instrumentation
+
 # SMART CONNECTION:
 # Check if running in Docker (Env Variable), else use Localhost
 DATABASE_URL = os.getenv(
@@ -12,6 +14,7 @@ DATABASE_URL = os.getenv(
 
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrumentation.instrument_sessions(SessionLocal)
 
 Base = declarative_base()
 
@@ -0,0 +1,153 @@
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentation
+from instrumentation import Histogram
+
+# --- CONFIGURATION ---
+# Every blocking Earth Engine request (getInfo, getMapId) goes through one scheduler
+EE_MAX_CONCURRENT = int(os.getenv("EE_MAX_CONCURRENT", "10"))   # Our project's concurrent request quota
+EE_RATE_PER_S = float(os.getenv("EE_RATE_PER_S", "5"))          # Sustained requests/s (token bucket)
+EE_BURST = int(os.getenv("EE_BURST", "10"))
+EE_MAX_RETRIES = int(os.getenv("EE_MAX_RETRIES", "5"))
+EE_BACKOFF_BASE_S = float(os.getenv("EE_BACKOFF_BASE_S", "1"))  # Doubles per retry, with full jitter
+EE_BACKOFF_MAX_S = float(os.getenv("EE_BACKOFF_MAX_S", "32"))
+
+LATENCY_BUCKETS_S = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Errors worth retrying: quota/rate limits and transient server or network failures.
+# Deterministic ones ("Computation timed out", "User memory limit exceeded") are not.
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+RETRYABLE_MESSAGES = ("too many requests", "rate limit", "quota", "capacity exceeded", "concurrent",
+                      "service unavailable", "internal error", "backend error", "deadline exceeded",
+                      "connection reset", "temporarily unavailable")
+RETRYABLE_HTTP = re.compile(r"\bhttp(error)?\W+(429|5\d\d)\b")
+
+
+def is_retryable(error):
+    """True for EE quota errors (429) and transient server/network failures."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    status = getattr(getattr(error, "resp", None), "status", None) or getattr(error, "status_code", None)
+    if status is not None:
+        return int(status) in RETRYABLE_STATUS
+    message = str(error).lower()
+    return bool(RETRYABLE_HTTP.search(message)) or any(m in message for m in RETRYABLE_MESSAGES)
+
+
+class TokenBucket:
+    """`rate` tokens/s up to `burst`; acquire() reserves one and sleeps until it is due."""
+
+    def __init__(self, rate, burst, clock=time.monotonic, sleep=time.sleep):
+        self.rate, self.burst = rate, burst
+        self.clock, self.sleep = clock, sleep
+        self.tokens = float(burst)
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+
+class EEScheduler:
+    """
+    Runs blocking Earth Engine calls on a pool capped at `max_concurrent`,
+    paced by a token bucket, retrying quota and transient errors with
+    exponential backoff. Callables must not submit to the scheduler themselves
+    (a full pool would deadlock).
+    """
+
+    def __init__(self, max_concurrent=EE_MAX_CONCURRENT, rate_per_s=EE_RATE_PER_S, burst=EE_BURST,
+                 max_retries=EE_MAX_RETRIES, backoff_base_s=EE_BACKOFF_BASE_S, backoff_max_s=EE_BACKOFF_MAX_S,
+                 sleep=time.sleep):
+        self.max_concurrent, self.max_retries = max_concurrent, max_retries
+        self.backoff_base_s, self.backoff_max_s = backoff_base_s, backoff_max_s
+        self.sleep = sleep
+        self.bucket = TokenBucket(rate_per_s, burst, sleep=sleep)
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="ee")
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._counters = {"calls": 0, "retries": 0, "failures": 0, "throttled_s": 0.0}
+        self._in_flight = 0
+
+    def submit(self, fn, *args, label="getInfo", **kwargs):
+        """Schedules fn(*args, **kwargs); returns a Future."""
+        return self._pool.submit(self._run, fn, args, kwargs, label)
+
+    def call(self, fn, *args, label="getInfo", **kwargs):
+        """Blocking submit(): the result, or the last error once retries are exhausted."""
+        return self.submit(fn, *args, label=label, **kwargs).result()
+
+    def gather(self, calls):
+        """{name: (fn, args...)} -> {name: result}, all dispatched at once."""
+        futures = {name: self.submit(fn, *args, label=name) for name, (fn, *args) in calls.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def _run(self, fn, args, kwargs, label):
+        for attempt in range(self.max_retries + 1):
+            throttled = self.bucket.acquire()
+            with self._lock:
+                self._counters["calls"] += 1
+                self._counters["throttled_s"] += throttled
+                self._in_flight += 1
+            started, error = time.perf_counter(), None
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                error = e
+            with self._lock:
+                self._in_flight -= 1
+            if error is None:
+                instrumentation.inc("ee_requests_total", outcome="ok")
+                self._observe(label, time.perf_counter() - started)
+                return result
+
+            retry = attempt < self.max_retries and is_retryable(error)
+            with self._lock:
+                self._counters["retries" if retry else "failures"] += 1
+            instrumentation.inc("ee_requests_total", outcome="retry" if retry else "failed")
+            if not retry:
+                raise error
+            # Backing off holds the pool slot, so retries also lower the concurrency
+            delay = random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * 2 ** attempt))
+            print(f"⏳ EE {label} failed ({error}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+            self.sleep(delay)
+
+    def _observe(self, label, seconds):
+        with self._lock:
+            self._latency.setdefault(label, Histogram(LATENCY_BUCKETS_S)).observe(seconds)
+        instrumentation.observe("ee_request_seconds", seconds, call=label)
+
+    def stats(self):
+        with self._lock:
+            return {**self._counters, "throttled_s": round(self._counters["throttled_s"], 3),
+                    "in_flight": self._in_flight, "max_concurrent": self.max_concurrent,
+                    "latency": {label: hist.as_dict() for label, hist in self._latency.items()}}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """The process-wide scheduler (one EE quota per process)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = EEScheduler()
+        return _scheduler
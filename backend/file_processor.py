@@ -1,32 +1,105 @@
-import geopandas as gpd
+import importlib.util
+import json
 import os
 import zipfile
-import shutil
+import numpy as np
+import shapely
 import shapely.geometry
 import shapely.ops
-import numbers
+from pyproj import Transformer
 
-def _is_coord_list(obj):
-    """Checks if an object is a list of coordinates [x, y, z?]"""
-    return isinstance(obj, (list, tuple)) and len(obj) >= 2 and all(isinstance(x, numbers.Number) for x in obj)
+import instrumentation
 
-def _sanitize_coords(obj):
+# Arrow read path (columnar, much faster for large multi-feature files). Only
+# probed here: geopandas/pandas/pyarrow are imported on the first file read.
+HAS_ARROW = importlib.util.find_spec("pyarrow") is not None
+
+# --- CONFIGURATION ---
+ARROW_MIN_FEATURES = int(os.getenv("ARROW_MIN_FEATURES", "1000"))
+# Lease geometry sent to Earth Engine
+COORD_PRECISION_DEG = 1e-9                                           # ~0.1 mm grid snap
+LEASE_MAX_VERTICES = int(os.getenv("LEASE_MAX_VERTICES", "2000"))    # Vertex budget
+LEASE_SIMPLIFY_M = float(os.getenv("LEASE_SIMPLIFY_M", "0"))        # Fixed tolerance (0 = budget only)
+SIMPLIFY_START_M = 0.5                                               # First tolerance tried for the budget
+SIMPLIFY_SEARCH_STEPS = 6                                            # Bisection steps towards the budget
+# Per-lease mode
+LEASE_ID_FIELDS = ("lease_id", "LEASE_ID", "lease_no", "LEASE_NO", "id", "ID", "name", "Name")
+MIN_FEATURE_VERTICES = 64                                            # Per-feature floor of the shared budget
+MIN_RING_VERTICES = 4                                                # A simplified ring never has fewer
+
+def normalize_geometry(geom):
+    """
+    Vectorized cleanup for Earth Engine (2D only): drops Z/M values and snaps
+    every vertex to COORD_PRECISION_DEG in one pass over the coordinate array.
+    """
+    return shapely.set_precision(shapely.force_2d(geom), COORD_PRECISION_DEG, mode="pointwise")
+
+def utm_transformers(geom):
+    """EPSG:4326 <-> local UTM zone, so tolerances and areas are in metres."""
+    lon, lat = geom.centroid.x, geom.centroid.y
+    epsg = (32600 if lat >= 0 else 32700) + int((lon + 180) // 6) % 60 + 1
+    forward = Transformer.from_crs("EPSG:4326", f"EPSG:{epsg}", always_xy=True)
+    inverse = Transformer.from_crs(f"EPSG:{epsg}", "EPSG:4326", always_xy=True)
+    return forward, inverse
+
+def reproject(geom, transformer):
+    return shapely.transform(geom, lambda xy: np.column_stack(transformer.transform(xy[:, 0], xy[:, 1])))
+
+def ring_count(geom):
+    """Polygon rings (exteriors + holes) of a Polygon / MultiPolygon."""
+    return sum(1 + len(p.interiors) for p in getattr(geom, "geoms", [geom]) if p.geom_type == "Polygon")
+
+def simplify_geometry(geom, max_vertices=LEASE_MAX_VERTICES, tolerance_m=LEASE_SIMPLIFY_M):
     """
-    Recursively removes Z-coordinates (3D) to ensure GEE compatibility (2D only).
-    Converts numpy floats to python floats.
+    Topology-preserving simplification (in metres, on the local UTM grid) to a
+    fixed tolerance and/or until the vertex budget is met. Returns the new
+    geometry and a report of the vertex reduction and the area error it causes
+    ("budget_met" is False when the rings alone need more than the budget).
     """
-    if isinstance(obj, dict):
-        return {k: _sanitize_coords(v) for k, v in obj.items()}
-    if _is_coord_list(obj):
-        # Keep only lon, lat (first two entries)
-        return [float(obj[0]), float(obj[1])]
-    if isinstance(obj, (list, tuple)):
-        return [_sanitize_coords(v) for v in obj]
-    if isinstance(obj, numbers.Number):
-        if float(obj).is_integer():
-            return int(obj)
-        return float(obj)
-    return obj
+    vertices = int(shapely.get_num_coordinates(geom))
+    report = {"vertices_in": vertices, "vertices_out": vertices, "budget_met": vertices <= max_vertices,
+              "tolerance_m": 0.0, "area_m2": None, "area_change_m2": 0.0, "area_error_m2": 0.0, "area_error_pct": 0.0}
+    if not tolerance_m and vertices <= max_vertices:
+        return geom, report
+
+    forward, inverse = utm_transformers(geom)
+    projected = reproject(geom, forward)
+    tolerance = tolerance_m or SIMPLIFY_START_M
+    if shapely.get_num_coordinates(projected.simplify(tolerance, preserve_topology=False)) > max_vertices:
+        # Search the budget tolerance with the cheap Douglas-Peucker pass:
+        # double until it fits, then bisect back towards the budget
+        low = tolerance
+        while shapely.get_num_coordinates(projected.simplify(tolerance, preserve_topology=False)) > max_vertices:
+            low, tolerance = tolerance, tolerance * 2
+        for _ in range(SIMPLIFY_SEARCH_STEPS):
+            mid = (low + tolerance) / 2
+            if shapely.get_num_coordinates(projected.simplify(mid, preserve_topology=False)) > max_vertices:
+                low = mid
+            else:
+                tolerance = mid
+    # The topology-preserving pass can keep a few extra vertices; it never takes a
+    # ring below MIN_RING_VERTICES, so a budget under that floor is reported rather than chased
+    simplified = projected.simplify(tolerance, preserve_topology=True)
+    for _ in range(SIMPLIFY_SEARCH_STEPS):
+        count = shapely.get_num_coordinates(simplified)
+        if count <= max_vertices or count <= MIN_RING_VERTICES * ring_count(simplified):
+            break
+        tolerance *= 1.25
+        simplified = projected.simplify(tolerance, preserve_topology=True)
+
+    area = projected.area
+    # Symmetric difference = area wrongly added + area wrongly dropped
+    error = shapely.symmetric_difference(projected, simplified).area
+    report.update({
+        "vertices_out": int(shapely.get_num_coordinates(simplified)),
+        "budget_met": bool(shapely.get_num_coordinates(simplified) <= max_vertices),
+        "tolerance_m": tolerance,
+        "area_m2": round(area, 2),
+        "area_change_m2": round(simplified.area - area, 2),
+        "area_error_m2": round(error, 2),
+        "area_error_pct": round(100 * error / area, 4) if area else 0.0,
+    })
+    return normalize_geometry(reproject(simplified, inverse)), report
 
 def _extract_single_polygon(geom):
     """Ensures the output is always a single clean Polygon or MultiPolygon."""
@@ -50,58 +123,84 @@ def _extract_single_polygon(geom):
     # Fallback: Bounding Box
     return shapely.geometry.Polygon(geom.envelope.exterior.coords)
 
-def process_lease_file(file_path):
+def _find_shapefile(zip_path):
+    """Path of the first .shp inside the archive, as a GDAL /vsizip/ path (nothing is extracted)."""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        members = [name for name in zip_ref.namelist()
+                   if name.lower().endswith(".shp") and not name.startswith("__MACOSX/")]
+    if not members:
+        raise ValueError("❌ No .shp file found in the zip archive.")
+    return f"/vsizip/{os.path.abspath(zip_path)}/{members[0]}"
+
+def _read_geometries(path, columns=()):
+    """
+    Reads only the geometry column (plus `columns`) through pyogrio. Large
+    multi-feature files go through the Arrow (columnar) path when pyarrow is installed.
+    """
+    import geopandas as gpd
+
+    use_arrow = False
+    if HAS_ARROW:
+        import pyogrio
+        use_arrow = (pyogrio.read_info(path).get("features") or 0) >= ARROW_MIN_FEATURES
+    return gpd.read_file(path, engine="pyogrio", columns=list(columns), use_arrow=use_arrow)
+
+def _lease_path(file_path):
+    """GDAL path of the lease layer (zips are read straight out of the archive)."""
+    if file_path.lower().endswith('.zip'):
+        return _find_shapefile(file_path)
+    if file_path.lower().endswith(('.kml', '.geojson', '.json')):
+        # Note: KML requires GDAL's KML/LIBKML driver
+        return file_path
+    raise ValueError("❌ Unsupported format. Please upload .zip, .kml, or .geojson")
+
+def _load_frame(file_path, columns=()):
+    """Reads, validates and reprojects the lease layer to EPSG:4326."""
+    with instrumentation.timer("ingest_stage_seconds", stage="read"):
+        gdf = _read_geometries(_lease_path(file_path), columns)
+
+    # Validation & Reprojection
+    if gdf is None or gdf.empty:
+        raise ValueError("❌ Input file contained no geometries!")
+
+    # Standardize Coordinate Reference System to WGS84 (Lat/Lon)
+    if gdf.crs is not None and gdf.crs.to_string() != "EPSG:4326":
+        print(f"🔄 Reprojecting from {gdf.crs} to EPSG:4326...")
+        with instrumentation.timer("ingest_stage_seconds", stage="reproject"):
+            gdf = gdf.to_crs(epsg=4326)
+    return gdf
+
+def _clean_geometry(geom, max_vertices=LEASE_MAX_VERTICES):
+    """2D, snapped, within the vertex budget; returns (geometry, simplification report)."""
+    with instrumentation.timer("ingest_stage_seconds", stage="clean"):
+        geom = _extract_single_polygon(normalize_geometry(geom))
+        return simplify_geometry(geom, max_vertices=max_vertices)
+
+def process_lease_file(file_path, report=None):
     """
     Main entry point: Reads .zip/.kml/.geojson, reprojects to EPSG:4326,
     and returns a clean GeoJSON dictionary.
+    Safe to call concurrently: zips are read in place, nothing is written to disk.
+    Pass a dict as `report` to receive the simplification report.
     """
     print(f"📂 Processing input file: {os.path.basename(file_path)}")
-    extract_path = "temp_shapefile_extract"
-    gdf = None
 
     try:
-        # A. Handle ZIP (Shapefiles)
-        if file_path.lower().endswith('.zip'):
-            if os.path.exists(extract_path):
-                shutil.rmtree(extract_path)
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_path)
-            
-            shp_file = None
-            for root, dirs, files in os.walk(extract_path):
-                for file in files:
-                    if file.endswith(".shp"):
-                        shp_file = os.path.join(root, file)
-                        break
-                if shp_file: break
-            
-            if not shp_file:
-                raise ValueError("❌ No .shp file found in the zip archive.")
-            gdf = gpd.read_file(shp_file)
-
-        # B. Handle Single Files
-        elif file_path.lower().endswith(('.kml', '.geojson', '.json')):
-            # Note: KML requires 'fiona' library installed
-            gdf = gpd.read_file(file_path)
-        else:
-            raise ValueError("❌ Unsupported format. Please upload .zip, .kml, or .geojson")
-
-        # C. Validation & Reprojection
-        if gdf is None or gdf.empty:
-            raise ValueError("❌ Input file contained no geometries!")
+        gdf = _load_frame(file_path)
 
-        # Standardize Coordinate Reference System to WGS84 (Lat/Lon)
-        if gdf.crs is not None and gdf.crs.to_string() != "EPSG:4326":
-            print(f"🔄 Reprojecting from {gdf.crs} to EPSG:4326...")
-            gdf = gdf.to_crs(epsg=4326)
-
-        # D. Geometry Cleanup
-        combined_geom = gdf.unary_union
-        combined_geom = _extract_single_polygon(combined_geom)
+        # Geometry Cleanup (2D, snapped, within the vertex budget)
+        combined_geom, simplification = _clean_geometry(gdf.unary_union)
+        if simplification["vertices_out"] < simplification["vertices_in"]:
+            print(f"✂️ Simplified lease: {simplification['vertices_in']} -> {simplification['vertices_out']} "
+                  f"vertices ({simplification['area_error_pct']}% area error)")
+        if not simplification["budget_met"]:
+            print(f"⚠️ Lease vertex budget not met: {simplification['vertices_out']} > {LEASE_MAX_VERTICES} "
+                  f"(too many rings to simplify further)")
+        if report is not None:
+            report.update(simplification)
 
-        # E. Output Generation
-        mapping = shapely.geometry.mapping(combined_geom)
-        safe_geojson = _sanitize_coords(mapping)
+        # Output Generation (serialised by GEOS, plain Python floats)
+        safe_geojson = json.loads(shapely.to_geojson(combined_geom))
 
         if 'type' not in safe_geojson or 'coordinates' not in safe_geojson:
             raise ValueError("❌ Processed geometry is invalid.")
@@ -111,7 +210,68 @@ def process_lease_file(file_path):
     except Exception as e:
         print(f"⚠️ File Processing Error: {e}")
         return None
-    finally:
-        # Cleanup temp directory
-        if os.path.exists(extract_path):
-            shutil.rmtree(extract_path)
\ No newline at end of file
+
+def _dedupe_lease_ids(leases):
+    """Suffixes repeated lease IDs (-2, -3, ...) so every per-lease result keeps its own row."""
+    taken = {lease["lease_id"] for lease in leases}
+    seen = set()
+    renamed = 0
+    for lease in leases:
+        lease_id = lease["lease_id"]
+        if lease_id in seen:
+            n = 2
+            while f"{lease_id}-{n}" in taken:
+                n += 1
+            lease["lease_id"] = f"{lease_id}-{n}"
+            taken.add(lease["lease_id"])
+            renamed += 1
+        seen.add(lease["lease_id"])
+    if renamed:
+        print(f"⚠️ {renamed} duplicate lease IDs renamed with a -N suffix")
+
+def process_lease_features(file_path, id_field=None):
+    """
+    Per-lease variant of process_lease_file: keeps every feature separate and
+    returns [{"lease_id", "geometry"}, ...] (None on error). The ID comes from
+    `id_field`, else the first LEASE_ID_FIELDS column present, else the feature index;
+    repeated IDs get a -2, -3, ... suffix.
+    The vertex budget is shared across the features.
+    """
+    print(f"📂 Processing input file (per lease): {os.path.basename(file_path)}")
+
+    try:
+        import pandas as pd
+        import pyogrio
+        fields = list(pyogrio.read_info(_lease_path(file_path))["fields"])
+        if id_field and id_field not in fields:
+            raise ValueError(f"❌ Lease ID field '{id_field}' not found (fields: {fields})")
+        id_field = id_field or next((f for f in LEASE_ID_FIELDS if f in fields), None)
+        gdf = _load_frame(file_path, [id_field] if id_field else ())
+
+        # Even shares of the budget; what the small features leave over goes to the
+        # large ones, and no feature is asked for fewer vertices than its rings need
+        vertices = shapely.get_num_coordinates(np.asarray(gdf.geometry.values, dtype=object))
+        share = LEASE_MAX_VERTICES // len(gdf)
+        large = vertices > share
+        if large.any():
+            share = max(share, (LEASE_MAX_VERTICES - int(vertices[~large].sum())) // int(large.sum()))
+        leases = []
+        ids = [None if pd.isna(v) else v for v in gdf[id_field]] if id_field else [None] * len(gdf)
+        for index, (geom, lease_id) in enumerate(zip(gdf.geometry, ids)):
+            if geom is None or geom.is_empty:
+                continue
+            budget = max(share, MIN_FEATURE_VERTICES, MIN_RING_VERTICES * ring_count(geom))
+            geom, _ = _clean_geometry(geom, max_vertices=budget)
+            leases.append({
+                "lease_id": str(lease_id) if lease_id is not None else f"feature-{index}",
+                "geometry": json.loads(shapely.to_geojson(geom)),
+            })
+        if not leases:
+            raise ValueError("❌ Input file contained no geometries!")
+        _dedupe_lease_ids(leases)
+        print(f"🧾 {len(leases)} leases (ID field: {id_field or 'feature index'})")
+        return leases
+
+    except Exception as e:
+        print(f"⚠️ File Processing Error: {e}")
+        return None
@@ -0,0 +1,126 @@
+"""
+Focal (neighbourhood) filters for the local raster path.
+
+Every filter is built on a summed-area table (integral image), so the cost of a
+rectangle sum is four lookups no matter the radius. A disk is described as a stack
+of horizontal bands, one rectangle each:
+
+  * exact     -> one band per row offset, O(r) per pixel, same footprint as EE circle
+  * bands=k   -> k bands of mean row width (area within a pixel per row), O(k) per pixel,
+                 i.e. O(1) in the radius
+
+Masked / NaN / nodata pixels are ignored: sums and counts are taken over valid pixels
+only, which is how Earth Engine treats masked inputs in focal_mean / focal_mode.
+
+With `quantum` set, values are snapped to integer multiples of it and summed in int64.
+Integer sums are exact, so a pixel's result no longer depends on where its tile starts.
+"""
+import math
+
+import numpy as np
+
+
+def disk_bands(radius, bands=None):
+    """
+    Horizontal bands (dy0, dy1, half_width) covering a disk of `radius` pixels
+    (offsets with dx² + dy² <= r², like kernelType='circle'). With `bands`, the
+    rows of each group share one width (their mean, rounded to an odd number of
+    pixels), so the footprint only approximates the disk: each row is off by the
+    difference from its true width, and the total area by up to one pixel per row.
+    Means stay normalised: focal_mean divides by the valid-pixel count of this
+    same footprint, not by the disk's area.
+    """
+    half_widths = [math.isqrt(radius * radius - dy * dy) for dy in range(radius + 1)]
+    if bands is None or bands > radius:
+        return [(dy, dy, half_widths[abs(dy)]) for dy in range(-radius, radius + 1)]
+
+    # Split |dy| = 0..r into `bands` groups, each one rectangle of the group's mean row width
+    edges = sorted({int(round(e)) for e in np.linspace(0, radius + 1, bands + 1)})
+    out = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        rows = range(lo, hi)
+        mean_width = sum(2 * half_widths[dy] + 1 for dy in rows) / len(rows)
+        half_width = max(int(round((mean_width - 1) / 2)), 0)
+        if lo == 0:
+            out.append((-(hi - 1), hi - 1, half_width))
+        else:
+            out.append((lo, hi - 1, half_width))
+            out.append((-(hi - 1), -lo, half_width))
+    return out
+
+
+def summed_area_table(values, pad=0):
+    """Integral image with a leading zero row/column, optionally zero-padded by `pad`."""
+    if pad:
+        values = np.pad(values, pad)
+    dtype = np.int64 if np.issubdtype(values.dtype, np.integer) or values.dtype == bool else np.float64
+    sat = np.zeros((values.shape[0] + 1, values.shape[1] + 1), dtype=dtype)
+    np.cumsum(values, axis=0, dtype=dtype, out=sat[1:, 1:])
+    np.cumsum(sat[1:, 1:], axis=1, out=sat[1:, 1:])
+    return sat
+
+
+def band_sums(sat, shape, bands, pad):
+    """Sum over the band-described footprint for every pixel, from a padded SAT."""
+    height, width = shape
+    out = np.zeros(shape, dtype=sat.dtype)
+    for dy0, dy1, half_width in bands:
+        top, bottom = pad + dy0, pad + dy1 + 1
+        left, right = pad - half_width, pad + half_width + 1
+        out += sat[bottom:bottom + height, right:right + width]
+        out -= sat[top:top + height, right:right + width]
+        out -= sat[bottom:bottom + height, left:left + width]
+        out += sat[top:top + height, left:left + width]
+    return out
+
+
+def _valid_mask(values, valid, nodata):
+    if valid is None:
+        valid = np.isfinite(values) if np.issubdtype(values.dtype, np.floating) else np.ones(values.shape, bool)
+    if nodata is not None:
+        valid = valid & (values != nodata)
+    return valid
+
+
+def focal_mean(values, bands, pad, valid=None, nodata=None, quantum=None):
+    """NaN-aware mean over a band footprint. Pixels with no valid neighbour are NaN."""
+    valid = _valid_mask(values, valid, nodata)
+    if quantum:
+        data = np.where(valid, np.rint(np.where(valid, values, 0) / quantum), 0).astype(np.int64)
+    else:
+        data = np.where(valid, values, 0.0).astype(np.float64)
+
+    totals = band_sums(summed_area_table(data, pad), values.shape, bands, pad)
+    counts = band_sums(summed_area_table(valid, pad), values.shape, bands, pad)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = totals / counts
+    if quantum:
+        means *= quantum
+    means[counts == 0] = np.nan
+    return means
+
+
+def box_mean(values, radius, valid=None, nodata=None, quantum=None):
+    """Mean over a (2r+1) x (2r+1) square, O(1) per pixel."""
+    return focal_mean(values, [(-radius, radius, radius)], radius, valid, nodata, quantum)
+
+
+def circular_mean(values, radius, valid=None, nodata=None, bands=None, quantum=None):
+    """
+    Mean over a disk of `radius` pixels. `bands=None` is the exact circle;
+    a small `bands` count gives a constant-cost approximation.
+    """
+    return focal_mean(values, disk_bands(radius, bands), radius, valid, nodata, quantum)
+
+
+def binary_mode(mask, radius, valid=None, bands=None):
+    """
+    Majority filter for a binary mask over a disk. For two classes the running
+    histogram is just (ones, valid) counts, both exact int64 SAT sums.
+    Ties resolve to 0 (the lower class), pixels with no valid neighbour to False.
+    """
+    valid = np.ones(mask.shape, bool) if valid is None else valid
+    footprint = disk_bands(radius, bands)
+    ones = band_sums(summed_area_table(mask & valid, radius), mask.shape, footprint, radius)
+    counts = band_sums(summed_area_table(valid, radius), mask.shape, footprint, radius)
+    return 2 * ones > counts
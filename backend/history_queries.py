@@ -0,0 +1,116 @@
+import base64
+import datetime
+
+from sqlalchemy import func, tuple_
+
+from models import Inspection, InspectionDailyStats
+
+# --- CONFIGURATION ---
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
+
+# Dashboard projection: no geometry, no result JSON, no artifact URLs
+# (the full job, URLs included, is one GET /api/jobs/{job_id} away)
+HISTORY_COLUMNS = (Inspection.id, Inspection.job_id, Inspection.filename, Inspection.state,
+                   Inspection.status, Inspection.illegal_area_m2, Inspection.volume_m3,
+                   Inspection.avg_depth_m, Inspection.truckloads, Inspection.created_at)
+
+
+def encode_cursor(created_at, row_id):
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor(); ValueError on anything malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def _day_bounds(query, column, start=None, end=None):
+    """Inclusive date range; `end` covers the whole day."""
+    if start is not None:
+        query = query.filter(column >= start)
+    if end is not None:
+        query = query.filter(column < end + datetime.timedelta(days=1))
+    return query
+
+
+def history_page(db, limit=HISTORY_PAGE_SIZE, cursor=None, start=None, end=None,
+                 state="done", status=None):
+    """
+    One page of the history, newest first. Keyset pagination on (created_at, id):
+    every page is an index range scan, however deep the client scrolls.
+    """
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+    query = db.query(*HISTORY_COLUMNS)
+    if state:
+        query = query.filter(Inspection.state == state)
+    if status:
+        query = query.filter(Inspection.status == status)
+    query = _day_bounds(query, Inspection.created_at, start, end)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Inspection.created_at, Inspection.id) < tuple_(created_at, row_id))
+
+    rows = (query.order_by(Inspection.created_at.desc(), Inspection.id.desc())
+            .limit(limit + 1)  # One extra row tells us whether there is a next page
+            .all())
+    items = [dict(row._mapping) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def record_done(db, row):
+    """
+    Adds a finished inspection to its day's aggregates. Called in the same
+    transaction that marks the job done; the upsert increments atomically.
+    """
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    table = InspectionDailyStats.__table__
+    values = {
+        "day": (row.created_at or datetime.datetime.utcnow()).date(),
+        "inspections": 1,
+        "illegal_area_m2": row.illegal_area_m2 or 0.0,
+        "volume_m3": row.volume_m3 or 0.0,
+        "truckloads": row.truckloads or 0,
+    }
+    statement = insert(table).values(**values)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.day],
+        set_={name: table.c[name] + statement.excluded[name]
+              for name in ("inspections", "illegal_area_m2", "volume_m3", "truckloads")},
+    )
+    db.execute(statement)
+
+
+def summary(db, start=None, end=None):
+    """Totals over the finished inspections, read from the per-day aggregates."""
+    query = db.query(
+        func.coalesce(func.sum(InspectionDailyStats.inspections), 0),
+        func.coalesce(func.sum(InspectionDailyStats.illegal_area_m2), 0.0),
+        func.coalesce(func.sum(InspectionDailyStats.volume_m3), 0.0),
+        func.coalesce(func.sum(InspectionDailyStats.truckloads), 0),
+    )
+    if start is not None:
+        query = query.filter(InspectionDailyStats.day >= start)
+    if end is not None:
+        query = query.filter(InspectionDailyStats.day <= end)
+    inspections, area, volume, trucks = query.one()
+    return {
+        "inspections": int(inspections),
+        "illegal_area_m2": round(float(area), 2),
+        "volume_m3": round(float(volume), 2),
+        "truckloads": int(trucks),
+    }
@@ -1,9 +1,33 @@
+from sqlalchemy import text
 from database import engine, Base
 import models
 
+# Columns added after the first release (create_all() never alters existing tables)
+MIGRATIONS = [
+    "ALTER TABLE inspections ADD COLUMN IF NOT EXISTS state VARCHAR DEFAULT 'done'",
+    "ALTER TABLE inspections ADD COLUMN IF NOT EXISTS error VARCHAR",
+    "ALTER TABLE inspections ADD COLUMN IF NOT EXISTS result JSON",
+    "ALTER TABLE inspections ADD COLUMN IF NOT EXISTS started_at TIMESTAMP",
+    "ALTER TABLE inspections ADD COLUMN IF NOT EXISTS finished_at TIMESTAMP",
+    "CREATE INDEX IF NOT EXISTS ix_inspections_state ON inspections (state)",
+    "ALTER TABLE inspections ADD COLUMN IF NOT EXISTS legal_geometry geometry(MULTIPOLYGON, 4326)",
+    "CREATE INDEX IF NOT EXISTS idx_inspections_geometry ON inspections USING GIST (geometry)",
+    "CREATE INDEX IF NOT EXISTS idx_inspections_legal_geometry ON inspections USING GIST (legal_geometry)",
+    "CREATE INDEX IF NOT EXISTS ix_inspections_state_created_id ON inspections (state, created_at, id)",
+    # Backfill the history aggregates from inspections finished before the table existed
+    """INSERT INTO inspection_daily_stats (day, inspections, illegal_area_m2, volume_m3, truckloads)
+       SELECT CAST(created_at AS DATE), COUNT(*), COALESCE(SUM(illegal_area_m2), 0),
+              COALESCE(SUM(volume_m3), 0), COALESCE(SUM(truckloads), 0)
+       FROM inspections WHERE state = 'done' GROUP BY CAST(created_at AS DATE)
+       ON CONFLICT (day) DO NOTHING""",
+]
+
 print("⏳ Creating Database Tables...")
 try:
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for statement in MIGRATIONS:
+            conn.execute(text(statement))
     print("✅ Database Tables Created Successfully on Port 5433!")
 except Exception as e:
-    print(f"❌ Error: {e}")
\ No newline at end of file
+    print(f"❌ Error: {e}")
@@ -0,0 +1,202 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+
+# --- CONFIGURATION ---
+# In-process metrics, exposed by GET /metrics in the Prometheus text format.
+# Recording is a dict lookup and a bisect under a lock: a few microseconds per timed
+# block (benchmarks/bench_instrumentation.py), against hot paths of milliseconds or more.
+INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION", "1") != "0"
+METRICS_PREFIX = "mineguard"
+
+LATENCY_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SIZE_BUCKETS_BYTES = tuple(2 ** k * 1024 for k in range(0, 17, 2))   # 1 KB .. 64 MB
+
+# name: (type, help, buckets)
+METRICS = {
+    "ingest_seconds": ("histogram", "Lease file ingest, whole file (kind: union or features)", LATENCY_BUCKETS_S),
+    "ingest_stage_seconds": ("histogram", "Lease file ingest stages: read, reproject, clean", LATENCY_BUCKETS_S),
+    "ee_fetch_seconds": ("histogram", "Earth Engine getInfo as seen by the job (queueing and retries included)",
+                         LATENCY_BUCKETS_S),
+    "ee_request_seconds": ("histogram", "Earth Engine requests, successful attempts", LATENCY_BUCKETS_S),
+    "ee_requests_total": ("counter", "Earth Engine request attempts by outcome (ok, retry, failed)", None),
+    "artifact_build_seconds": ("histogram", "Artifact builds: map_2d (geemap HTML), model_3d (TIN), pdf",
+                               LATENCY_BUCKETS_S),
+    "db_commit_seconds": ("histogram", "Database commits (flush included)", LATENCY_BUCKETS_S),
+    "job_seconds": ("histogram", "Analysis job run time", LATENCY_BUCKETS_S),
+    "jobs_in_flight": ("gauge", "Jobs running, per queue", None),
+    "jobs_queued": ("gauge", "Jobs waiting for a worker, per queue", None),
+    "upload_size_bytes": ("histogram", "Uploaded lease file sizes", SIZE_BUCKETS_BYTES),
+}
+
+
+class Histogram:
+    """Fixed buckets like a Prometheus histogram; counts per bucket, cumulated on read."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_S):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)    # Last slot: over the last bound (+Inf)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        total, out = 0, []
+        for count in self.counts[:-1]:
+            total += count
+            out.append(total)
+        return out
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (inf past the last bucket)."""
+        target = q * self.count
+        for bound, count in zip(self.buckets, self.cumulative()):
+            if count >= target:
+                return bound
+        return float("inf")
+
+    def as_dict(self):
+        return {"count": self.count, "sum_s": round(self.sum, 3),
+                "p50_s": self.quantile(0.5), "p95_s": self.quantile(0.95),
+                "buckets": {str(bound): count for bound, count in zip(self.buckets, self.cumulative())}}
+
+
+_lock = threading.Lock()
+_histograms = {}      # (name, labels) -> Histogram
+_values = {}          # (name, labels) -> counter / gauge value
+# Per-job timings of the job running in this context (see job_timings())
+_job = contextvars.ContextVar("job_timings", default=None)
+
+
+def _key(name, labels):
+    items = tuple(labels.items())
+    return name, (tuple(sorted(items)) if len(items) > 1 else items)
+
+
+def observe(name, value, **labels):
+    if not INSTRUMENTATION_ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram(METRICS[name][2])
+        histogram.observe(value)
+    job = _job.get()
+    if job is not None:
+        entry = job.setdefault(name, {}).setdefault(",".join(map(str, labels.values())) or "total",
+                                                    {"count": 0, "seconds": 0.0})
+        entry["count"] += 1
+        entry["seconds"] += value
+
+
+def inc(name, value=1, **labels):
+    if not INSTRUMENTATION_ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _values[key] = _values.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    with _lock:
+        _values[_key(name, labels)] = value
+
+
+class timer:
+    """`with timer("ingest_seconds", kind="union"):` observes the block's wall time."""
+
+    __slots__ = ("name", "labels", "started")
+
+    def __init__(self, name, **labels):
+        self.name, self.labels = name, labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class job_timings:
+    """
+    Collects the timings recorded by this thread while the block runs, as
+    {metric: {labels: {"count", "seconds"}}}, and observes job_seconds on exit.
+    """
+
+    def __enter__(self):
+        self.timings = {}
+        self.started = time.perf_counter()
+        self._token = _job.set(self.timings)
+        return self
+
+    def __exit__(self, *exc):
+        _job.reset(self._token)
+        observe("job_seconds", time.perf_counter() - self.started)
+        for entries in self.timings.values():
+            for entry in entries.values():
+                entry["seconds"] = round(entry["seconds"], 3)
+        return False
+
+
+def instrument_sessions(session_factory):
+    """Times every commit of sessions made by `session_factory` (a sessionmaker)."""
+    from sqlalchemy import event
+
+    @event.listens_for(session_factory, "before_commit")
+    def _before_commit(session):
+        session.info["commit_started"] = time.perf_counter()
+
+    @event.listens_for(session_factory, "after_commit")
+    def _after_commit(session):
+        started = session.info.pop("commit_started", None)
+        if started is not None:
+            observe("db_commit_seconds", time.perf_counter() - started)
+
+
+# --- PROMETHEUS TEXT FORMAT ---
+def _labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _number(value):
+    return "+Inf" if value == float("inf") else repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Every metric in the Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        histograms = {key: (h.buckets, h.cumulative(), h.count, h.sum) for key, h in _histograms.items()}
+        values = dict(_values)
+
+    lines = []
+    for name, (kind, help_text, _) in METRICS.items():
+        series = sorted((labels, data) for (metric, labels), data in
+                        (histograms if kind == "histogram" else values).items() if metric == name)
+        if not series:
+            continue
+        full = f"{METRICS_PREFIX}_{name}"
+        lines += [f"# HELP {full} {help_text}", f"# TYPE {full} {kind}"]
+        for labels, data in series:
+            if kind != "histogram":
+                lines.append(f"{full}{_labels(labels)} {_number(data)}")
+                continue
+            buckets, cumulative, count, total = data
+            for bound, running in zip(buckets, cumulative):
+                lines.append(f"{full}_bucket{_labels(labels, [('le', _number(bound))])} {running}")
+            lines.append(f"{full}_bucket{_labels(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{full}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{full}_count{_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,153 @@
+import datetime
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import history_queries
+from models import Inspection
+
+# --- CONFIGURATION ---
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))          # Analyses running at once
+JOB_QUEUE_DEPTH = int(os.getenv("JOB_QUEUE_DEPTH", "16"))  # Jobs allowed to wait behind them
+
+# Job lifecycle (Inspection.state)
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobQueueFull(Exception):
+    """Raised when every worker is busy and the waiting queue is at capacity."""
+
+
+class MemoryJobStore:
+    """In-process job store (tests, CLI); same interface as SqlJobStore."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id] = {"job_id": job_id, "created_at": datetime.datetime.utcnow(), **fields}
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+
+class SqlJobStore:
+    """Persists job state on the Inspection row (Postgres in production, SQLite in tests)."""
+
+    # Everything except the geometry, which is not JSON serialisable
+    FIELDS = ("job_id", "filename", "state", "error", "status", "illegal_area_m2", "volume_m3",
+              "avg_depth_m", "truckloads", "report_url", "map_url", "model_url", "result",
+              "created_at", "started_at", "finished_at")
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    def create(self, job_id, **fields):
+        db = self.session_factory()
+        try:
+            db.add(Inspection(job_id=job_id, **fields))
+            db.commit()
+        finally:
+            db.close()
+
+    def update(self, job_id, **fields):
+        db = self.session_factory()
+        try:
+            row = db.query(Inspection).filter(Inspection.job_id == job_id).one()
+            finished = fields.get("state") == DONE and row.state != DONE
+            for name, value in fields.items():
+                setattr(row, name, value)
+            if finished:
+                # History aggregates move in the same transaction as the row
+                history_queries.record_done(db, row)
+            db.commit()
+        finally:
+            db.close()
+
+    def get(self, job_id):
+        db = self.session_factory()
+        try:
+            row = db.query(Inspection).filter(Inspection.job_id == job_id).first()
+            return {name: getattr(row, name) for name in self.FIELDS} if row else None
+        finally:
+            db.close()
+
+
+class JobQueue:
+    """
+    Bounded worker pool for analysis jobs. submit() never blocks: it records the job
+    as queued and returns, or raises JobQueueFull when the backlog is at capacity.
+    """
+
+    def __init__(self, store, workers=JOB_WORKERS, max_queue=JOB_QUEUE_DEPTH):
+        self.store = store
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mineguard-job")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+
+    def submit(self, job_id, fn, *args, fields=None, progress=None, **kwargs):
+        """
+        Queues fn(*args, **kwargs). fn returns the Inspection fields to save when it
+        finishes; any exception marks the job failed. A ProgressTracker passed as
+        `progress` is handed to fn and also gets the db_saved / done / failed events.
+        """
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                raise JobQueueFull(f"Job queue is full ({self._pending} jobs pending)")
+            self._pending += 1
+
+        try:
+            self.store.create(job_id, state=QUEUED, **(fields or {}))
+            if progress is not None:
+                kwargs["progress"] = progress
+                progress.stage("queued", job_id=job_id)
+            self._executor.submit(self._run, job_id, fn, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        return job_id
+
+    def _run(self, job_id, fn, args, kwargs):
+        progress = kwargs.get("progress")
+        with self._lock:
+            self._running += 1
+        try:
+            self.store.update(job_id, state=RUNNING, started_at=datetime.datetime.utcnow())
+            fields = fn(*args, **kwargs) or {}
+            self.store.update(job_id, state=DONE, finished_at=datetime.datetime.utcnow(), **fields)
+            if progress:
+                progress.stage("db_saved")
+                progress.stage("done", job_id=job_id, result=fields.get("result"))
+        except Exception as e:
+            print(f"❌ Job {job_id} failed: {e}")
+            self.store.update(job_id, state=FAILED, error=str(e), finished_at=datetime.datetime.utcnow())
+            if progress:
+                progress.stage("failed", job_id=job_id, error=str(e))
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._running -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._pending - self._running,
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
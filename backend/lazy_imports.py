@@ -0,0 +1,44 @@
+import importlib
+import threading
+import time
+
+# --- DEFERRED IMPORTS ---
+# Heavy client libraries (ee pulls in googleapiclient, geemap pulls in IPython and
+# ipyleaflet) are imported on first attribute access instead of at API start-up.
+# First-use import times are kept for /readyz and benchmarks/bench_startup.py.
+IMPORT_SECONDS = {}
+_lock = threading.Lock()
+
+
+class LazyModule:
+    """Module stand-in that imports `name` the first time one of its attributes is used."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            with _lock:
+                if self._module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    IMPORT_SECONDS[self._name] = round(time.perf_counter() - started, 3)
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self._name}'{' (loaded)' if self._module is not None else ''}>"
+
+
+def lazy_module(name):
+    return LazyModule(name)
+
+
+def import_seconds():
+    """{module: seconds} of the deferred imports done so far."""
+    with _lock:
+        return dict(IMPORT_SECONDS)
@@ -0,0 +1,183 @@
+import os
+import threading
+import time
+
+import numpy as np
+import shapely
+import shapely.geometry
+
+from file_processor import reproject, utm_transformers
+
+# --- CONFIGURATION ---
+REGISTRY_REFRESH_S = float(os.getenv("REGISTRY_REFRESH_S", "60"))  # Max staleness before a DB delta read
+# Ids below the highest seen that are read again: a transaction can commit a lower id late
+REGISTRY_ID_OVERLAP = int(os.getenv("REGISTRY_ID_OVERLAP", "1000"))
+
+# Pit classes
+OWN_LEASE = "own_lease"
+OTHER_LICENSED = "other_licensed"
+UNLICENSED = "unlicensed"
+
+
+class LeaseRegistry:
+    """
+    Every known lease polygon in a shapely STRtree. refresh() only reads leases
+    added since the last refresh: ids above the highest seen, plus the unseen ones
+    in the REGISTRY_ID_OVERLAP ids below it (ids are allocated in order but can
+    commit out of order). The tree itself is rebuilt from the in-memory arrays,
+    which takes ~0.1 s per 100k leases.
+    """
+
+    def __init__(self):
+        self.lease_ids = np.empty(0, dtype=object)
+        self.geometries = np.empty(0, dtype=object)
+        self.tree = shapely.STRtree(self.geometries)
+        self.last_id = 0
+        self.recent_ids = set()     # Ids loaded within REGISTRY_ID_OVERLAP of last_id
+        self.refreshed_at = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.geometries)
+
+    def add_many(self, lease_ids, geometries):
+        """Adds leases (EPSG:4326 shapely geometries) and swaps in a new tree."""
+        with self._lock:
+            lease_ids = np.concatenate([self.lease_ids, np.asarray(lease_ids, dtype=object)])
+            geometries = np.concatenate([self.geometries, np.asarray(geometries, dtype=object)])
+            tree = shapely.STRtree(geometries)
+            # Readers see either the old or the new (ids, geometries, tree) triple
+            self.lease_ids, self.geometries, self.tree = lease_ids, geometries, tree
+
+    def refresh(self, db):
+        """Loads leases added since the last refresh; returns how many were new."""
+        from sqlalchemy import func
+
+        from models import Lease
+
+        low = max(self.last_id - REGISTRY_ID_OVERLAP, 0)
+        query = db.query(Lease.id, Lease.lease_id, func.ST_AsBinary(Lease.geometry)).filter(Lease.id > low)
+        if self.recent_ids:
+            query = query.filter(Lease.id.notin_(self.recent_ids))
+        rows = [row for row in query.order_by(Lease.id).all() if row[0] not in self.recent_ids]
+        if rows:
+            ids, lease_ids, wkb = zip(*rows)
+            self.add_many(lease_ids, shapely.from_wkb([bytes(w) for w in wkb]))
+            self.last_id = max(self.last_id, *ids)
+            floor = self.last_id - REGISTRY_ID_OVERLAP
+            self.recent_ids = {i for i in self.recent_ids.union(ids) if i > floor}
+        self.refreshed_at = time.time()
+        return len(rows)
+
+    def classify(self, pits, own_geometry=None):
+        """
+        Classifies pit polygons against every registered lease in one bulk STRtree
+        query. Each pit gets the class holding most of its area: its own lease
+        (`own_geometry`, the uploaded lease), another licensed lease, or no lease.
+        Returns (classes, fractions, lease ids) with fractions = [own, other, unlicensed].
+        """
+        pits = np.asarray(pits, dtype=object)
+        lease_ids, geometries, tree = self.lease_ids, self.geometries, self.tree
+        areas = shapely.area(pits)
+        fractions = np.zeros((len(pits), 3))
+
+        if own_geometry is not None:
+            shapely.prepare(own_geometry)
+            own_area = shapely.area(shapely.intersection(pits, own_geometry))
+            fractions[:, 0] = np.divide(own_area, areas, out=np.zeros_like(areas), where=areas > 0)
+
+        matched = np.full(len(pits), None, dtype=object)
+        if len(geometries) and len(pits):
+            pit_idx, lease_idx = tree.query(pits, predicate="intersects")
+            shared = shapely.intersection(pits[pit_idx], geometries[lease_idx])
+            overlap = shapely.area(shared)
+            if own_geometry is not None:
+                # Registered leases overlapping the uploaded one (e.g. itself) count as own
+                overlap -= shapely.area(shapely.intersection(shared, own_geometry))
+            other = np.bincount(pit_idx, weights=overlap, minlength=len(pits))
+            fractions[:, 1] = np.divide(other, areas, out=np.zeros_like(areas), where=areas > 0)
+            # The lease holding most of each pit (pairs are sorted by overlap, largest last)
+            order = np.lexsort((overlap, pit_idx))
+            matched[pit_idx[order]] = lease_ids[lease_idx[order]]
+
+        fractions[:, :2] = np.clip(fractions[:, :2], 0.0, 1.0)
+        fractions[:, 1] = np.minimum(fractions[:, 1], 1.0 - fractions[:, 0])
+        fractions[:, 2] = 1.0 - fractions[:, 0] - fractions[:, 1]
+        classes = np.array([OWN_LEASE, OTHER_LICENSED, UNLICENSED], dtype=object)[fractions.argmax(axis=1)]
+        matched[classes != OTHER_LICENSED] = None
+        return classes, fractions, matched
+
+    def stats(self):
+        return {"leases": len(self), "last_id": self.last_id, "refreshed_at": self.refreshed_at}
+
+
+_registry = LeaseRegistry()
+_refresh_lock = threading.Lock()
+
+
+def get_registry(session_factory=None, max_age_s=REGISTRY_REFRESH_S):
+    """The process-wide registry, refreshed from the database when older than max_age_s."""
+    stale = _registry.refreshed_at is None or time.time() - _registry.refreshed_at > max_age_s
+    if session_factory is not None and stale and _refresh_lock.acquire(blocking=False):
+        try:
+            db = session_factory()
+            try:
+                new = _registry.refresh(db)
+                if new:
+                    print(f"📚 Lease registry: +{new} leases ({len(_registry)} total)")
+            finally:
+                db.close()
+        except Exception as e:
+            print(f"⚠️ Lease registry refresh failed: {e}")
+        finally:
+            _refresh_lock.release()
+    return _registry
+
+
+def register_leases(db, leases, holder=None):
+    """Stores process_lease_features() output in the leases table; existing lease IDs are skipped."""
+    from geoalchemy2.shape import from_shape
+
+    from models import Lease
+    from pit_vectors import to_multipolygon
+
+    wanted = [lease["lease_id"] for lease in leases]
+    existing = {row.lease_id for row in db.query(Lease.lease_id).filter(Lease.lease_id.in_(wanted))}
+    new = [lease for lease in leases if lease["lease_id"] not in existing]
+    db.add_all([
+        Lease(lease_id=lease["lease_id"], holder=holder,
+              geometry=from_shape(to_multipolygon(shapely.geometry.shape(lease["geometry"])), srid=4326))
+        for lease in new
+    ])
+    db.commit()
+    return {"added": len(new), "skipped": len(existing)}
+
+
+def classify_pits(registry, vectors, own_geojson=None):
+    """
+    Legality of every detected pit (both classes of pit_vectors.to_geojson()
+    output) against the registry. Returns areas (m²) per outcome and the other
+    licensed leases involved.
+    """
+    pits = [part for geojson in (vectors or {}).values() if geojson
+            for part in shapely.get_parts(shapely.geometry.shape(geojson))]
+    summary = {OWN_LEASE: 0.0, OTHER_LICENSED: 0.0, UNLICENSED: 0.0}
+    result = {"pits": len(pits), "area_m2": summary, "pit_counts": dict.fromkeys(summary, 0),
+              "other_leases": {}, "registry_leases": len(registry)}
+    if not pits:
+        return result
+
+    own = shapely.geometry.shape(own_geojson) if own_geojson else None
+    classes, fractions, matched = registry.classify(pits, own)
+
+    # Areas in m² on the local UTM grid
+    forward, _ = utm_transformers(pits[0])
+    areas = shapely.area(reproject(np.asarray(pits, dtype=object), forward))
+    for k, name in enumerate((OWN_LEASE, OTHER_LICENSED, UNLICENSED)):
+        summary[name] = round(float((fractions[:, k] * areas).sum()), 2)
+        result["pit_counts"][name] = int((classes == name).sum())
+    for lease_id, area, fraction in zip(matched, areas, fractions[:, 1]):
+        if lease_id is not None:
+            total = result["other_leases"].get(lease_id, 0.0) + float(area * fraction)
+            result["other_leases"][lease_id] = round(total, 2)
+    return result
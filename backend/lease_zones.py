@@ -0,0 +1,77 @@
+import shapely
+import shapely.geometry
+import shapely.ops
+
+from file_processor import reproject, utm_transformers
+
+# --- CONFIGURATION ---
+ZONE_BUFFER_M = 2000   # Same search buffer as the detection pipelines
+
+# Per-lease zones (a pit is counted once per lease whose buffer it falls in)
+ZONE_LEGAL = "legal"              # Inside the lease itself
+ZONE_ILLEGAL = "illegal"          # In the lease's buffer, outside every lease in the file
+ZONE_OTHER_LEASE = "other_lease"  # In the lease's buffer, inside a neighbouring lease
+ZONES = (ZONE_LEGAL, ZONE_ILLEGAL, ZONE_OTHER_LEASE)
+
+
+def build_lease_zones(leases, buffer_m=ZONE_BUFFER_M):
+    """
+    Splits every lease's search area into its zones, in metres on the local UTM grid.
+    `leases` is the output of process_lease_features(); returns a list of
+    {"lease_id", "zone", "geometry"} with EPSG:4326 shapely geometries (empty zones dropped).
+    """
+    geoms = [shapely.geometry.shape(lease["geometry"]) for lease in leases]
+    forward, inverse = utm_transformers(shapely.ops.unary_union(geoms))
+    projected = [reproject(g, forward) for g in geoms]
+    all_leases = shapely.union_all(projected)
+
+    zones = []
+    for lease, geom in zip(leases, projected):
+        search = geom.buffer(buffer_m)
+        ring = search.difference(geom)
+        for zone, part in ((ZONE_LEGAL, geom),
+                           (ZONE_ILLEGAL, search.difference(all_leases)),
+                           (ZONE_OTHER_LEASE, ring.intersection(all_leases))):
+            part = shapely.make_valid(part)
+            if not part.is_empty and part.area > 0:
+                zones.append({"lease_id": lease["lease_id"], "zone": zone, "geometry": reproject(part, inverse)})
+    return zones
+
+
+def lease_union(leases):
+    """Union of all leases (GeoJSON), the ROI of the whole-file run."""
+    union = shapely.union_all([shapely.geometry.shape(lease["geometry"]) for lease in leases])
+    return shapely.geometry.mapping(union)
+
+
+def summarize_zones(zone_sums, lease_ids):
+    """
+    Per-lease numbers from per-zone sums ({"lease_id", "zone", "area", "volume", "lid"},
+    lid = mean smoothed surface). Same naming as the whole-file metrics.
+    """
+    empty = {"area": 0.0, "volume": 0.0, "lid": 0.0}
+    by_lease = {lease_id: {zone: dict(empty) for zone in ZONES} for lease_id in lease_ids}
+    for row in zone_sums:
+        by_lease[row["lease_id"]][row["zone"]] = {
+            "area": row.get("area") or 0.0,
+            "volume": row.get("volume") or 0.0,
+            "lid": row.get("lid") or 0.0,
+        }
+
+    results = []
+    for lease_id, zones in by_lease.items():
+        legal, illegal, other = zones[ZONE_LEGAL], zones[ZONE_ILLEGAL], zones[ZONE_OTHER_LEASE]
+        results.append({
+            "lease_id": lease_id,
+            "legal_area_m2": round(legal["area"], 2),
+            "legal_vol_m3": round(legal["volume"], 2),
+            "legal_depth_m": round(legal["volume"] / legal["area"], 2) if legal["area"] > 0 else 0.0,
+            "illegal_area_m2": round(illegal["area"], 2),
+            "illegal_vol_m3": round(illegal["volume"], 2),
+            "illegal_depth_m": round(illegal["volume"] / illegal["area"], 2) if illegal["area"] > 0 else 0.0,
+            "other_lease_area_m2": round(other["area"], 2),
+            "other_lease_vol_m3": round(other["volume"], 2),
+            "lid_elevation": round(legal["lid"], 2) if legal["area"] > 0 else 0.0,
+            "truckloads": int(illegal["volume"] / 15),
+        })
+    return results
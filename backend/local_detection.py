@@ -0,0 +1,574 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import rasterio
+import shapely.geometry
+from rasterio.enums import Resampling
+from rasterio.features import rasterize, shapes
+from rasterio.vrt import WarpedVRT
+from rasterio.warp import transform_geom
+from rasterio.windows import Window, from_bounds
+from rasterio.windows import bounds as window_bounds
+from rasterio.windows import transform as window_transform
+
+import focal_kernels
+import lease_zones
+import mesh_lod
+import pit_inventory
+import pit_vectors
+import tile_cache
+from progress import ProgressTracker
+from metrics_engine import STATUS_ILLEGAL, STATUS_LEGAL
+from phase1_detection import (
+    ARTIFACT_FILES, ARTIFACT_MODE, DEFAULT_END, DEFAULT_START, DEM_SOURCE, MIN_DEPTH_THRESHOLD, MODEL_3D_FORMAT,
+    NDVI_THRESHOLD, OPTICAL_THRESHOLD, build_report_artifact, pdf_reporter, save_artifact_inputs,
+)
+
+# --- CONFIGURATION ---
+# Offline inputs: one GeoTIFF/COG per band, B8 defines the 10m working grid.
+LOCAL_RASTER_DIR = os.getenv("LOCAL_RASTER_DIR", "rasters")
+RASTER_FILES = {"B4": "B4.tif", "B8": "B8.tif", "B11": "B11.tif", "DEM": "DEM.tif"}
+REFERENCE_BAND = "B8"
+
+# Same geometry as the Earth Engine pipeline
+SEARCH_BUFFER_M = 2000
+SMOOTH_RADIUS_M = 250   # dem.focal_mean(radius=250, units="meters")
+MODE_RADIUS_M = 10      # triple_lock_mask.focal_mode(radius=10, units='meters')
+
+# Focal mean footprint: None = exact circle (like EE), N = N-band approximation (O(1) per pixel)
+SMOOTH_KERNEL_BANDS = int(os.getenv("SMOOTH_KERNEL_BANDS", "0")) or None
+# DEM sums are snapped to this step (metres) so focal sums are exact integers and tile-invariant
+DEM_QUANTUM = 1e-4
+
+# Block size (pixels per side, halo excluded). Bounds memory on scenes larger than RAM.
+BLOCK_SIZE = int(os.getenv("LOCAL_BLOCK_SIZE", "1024"))
+
+# Worker processes for the tiled path (1 = run in-process)
+LOCAL_WORKERS = int(os.getenv("LOCAL_WORKERS", "1"))
+
+# Sums are accumulated as fixed-point integers so the block layout never changes the result.
+FIXED_POINT_SCALE = 1e6
+
+DEFAULT_ROI = {
+    "type": "Polygon",
+    "coordinates": [[[86.40, 23.70], [86.45, 23.70], [86.45, 23.75], [86.40, 23.75], [86.40, 23.70]]],
+}
+
+
+def resolve_raster_paths(raster_paths=None, raster_dir=None):
+    """Fills in any band not given explicitly from LOCAL_RASTER_DIR."""
+    raster_dir = raster_dir or LOCAL_RASTER_DIR
+    paths = {band: os.path.join(raster_dir, name) for band, name in RASTER_FILES.items()}
+    paths.update(raster_paths or {})
+    missing = [band for band, path in paths.items() if not os.path.exists(path)]
+    if missing:
+        raise FileNotFoundError(f"❌ Missing local rasters for bands: {', '.join(missing)} (looked in {raster_dir})")
+    return paths
+
+
+def _to_fixed(values):
+    return int(np.rint(values * FIXED_POINT_SCALE).astype(np.int64).sum(dtype=np.int64))
+
+
+class LocalScene:
+    """
+    The four input bands warped onto the reference 10m grid, plus the lease
+    and search zone expressed in that grid's (projected) CRS.
+    """
+
+    def __init__(self, paths, lease_geojson=None, zones=None, search_buffer_m=SEARCH_BUFFER_M, cached_tiles=None):
+        self._sources = {band: rasterio.open(path) for band, path in paths.items()}
+        ref = self._sources[REFERENCE_BAND]
+        if ref.crs is None or not ref.crs.is_projected:
+            self.close()
+            raise ValueError("❌ Local backend needs a projected (metre) reference raster.")
+
+        self.crs = ref.crs
+        self.transform = ref.transform
+        self.res = abs(ref.transform.a)
+        self.pixel_area = abs(ref.transform.a * ref.transform.e)
+
+        # Every band is read through a VRT aligned to the reference grid (nearest, like EE's default)
+        self._vrts = {
+            band: WarpedVRT(src, crs=ref.crs, transform=ref.transform, width=ref.width,
+                            height=ref.height, resampling=Resampling.nearest)
+            for band, src in self._sources.items()
+        }
+        self.width, self.height = ref.width, ref.height
+
+        self.roi = shapely.geometry.shape(transform_geom("EPSG:4326", self.crs, lease_geojson or DEFAULT_ROI))
+        self.search_zone = self.roi.buffer(search_buffer_m)
+        # Per-lease zones (lease_zones.build_lease_zones), summed separately per block
+        self.zones = [
+            shapely.geometry.shape(transform_geom("EPSG:4326", self.crs, shapely.geometry.mapping(z["geometry"])))
+            for z in zones or []
+        ]
+
+        zone_window = from_bounds(*self.search_zone.bounds, transform=self.transform)
+        self.window = zone_window.round_offsets(op="floor").round_lengths(op="ceil")
+
+        self.smooth_radius_px = int(math.ceil(SMOOTH_RADIUS_M / self.res))
+        self.mode_radius_px = int(math.ceil(MODE_RADIUS_M / self.res))
+        # Mode needs triple-lock rows ±mode radius, which need depth rows ±smooth radius
+        self.halo = self.smooth_radius_px + self.mode_radius_px
+        # tile_cache.scene_tiles() mosaics: composite bands and depth come from cached tiles
+        self.cached_tiles = cached_tiles
+
+    def close(self):
+        for vrt in getattr(self, "_vrts", {}).values():
+            vrt.close()
+        for src in self._sources.values():
+            src.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read(self, band, row_off, col_off, height, width):
+        """Windowed read in scene pixel coordinates; anything off-raster becomes NaN."""
+        if self.cached_tiles and band in tile_cache.COMPOSITE_BANDS:
+            return self.cached_tiles["composite"].read(band, row_off, col_off, height, width)
+        out = np.full((height, width), np.nan, dtype=np.float64)
+        r0, c0 = max(row_off, 0), max(col_off, 0)
+        r1, c1 = min(row_off + height, self.height), min(col_off + width, self.width)
+        if r1 <= r0 or c1 <= c0:
+            return out
+        data = self._vrts[band].read(1, window=Window(c0, r0, c1 - c0, r1 - r0), masked=True)
+        out[r0 - row_off:r1 - row_off, c0 - col_off:c1 - col_off] = data.astype(np.float64).filled(np.nan)
+        return out
+
+    def rasterize(self, geom, row_off, col_off, height, width):
+        """Boolean mask of a geometry (pixel-centre rule, like ee.Image.paint)."""
+        transform = window_transform(Window(col_off, row_off, width, height), self.transform)
+        return rasterize([(geom, 1)], out_shape=(height, width), transform=transform,
+                         fill=0, dtype="uint8").astype(bool)
+
+    def blocks(self, block_size=BLOCK_SIZE):
+        """Core (halo-free) blocks covering the search-zone window."""
+        w = self.window
+        row0, col0 = int(w.row_off), int(w.col_off)
+        for r in range(row0, row0 + int(w.height), block_size):
+            for c in range(col0, col0 + int(w.width), block_size):
+                yield (r, c,
+                       min(block_size, row0 + int(w.height) - r),
+                       min(block_size, col0 + int(w.width) - c))
+
+
+def depth_surfaces(scene, row_off, col_off, height, width, in_zone):
+    """Smoothed surface and depth (focal mean surface - DEM) over a window."""
+    dem = np.where(in_zone, scene.read("DEM", row_off, col_off, height, width), np.nan)
+    smooth = focal_kernels.circular_mean(dem, scene.smooth_radius_px, valid=np.isfinite(dem),
+                                         bands=SMOOTH_KERNEL_BANDS, quantum=DEM_QUANTUM)
+    return smooth, smooth - dem
+
+
+class DepthLayer:
+    """
+    The date-independent half of the triple lock (smoothed surface and depth)
+    over a scene's search window plus halo. The DEM does not change between
+    date windows, so monitoring computes this once per lease and reuses it.
+    """
+
+    def __init__(self, row_off, col_off, smooth, depth):
+        self.row_off, self.col_off = row_off, col_off
+        self.smooth, self.depth = smooth, depth
+
+    @classmethod
+    def compute(cls, scene):
+        w, h, pad = scene.window, scene.halo, scene.smooth_radius_px
+        row_off, col_off = int(w.row_off) - h, int(w.col_off) - h
+        height, width = int(w.height) + 2 * h, int(w.width) + 2 * h
+        # One more smoothing radius around it, so the depth is exact right up to the edge
+        r, c, hh, ww = row_off - pad, col_off - pad, height + 2 * pad, width + 2 * pad
+        smooth, depth = depth_surfaces(scene, r, c, hh, ww, scene.rasterize(scene.search_zone, r, c, hh, ww))
+        core = (slice(pad, pad + height), slice(pad, pad + width))
+        return cls(row_off, col_off, smooth[core].copy(), depth[core].copy())
+
+    def crop(self, row_off, col_off, height, width):
+        r, c = row_off - self.row_off, col_off - self.col_off
+        return self.smooth[r:r + height, c:c + width], self.depth[r:r + height, c:c + width]
+
+    def save(self, path):
+        np.savez(path, offsets=[self.row_off, self.col_off], smooth=self.smooth, depth=self.depth)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(*map(int, data["offsets"]), data["smooth"], data["depth"])
+
+
+def process_block(scene, row_off, col_off, height, width, vectorize=False, depth_layer=None, inventory=False,
+                  mesh_stride=None):
+    """
+    Runs the triple lock on one block (read with a halo) and returns
+    fixed-point partial sums for the core pixels only. With `vectorize`, the
+    block's legal/illegal pixels are also traced into polygons (scene CRS).
+    With `inventory`, its mining pixel runs (pit_inventory.block_runs) too.
+    With `mesh_stride`, its samples of the 3D model grid (mesh_samples) too.
+    Scenes with zones also get per-zone [pixels, depth, lid] sums under "zones".
+    A DepthLayer of the same scene replaces the DEM read and focal mean, as do
+    the scene's cached depth tiles.
+    """
+    h = scene.halo
+    r, c, hh, ww = row_off - h, col_off - h, height + 2 * h, width + 2 * h
+
+    in_zone = scene.rasterize(scene.search_zone, r, c, hh, ww)
+    core = (slice(h, h + height), slice(h, h + width))
+    if not in_zone[core].any():
+        return None
+
+    # --- OPTICAL (NDBI + NDVI) --- clipped to the search zone like s2.median().clip()
+    b4, b8, b11 = (np.where(in_zone, scene.read(b, r, c, hh, ww), np.nan) for b in ("B4", "B8", "B11"))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ndbi = (b11 - b8) / (b11 + b8)
+        ndvi = (b8 - b4) / (b8 + b4)
+
+    # --- DEPTH (focal mean surface - DEM) ---
+    if depth_layer is None and scene.cached_tiles:
+        depth_layer = scene.cached_tiles["depth"]
+    if depth_layer is None:
+        smooth, depth = depth_surfaces(scene, r, c, hh, ww, in_zone)
+    else:
+        smooth, depth = depth_layer.crop(r, c, hh, ww)
+
+    # --- TRIPLE LOCK + NOISE CLEANUP ---
+    valid = np.isfinite(ndbi) & np.isfinite(ndvi) & np.isfinite(depth)
+    with np.errstate(invalid="ignore"):
+        triple_lock = (ndbi > OPTICAL_THRESHOLD) & (ndvi < NDVI_THRESHOLD) & (depth > MIN_DEPTH_THRESHOLD)
+    mining = focal_kernels.binary_mode(triple_lock & valid, scene.mode_radius_px, valid=valid)
+
+    # --- BOUNDARY SPLIT (core only) ---
+    mining, depth, smooth = mining[core] & valid[core], depth[core], smooth[core]
+    inside = scene.rasterize(scene.roi, row_off, col_off, height, width)
+    legal, illegal = mining & inside, mining & ~inside
+
+    part = {
+        "legal_px": int(legal.sum()),
+        "illegal_px": int(illegal.sum()),
+        "legal_depth": _to_fixed(depth[legal]),
+        "illegal_depth": _to_fixed(depth[illegal]),
+        "legal_lid": _to_fixed(smooth[legal]),
+    }
+    if scene.zones:
+        block = shapely.geometry.box(*window_bounds(Window(col_off, row_off, width, height), scene.transform))
+        part["zones"] = {}
+        for index, zone in enumerate(scene.zones):
+            if zone.intersects(block):
+                in_zone_mining = mining & scene.rasterize(zone, row_off, col_off, height, width)
+                part["zones"][index] = [int(in_zone_mining.sum()), _to_fixed(depth[in_zone_mining]),
+                                        _to_fixed(smooth[in_zone_mining])]
+    if vectorize:
+        transform = window_transform(Window(col_off, row_off, width, height), scene.transform)
+        part["shapes"] = {
+            name: [geom for geom, _ in shapes(mask.astype("uint8"), mask=mask, connectivity=8,
+                                              transform=transform)]
+            for name, mask in (("illegal", illegal), ("legal", legal))
+        }
+    if inventory:
+        part["runs"] = pit_inventory.block_runs(mining, inside, depth, row_off, col_off)
+    if mesh_stride:
+        part["mesh"] = mesh_samples(scene, legal, illegal, depth, row_off, col_off, mesh_stride)
+    return part
+
+
+def mesh_samples(scene, legal, illegal, depth, row_off, col_off, stride):
+    """
+    A block's share of the 3D model grid (every `stride`-th pixel of the search
+    window) as (grid row, grid col, depth, status); depth is NaN outside the zone.
+    """
+    row0, col0 = int(scene.window.row_off), int(scene.window.col_off)
+    r, c = -(row_off - row0) % stride, -(col_off - col0) % stride
+    status = np.where(illegal, STATUS_ILLEGAL, np.where(legal, STATUS_LEGAL, 0))
+    return ((row_off + r - row0) // stride, (col_off + c - col0) // stride,
+            depth[r::stride, c::stride].astype(np.float32), status[r::stride, c::stride].astype(np.uint8))
+
+
+def mesh_grid(samples, window, stride):
+    """The blocks' mesh_samples assembled into (depth, status) grids of the search window."""
+    shape = (-(-int(window.height) // stride), -(-int(window.width) // stride))
+    depth, status = np.full(shape, np.nan, dtype=np.float32), np.zeros(shape, dtype=np.uint8)
+    for row, col, block_depth, block_status in samples:
+        rows, cols = block_depth.shape
+        depth[row:row + rows, col:col + cols] = block_depth
+        status[row:row + rows, col:col + cols] = block_status
+    return depth, status
+
+
+PARTIAL_KEYS = ("legal_px", "illegal_px", "legal_depth", "illegal_depth", "legal_lid")
+
+
+def reduce_partials(partials):
+    totals = dict.fromkeys(PARTIAL_KEYS, 0)
+    for part in partials:
+        if part:
+            for key in PARTIAL_KEYS:
+                totals[key] += part[key]
+            _collect_extras(totals, part)
+    return totals
+
+
+def _collect_extras(totals, part):
+    """Variable-sized block outputs (pit polygons and runs, zone sums, mesh samples) next to the fixed partial sums."""
+    _collect_shapes(totals, part.get("shapes"))
+    if part.get("runs"):
+        totals.setdefault("runs", []).append(part["runs"])
+    if part.get("mesh"):
+        totals.setdefault("mesh", []).append(part["mesh"])
+    for index, sums in (part.get("zones") or {}).items():
+        zone_totals = totals.setdefault("zones", {}).setdefault(index, [0, 0, 0])
+        for k, value in enumerate(sums):
+            zone_totals[k] += value
+
+
+def _collect_shapes(totals, block_shapes):
+    if block_shapes:
+        collected = totals.setdefault("shapes", {name: [] for name in pit_vectors.PIT_CLASSES})
+        for name, parts in block_shapes.items():
+            collected[name].extend(parts)
+
+
+def vectorize_shapes(block_shapes, crs):
+    """
+    Merges the per-block polygons (pits cut by block edges share exact pixel
+    edges, so the union re-joins them), simplifies in metres and returns
+    EPSG:4326 MultiPolygons per class.
+    """
+    vectors = {}
+    for name in pit_vectors.PIT_CLASSES:
+        merged = pit_vectors.merge_shapes((block_shapes or {}).get(name, []))
+        simplified = pit_vectors.simplify_to_budget(merged, tolerance=pit_vectors.PIT_SIMPLIFY_M)
+        if simplified is None:
+            vectors[name] = None
+            continue
+        wgs84 = transform_geom(crs, "EPSG:4326", shapely.geometry.mapping(simplified))
+        vectors[name] = pit_vectors.to_multipolygon(shapely.geometry.shape(wgs84))
+    return vectors
+
+
+# --- TILED MULTI-PROCESS EXECUTION ---
+# Each worker opens its own scene (windowed reads, no full-scene arrays) and writes
+# its tile's integer partial sums into one row of a shared-memory table.
+_worker = {}
+
+
+def _init_worker(paths, lease_geojson, shm_name, n_tiles, vectorize=False, zones=None,
+                 search_buffer_m=SEARCH_BUFFER_M, depth_layer=None, cached_tiles=None, inventory=False,
+                 mesh_stride=None):
+    shm = SharedMemory(name=shm_name)
+    _worker["shm"] = shm
+    _worker["partials"] = np.ndarray((n_tiles, len(PARTIAL_KEYS)), dtype=np.int64, buffer=shm.buf)
+    _worker["scene"] = LocalScene(paths, lease_geojson, zones, search_buffer_m, cached_tiles)
+    _worker["vectorize"] = vectorize
+    _worker["depth_layer"] = depth_layer
+    _worker["inventory"] = inventory
+    _worker["mesh_stride"] = mesh_stride
+
+
+def _run_tile(index, tile):
+    part = process_block(_worker["scene"], *tile, vectorize=_worker["vectorize"],
+                         depth_layer=_worker["depth_layer"], inventory=_worker["inventory"],
+                         mesh_stride=_worker["mesh_stride"])
+    if part:
+        _worker["partials"][index] = [part[key] for key in PARTIAL_KEYS]
+    # Polygons, runs, zone sums and mesh samples are variable-sized, so they travel back through the pool instead
+    return {key: part[key] for key in ("shapes", "zones", "runs", "mesh") if key in part} if part else None
+
+
+def reduce_tiled(paths, lease_geojson, tiles, workers, vectorize=False, zones=None,
+                 search_buffer_m=SEARCH_BUFFER_M, depth_layer=None, cached_tiles=None, inventory=False,
+                 mesh_stride=None):
+    """Processes tiles on a process pool and reduces the shared partial-sum table."""
+    n_tiles = len(tiles)
+    shm = SharedMemory(create=True, size=max(n_tiles, 1) * len(PARTIAL_KEYS) * 8)
+    try:
+        partials = np.ndarray((n_tiles, len(PARTIAL_KEYS)), dtype=np.int64, buffer=shm.buf)
+        partials[:] = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(paths, lease_geojson, shm.name, n_tiles, vectorize, zones,
+                                           search_buffer_m, depth_layer, cached_tiles, inventory,
+                                           mesh_stride)) as pool:
+            tile_extras = list(pool.map(_run_tile, range(n_tiles), tiles))
+        sums = partials.sum(axis=0, dtype=np.int64)
+        totals = {key: int(value) for key, value in zip(PARTIAL_KEYS, sums)}
+        for extras in tile_extras:
+            if extras:
+                _collect_extras(totals, extras)
+        del partials
+        return totals
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def totals_to_metrics(totals, pixel_area):
+    """Same per-class numbers as metrics_engine.parse_metrics()."""
+    legal_area = totals["legal_px"] * pixel_area
+    illegal_area = totals["illegal_px"] * pixel_area
+    legal_vol = totals["legal_depth"] / FIXED_POINT_SCALE * pixel_area
+    illegal_vol = totals["illegal_depth"] / FIXED_POINT_SCALE * pixel_area
+    lid = totals["legal_lid"] / FIXED_POINT_SCALE / totals["legal_px"] if totals["legal_px"] else 0.0
+    return {
+        "legal_area_m2": legal_area,
+        "legal_vol_m3": legal_vol,
+        "legal_depth_m": legal_vol / legal_area if legal_area > 0 else 0.0,
+        "illegal_area_m2": illegal_area,
+        "illegal_vol_m3": illegal_vol,
+        "illegal_depth_m": illegal_vol / illegal_area if illegal_area > 0 else 0.0,
+        "lid_elevation": lid,
+    }
+
+
+def compute_local_metrics(lease_geojson, raster_paths=None, block_size=BLOCK_SIZE, workers=None,
+                          vectorize=False, zones=None, search_buffer_m=SEARCH_BUFFER_M, depth_layer=None,
+                          start_date=None, end_date=None, inventory=False, mesh=False):
+    """
+    Streams the search zone tile by tile and returns the per-class metrics.
+    With workers > 1 the tiles run on a process pool; the integer partial sums
+    make the result bit-identical to the single-process run. With `vectorize`,
+    the pit MultiPolygons (EPSG:4326) are returned under "vectors"; with
+    `zones`, the per-zone sums under "zones" (as metrics_engine.parse_zone_sums).
+    `search_buffer_m` is how far around the lease pits are searched for.
+    `depth_layer` (DepthLayer.compute() of the same lease and grid) skips the DEM work.
+    With `inventory`, the individual pits (pit_inventory.build_inventory) are under "pits".
+    With `mesh`, the 3D model grid (depth, status, pixel size in metres; at most
+    mesh_lod.MESH_MAX_GRID pixels a side) is under "mesh".
+    With the tile cache on, inputs come from cached tiles (the dates key the composites).
+    """
+    paths = resolve_raster_paths(raster_paths)
+    workers = workers or LOCAL_WORKERS
+    cached = None
+    with LocalScene(paths, lease_geojson, zones, search_buffer_m) as scene:
+        if tile_cache.enabled():
+            cached = scene.cached_tiles = tile_cache.scene_tiles(scene, paths, start_date, end_date)
+        pixel_area, crs, transform = scene.pixel_area, scene.crs, scene.transform
+        window, res = scene.window, scene.res
+        mesh_stride = mesh_lod.grid_stride(int(window.height), int(window.width)) if mesh else None
+        tiles = list(scene.blocks(block_size))
+        if workers <= 1 or len(tiles) <= 1:
+            totals = reduce_partials(process_block(scene, *tile, vectorize=vectorize, depth_layer=depth_layer,
+                                                   inventory=inventory, mesh_stride=mesh_stride)
+                                     for tile in tiles)
+
+    if workers > 1 and len(tiles) > 1:
+        print(f"🧩 Processing {len(tiles)} tiles on {workers} workers...")
+        totals = reduce_tiled(paths, lease_geojson, tiles, workers, vectorize, zones, search_buffer_m,
+                              depth_layer, cached, inventory, mesh_stride)
+
+    metrics = totals_to_metrics(totals, pixel_area)
+    if vectorize:
+        metrics["vectors"] = vectorize_shapes(totals.get("shapes"), crs)
+    if inventory:
+        runs = pit_inventory.concat_runs(totals.get("runs", []))
+        metrics["pits"] = pit_inventory.build_inventory(runs, transform, crs, pixel_area)
+    if mesh:
+        metrics["mesh"] = (*mesh_grid(totals.get("mesh", []), window, mesh_stride), res * mesh_stride)
+    if zones:
+        zone_totals = totals.get("zones", {})
+        metrics["zones"] = []
+        for index, zone in enumerate(zones):
+            pixels, depth, lid = zone_totals.get(index, (0, 0, 0))
+            metrics["zones"].append({
+                "lease_id": zone["lease_id"], "zone": zone["zone"],
+                "area": pixels * pixel_area,
+                "volume": depth / FIXED_POINT_SCALE * pixel_area,
+                "lid": lid / FIXED_POINT_SCALE / pixels if pixels else 0.0,
+            })
+    return metrics
+
+
+def run_local_detection(lease_geojson=None, filename="Manual_Input", output_dir="output",
+                        start_date=DEFAULT_START, end_date=DEFAULT_END, raster_paths=None, workers=None,
+                        progress=None, artifact_mode=None, leases=None):
+    """
+    Offline twin of the Earth Engine pipeline. The local rasters are expected to be
+    a cloud-filtered median composite for the requested window; the dates are only
+    carried through to the report. `leases` adds per-lease results, as in run_ee_detection.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    progress = progress or ProgressTracker()
+    print(f"🚀 Step 1: Local Raster Scan ({start_date} to {end_date})...")
+    paths = resolve_raster_paths(raster_paths)
+    if not lease_geojson:
+        print("⚠️ No lease polygon: scanning the default demo ROI (use sweep.py for regional scans)")
+    progress.stage("sensor_scan")
+
+    # Scan, triple lock and quantification happen in the same tiled pass
+    print("🔒 Applying Triple Lock Verification...")
+    print("📊 Calculating Metrics...")
+    zones = lease_zones.build_lease_zones(leases) if leases else None
+    stats = compute_local_metrics(lease_geojson, paths, workers=workers, vectorize=True, zones=zones,
+                                  start_date=start_date, end_date=end_date, inventory=True,
+                                  mesh=MODEL_3D_FORMAT == "lod")
+    lease_results = (lease_zones.summarize_zones(stats["zones"], [lease["lease_id"] for lease in leases])
+                     if leases else None)
+    progress.stage("triple_lock")
+
+    legal_area_m2, legal_vol_m3 = stats["legal_area_m2"], stats["legal_vol_m3"]
+    illegal_area_m2, illegal_vol_m3 = stats["illegal_area_m2"], stats["illegal_vol_m3"]
+    lid_elevation = stats["lid_elevation"]
+
+    total_area_m2 = legal_area_m2 + illegal_area_m2
+    total_vol_m3 = legal_vol_m3 + illegal_vol_m3
+    avg_depth_m = illegal_vol_m3 / illegal_area_m2 if illegal_area_m2 > 0 else 0.0
+
+    metrics = {
+        "illegal_area_m2": round(illegal_area_m2, 2),
+        "legal_area_m2": round(legal_area_m2, 2),
+        "volume_m3": round(illegal_vol_m3, 2),
+        "total_vol_m3": round(total_vol_m3, 2),
+        "avg_depth_m": round(avg_depth_m, 2),
+        "truckloads": int(illegal_vol_m3 / 15)
+    }
+    progress.stage("metrics", metrics=metrics, pits=pit_inventory.summarize(stats["pits"]),
+                   **({"leases": lease_results} if leases else {}))
+
+    # No geemap map offline. The 3D model grid came out of the same pass, and there is
+    # nothing to rebuild it from later, so the model is written now in either artifact mode.
+    model_filename = None
+    if total_area_m2 > 0 and "mesh" in stats:
+        model_filename = ARTIFACT_FILES["model_url"]
+        mesh_lod.write_lod_model(*stats["mesh"], os.path.join(output_dir, model_filename))
+        progress.stage("model_3d")
+
+    report_data = {
+        "start_date": start_date, "end_date": end_date, "dem_source": DEM_SOURCE,
+        "filename": os.path.basename(filename),
+        "illegal_area": illegal_area_m2,
+        "legal_area": legal_area_m2,
+        "lid_elevation": lid_elevation,
+        "avg_depth": avg_depth_m,
+        "volume": illegal_vol_m3,
+        "total_volume": total_vol_m3,
+        "trucks": int(illegal_vol_m3 / 15) if illegal_vol_m3 else 0
+    }
+    save_artifact_inputs(output_dir, {
+        "backend": "local", "lease_geojson": lease_geojson,
+        "start_date": start_date, "end_date": end_date,
+        "total_area_m2": total_area_m2, "report_data": report_data,
+    })
+
+    pdf_filename = ARTIFACT_FILES["report_url"] if pdf_reporter() else None
+    if pdf_filename and (artifact_mode or ARTIFACT_MODE) != "lazy":
+        build_report_artifact(report_data, os.path.join(output_dir, pdf_filename))
+        progress.stage("pdf")
+    else:
+        progress.stage("pdf", deferred=True)
+
+    return {
+        "status": "success",
+        "metrics": metrics,
+        "artifacts": {
+            "map_url": None,
+            "model_url": model_filename,
+            "report_url": pdf_filename
+        },
+        "vectors": pit_vectors.to_geojson(stats["vectors"]),
+        "pits": stats["pits"],
+        "leases": lease_results,
+        "diagnostics": {"remote_calls": 0, "calls": []}
+    }
@@ -1,10 +1,13 @@
+import argparse
 import sys
-import ee
 import os
 from file_processor import process_lease_file
-from phase1_detection import run_unified_detection
+from phase1_detection import DEFAULT_END, DEFAULT_START, DETECTION_BACKEND, DETECTION_BACKENDS, run_unified_detection
 
 def main():
+    if len(sys.argv) > 1:
+        return batch_main()
+
     print("\n🛰️  INITIALIZING MINEGUARD SYSTEM v2.0 (Unified) 🛰️")
     print("---------------------------------------------------")
     
@@ -28,5 +31,26 @@ def main():
     # FIX: Pass the filename explicitly
     run_unified_detection(lease_geojson, filename=target_file)
 
+def batch_main():
+    """Non-interactive batch mode (see batch.py); resumable, re-run the same command after a crash."""
+    import batch
+
+    parser = argparse.ArgumentParser(description="Run the detection on a batch of lease files (resumable).")
+    parser.add_argument("source", help="directory of lease files, or a manifest listing one path per line")
+    parser.add_argument("--start", default=DEFAULT_START)
+    parser.add_argument("--end", default=DEFAULT_END)
+    parser.add_argument("--backend", choices=DETECTION_BACKENDS, default=DETECTION_BACKEND)
+    parser.add_argument("--workers", type=int, default=batch.BATCH_WORKERS, help="detections at once")
+    parser.add_argument("--ingest-workers", type=int, default=batch.BATCH_INGEST_WORKERS, help="files read at once")
+    parser.add_argument("--out-dir", default=batch.BATCH_DIR)
+    parser.add_argument("--format", nargs="+", choices=batch.RESULT_FORMATS, default=["csv"])
+    parser.add_argument("--artifacts", choices=("lazy", "eager"), default="lazy",
+                        help="eager also builds each lease's map, 3D model and PDF")
+    parser.add_argument("--limit", type=int, help="detect at most this many leases in this run")
+    args = parser.parse_args()
+    summary = batch.run_batch(args.source, args.start, args.end, args.backend, args.workers, args.ingest_workers,
+                              args.out_dir, args.format, args.artifacts, args.limit)
+    return 0 if summary["complete"] else 1
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""
+Level-of-detail meshes of the pit model (depth + status grid).
+
+The grid is triangulated as a right-triangulated irregular network (RTIN): the
+square is split along its diagonal, and every right triangle is split in two at
+the midpoint of its hypotenuse for as long as that midpoint is more than the
+tolerance away (in metres of depth) from the surface interpolated across the
+hypotenuse. The error of each midpoint is computed once, bottom-up, and includes
+the error of every finer midpoint below it, so one pass serves every tolerance
+and the meshes have no cracks (both triangles of a hypotenuse share the midpoint).
+A change of status class (or of valid/nodata) across a hypotenuse counts as
+MESH_STATUS_ERROR_M of error, so class edges stay sharp in the finer levels.
+
+Each level is a binary glTF (.glb) with POSITION (float32, metres, z = -depth),
+a per-vertex _STATUS (uint8: 0 none, 1 illegal, 2 legal, 255 nodata) and uint16/uint32
+indices. model_3d.html is a small viewer that loads model_3d.json and the
+levels coarse to fine (benchmarks/bench_mesh_lod.py compares the sizes).
+"""
+import json
+import os
+import shutil
+import struct
+import time
+
+import numpy as np
+
+import instrumentation
+
+# --- CONFIGURATION ---
+# Tolerances of the levels in metres of depth, coarse first
+MESH_LOD_ERRORS_M = tuple(float(e) for e in os.getenv("MESH_LOD_ERRORS_M", "4,1,0.25").split(","))
+MESH_STATUS_ERROR_M = float(os.getenv("MESH_STATUS_ERROR_M", "2"))
+# Grids are sampled down to at most this many vertices a side (2^k + 1)
+MESH_MAX_GRID = int(os.getenv("MESH_MAX_GRID", "1025"))
+MESH_VERTICAL_EXAGGERATION = float(os.getenv("MESH_VERTICAL_EXAGGERATION", "3"))
+
+NODATA_STATUS = 255
+VIEWER_TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mesh_viewer.html")
+
+# glTF constants
+_GLB_MAGIC, _CHUNK_JSON, _CHUNK_BIN = 0x46546C67, 0x4E4F534A, 0x004E4942
+_FLOAT, _UNSIGNED_BYTE, _UNSIGNED_SHORT, _UNSIGNED_INT = 5126, 5121, 5123, 5125
+_ARRAY_BUFFER, _ELEMENT_ARRAY_BUFFER = 34962, 34963
+# Interleaved vertex: position (3 x float32) + status (uint8), padded to 4-byte alignment
+_VERTEX = np.dtype([("position", "<f4", 3), ("status", "u1"), ("pad", "u1", 3)])
+
+
+def grid_stride(height, width, max_grid=MESH_MAX_GRID):
+    """Sampling step that fits a height x width grid into max_grid vertices a side."""
+    return max(1, -(-(max(height, width) - 1) // (max_grid - 1)))
+
+
+class RTIN:
+    """
+    Midpoint errors of a depth grid (NaN = nodata), padded to 2^k + 1 a side.
+    mesh(max_error) extracts the triangulation for one tolerance.
+    """
+
+    def __init__(self, depth, status, status_error_m=MESH_STATUS_ERROR_M):
+        height, width = depth.shape
+        self.height, self.width = height, width
+        k = max(1, int(np.ceil(np.log2(max(height, width, 2) - 1))))
+        self.size = size = 2 ** k + 1
+        self.levels = 2 * k    # Triangles of level 2k have no grid midpoint: they are the leaves
+
+        valid = np.zeros((size, size), dtype=bool)
+        valid[:height, :width] = np.isfinite(depth)
+        heights = np.zeros((size, size), dtype=np.float32)
+        heights[:height, :width] = np.where(valid[:height, :width], depth, 0)
+        classes = np.full((size, size), NODATA_STATUS, dtype=np.uint8)
+        classes[:height, :width] = np.where(valid[:height, :width], status, NODATA_STATUS)
+        self.heights, self.classes, self.valid = heights.ravel(), classes.ravel(), valid.ravel()
+        self.errors = self._errors(status_error_m)
+
+    def _top(self):
+        """The two triangles of the square as (hypotenuse end, hypotenuse end, right-angle corner)."""
+        n, size = self.size - 1, self.size
+        tl, tr, bl, br = 0, n, n * size, n * size + n
+        return np.array([tl, br]), np.array([br, tl]), np.array([tr, bl])
+
+    @staticmethod
+    def _children(a, b, c):
+        # Flat indices are linear in (row, col): the midpoint of a grid-aligned hypotenuse is (a + b) / 2
+        m = (a + b) // 2
+        return np.concatenate((c, b)), np.concatenate((a, c)), np.concatenate((m, m))
+
+    def _errors(self, status_error_m):
+        h, cls = self.heights, self.classes
+        levels = [self._top()]
+        for _ in range(self.levels - 1):
+            levels.append(self._children(*levels[-1]))
+
+        errors = np.zeros(self.size * self.size, dtype=np.float32)
+        for level in range(self.levels - 1, -1, -1):
+            a, b, c = levels[level]
+            m = (a + b) // 2
+            error = np.abs((h[a] + h[b]) / 2 - h[m])
+            edge = (cls[a] != cls[m]) | (cls[b] != cls[m])
+            error = np.where(edge, np.maximum(error, status_error_m), error)
+            if level < self.levels - 1:
+                # Children's midpoints: a parent is split whenever one of its children is
+                error = np.maximum(error, np.maximum(errors[(c + a) // 2], errors[(b + c) // 2]))
+            np.maximum.at(errors, m, error)
+            levels[level] = None
+        return errors
+
+    def mesh(self, max_error):
+        """(vertex flat indices, triangles as indices into them) for one tolerance."""
+        a, b, c = self._top()
+        emitted = []
+        for _ in range(self.levels):
+            split = self.errors[(a + b) // 2] > max_error
+            emitted.append(np.stack((a[~split], b[~split], c[~split]), axis=1))
+            a, b, c = self._children(a[split], b[split], c[split])
+        emitted.append(np.stack((a, b, c), axis=1))
+        triangles = np.concatenate(emitted)
+        # Triangles wholly in nodata (outside the search zone, or padding) are dropped;
+        # nodata corners of the others sit at depth 0, the natural surface
+        triangles = triangles[self.valid[triangles].any(axis=1)]
+        vertices, inverse = np.unique(triangles, return_inverse=True)
+        return vertices, inverse.reshape(-1, 3).astype(np.uint32)
+
+    def positions(self, vertices, pixel_size_m):
+        """x east, y north (metres from the grid centre), z = -depth."""
+        rows, cols = np.divmod(vertices, self.size)
+        return np.stack((
+            (cols - (self.width - 1) / 2) * pixel_size_m,
+            ((self.height - 1) / 2 - rows) * pixel_size_m,
+            -self.heights[vertices],
+        ), axis=1).astype(np.float32)
+
+
+def to_glb(positions, status, triangles):
+    """Binary glTF 2.0 of one indexed triangle mesh with a _STATUS vertex attribute."""
+    vertex = np.zeros(len(positions), dtype=_VERTEX)
+    vertex["position"], vertex["status"] = positions, status
+    wide = len(positions) > 0xFFFF
+    indices = triangles.astype(np.uint32 if wide else np.uint16).ravel()
+    vertex_bytes, index_bytes = vertex.tobytes(), indices.tobytes()
+    binary = vertex_bytes + index_bytes + b"\0" * (-len(index_bytes) % 4)
+
+    gltf = {
+        "asset": {"version": "2.0", "generator": "mineguard mesh_lod"},
+        "scene": 0, "scenes": [{"nodes": [0]}], "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0, "_STATUS": 1}, "indices": 2, "mode": 4}]}],
+        "buffers": [{"byteLength": len(binary)}],
+        "bufferViews": [
+            {"buffer": 0, "byteOffset": 0, "byteLength": len(vertex_bytes), "byteStride": _VERTEX.itemsize,
+             "target": _ARRAY_BUFFER},
+            {"buffer": 0, "byteOffset": len(vertex_bytes), "byteLength": len(index_bytes),
+             "target": _ELEMENT_ARRAY_BUFFER},
+        ],
+        "accessors": [
+            {"bufferView": 0, "byteOffset": 0, "componentType": _FLOAT, "count": len(positions), "type": "VEC3",
+             "min": positions.min(axis=0).tolist() if len(positions) else [0, 0, 0],
+             "max": positions.max(axis=0).tolist() if len(positions) else [0, 0, 0]},
+            {"bufferView": 0, "byteOffset": 12, "componentType": _UNSIGNED_BYTE, "count": len(positions),
+             "type": "SCALAR"},
+            {"bufferView": 1, "componentType": _UNSIGNED_INT if wide else _UNSIGNED_SHORT,
+             "count": len(indices), "type": "SCALAR"},
+        ],
+    }
+    header = json.dumps(gltf, separators=(",", ":")).encode()
+    header += b" " * (-len(header) % 4)
+    length = 12 + 8 + len(header) + 8 + len(binary)
+    return b"".join((struct.pack("<III", _GLB_MAGIC, 2, length),
+                     struct.pack("<II", len(header), _CHUNK_JSON), header,
+                     struct.pack("<II", len(binary), _CHUNK_BIN), binary))
+
+
+def build_lods(depth, status, pixel_size_m, errors_m=MESH_LOD_ERRORS_M):
+    """[(max_error_m, glb bytes, triangles, vertices)] coarse to fine."""
+    rtin = RTIN(depth, status)
+    lods = []
+    for max_error in sorted(errors_m, reverse=True):
+        vertices, triangles = rtin.mesh(max_error)
+        glb = to_glb(rtin.positions(vertices, pixel_size_m), rtin.classes[vertices], triangles)
+        lods.append((max_error, glb, len(triangles), len(vertices)))
+    return lods
+
+
+def write_lod_model(depth, status, pixel_size_m, output_path, errors_m=MESH_LOD_ERRORS_M):
+    """
+    Writes the viewer at `output_path` (model_3d.html) and, next to it, the
+    manifest (model_3d.json) and one .glb per level (model_3d.lod<i>.glb).
+    """
+    with instrumentation.timer("artifact_build_seconds", artifact="model_3d"):
+        started = time.perf_counter()
+        out_dir, stem = os.path.split(os.path.splitext(output_path)[0])
+        lods = build_lods(depth, status, pixel_size_m, errors_m)
+        manifest = {
+            "grid": {"height": depth.shape[0], "width": depth.shape[1], "pixel_size_m": pixel_size_m},
+            "vertical_exaggeration": MESH_VERTICAL_EXAGGERATION,
+            "status": {"0": "none", "1": "illegal", "2": "legal", str(NODATA_STATUS): "nodata"},
+            "levels": [],
+        }
+        for i, (max_error, glb, n_triangles, n_vertices) in enumerate(lods):
+            name = f"{stem}.lod{i}.glb"
+            with open(os.path.join(out_dir, name), "wb") as f:
+                f.write(glb)
+            manifest["levels"].append({"url": name, "max_error_m": max_error, "triangles": n_triangles,
+                                       "vertices": n_vertices, "bytes": len(glb)})
+        with open(os.path.join(out_dir, f"{stem}.json"), "w") as f:
+            json.dump(manifest, f)
+        shutil.copyfile(VIEWER_TEMPLATE, output_path)
+    print(f"🧊 3D model: {len(lods)} levels, {lods[-1][2]:,} triangles at full detail "
+          f"({time.perf_counter() - started:.2f}s)")
+    return manifest
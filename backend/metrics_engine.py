@@ -0,0 +1,341 @@
+import contextvars
+import json
+import os
+
+import shapely
+
+import ee_scheduler
+import instrumentation
+from lazy_imports import lazy_module
+
+ee = lazy_module("ee")    # Imported on first use (see lazy_imports.py)
+
+# --- CONFIGURATION ---
+# One reduction means one scale. 10m matches Sentinel-2 and the old area pass;
+# the old volume pass ran at 30m, so volumes now come from the finer grid.
+METRICS_SCALE = 10
+METRICS_MAX_PIXELS = 1e9
+# "adaptive": search zones too large for the latency budget at METRICS_SCALE get a
+# coarse estimate first, then a refinement limited to the cells with mining
+METRICS_MODE = os.getenv("METRICS_MODE", "fixed")
+METRICS_LATENCY_BUDGET_S = float(os.getenv("METRICS_LATENCY_BUDGET_S", "30"))
+# Throughput of the triple-lock reduction (pixels/s), for the scale choice
+METRICS_PIXELS_PER_S = float(os.getenv("METRICS_PIXELS_PER_S", "2e5"))
+METRICS_SCALES = (10, 20, 30, 60, 100)      # Candidate scales, finest first
+COARSE_SCALE = 100
+REFINE_MAX_PIXELS_PER_CELL = 1024           # Fine pixels per coarse cell for the refine mask's max
+# Pit outlines: vectorised on the same grid, simplified server-side (metres)
+# before download so the payload stays small
+VECTOR_SIMPLIFY_M = 5
+
+# Class codes of the 'status' band (see run_unified_detection, section E)
+STATUS_ILLEGAL = 1
+STATUS_LEGAL = 2
+
+
+class RemoteCallCounter:
+    """Counts blocking Earth Engine round-trips (getInfo) made during one job."""
+
+    def __init__(self):
+        self.count = 0
+        self.labels = []
+
+    def record(self, label):
+        self.count += 1
+        self.labels.append(label)
+
+    def as_dict(self):
+        return {"remote_calls": self.count, "calls": list(self.labels)}
+
+
+def fetch(ee_object, counter=None, label="getInfo"):
+    """
+    Single choke point for getInfo() so every round-trip is accounted for, and
+    rate limited / retried by the EE scheduler (see ee_scheduler.py).
+    """
+    if counter is not None:
+        counter.record(label)
+    with instrumentation.timer("ee_fetch_seconds", call=label):
+        return ee_scheduler.get_scheduler().call(ee_object.getInfo, label=label)
+
+
+def _timed_call(fn, args, label):
+    with instrumentation.timer("ee_fetch_seconds", call=label):
+        return fn(*args)
+
+
+def submit(fn, *args, counter=None, label="getInfo"):
+    """
+    fetch() without the wait, for any EE round-trip (getInfo, getMapId, ...):
+    counted and timed the same way, returns a Future. The call runs in the
+    submitter's context, so it lands in the per-job timings too.
+    """
+    if counter is not None:
+        counter.record(label)
+    context = contextvars.copy_context()
+    return ee_scheduler.get_scheduler().submit(context.run, _timed_call, fn, args, label, label=label)
+
+
+def fetch_pixels(image, grid, counter=None, label="computePixels"):
+    """
+    computePixels() of `image` on `grid` (dimensions, affineTransform, crsCode) as a
+    numpy structured array, one field per band; scheduled and counted like fetch().
+    """
+    if counter is not None:
+        counter.record(label)
+    request = {"expression": image, "fileFormat": "NUMPY_NDARRAY", "grid": grid}
+    with instrumentation.timer("ee_fetch_seconds", call=label):
+        return ee_scheduler.get_scheduler().call(ee.data.computePixels, request, label=label)
+
+
+def build_metrics_reduction(status_band, raw_depth, smooth_surface, region,
+                            scale=METRICS_SCALE, max_pixels=METRICS_MAX_PIXELS):
+    """
+    Builds ONE server-side reduction for every metric of the job.
+
+    Input bands (order matters for the grouped reducer):
+      0: pixel area            -> sum  (area m²)
+      1: depth * pixel area    -> sum  (volume m³)
+      2: smoothed surface      -> mean (lid elevation)
+      3: status class          -> group key (1 = illegal, 2 = legal)
+    Non-mining pixels (status 0) are masked out so they never form a group.
+    """
+    pixel_area = ee.Image.pixelArea().rename("area")
+    volume = raw_depth.multiply(ee.Image.pixelArea()).rename("volume")
+    status = status_band.updateMask(status_band.gt(0)).rename("status")
+
+    stack = pixel_area.addBands(volume).addBands(smooth_surface.rename("lid")).addBands(status)
+
+    reducer = (ee.Reducer.sum().repeat(2)
+               .combine(reducer2=ee.Reducer.mean(), sharedInputs=False)
+               .group(groupField=3, groupName="status"))
+
+    stats = stack.reduceRegion(
+        reducer=reducer, geometry=region, scale=scale, maxPixels=max_pixels
+    )
+    return ee.Dictionary(stats)
+
+
+def parse_metrics(stats):
+    """Turns the grouped reduction result into the per-class numbers."""
+    classes = {
+        STATUS_ILLEGAL: {"area": 0.0, "volume": 0.0, "lid": 0.0},
+        STATUS_LEGAL: {"area": 0.0, "volume": 0.0, "lid": 0.0},
+    }
+    for group in (stats or {}).get("groups", []):
+        code = int(group.get("status", 0))
+        if code not in classes:
+            continue
+        sums = group.get("sum") or [0.0, 0.0]
+        classes[code] = {
+            "area": sums[0] or 0.0,
+            "volume": sums[1] or 0.0,
+            "lid": group.get("mean") or 0.0,
+        }
+
+    legal, illegal = classes[STATUS_LEGAL], classes[STATUS_ILLEGAL]
+    return {
+        "legal_area_m2": legal["area"],
+        "legal_vol_m3": legal["volume"],
+        "legal_depth_m": legal["volume"] / legal["area"] if legal["area"] > 0 else 0.0,
+        "illegal_area_m2": illegal["area"],
+        "illegal_vol_m3": illegal["volume"],
+        "illegal_depth_m": illegal["volume"] / illegal["area"] if illegal["area"] > 0 else 0.0,
+        "lid_elevation": legal["lid"] if legal["area"] > 0 else 0.0,
+    }
+
+
+def build_vector_reduction(status_band, region, scale=METRICS_SCALE,
+                           max_pixels=METRICS_MAX_PIXELS, simplify_m=VECTOR_SIMPLIFY_M):
+    """
+    Vectorises the legal/illegal classes of the status band into polygons
+    labelled with their 'status' code (non-mining pixels are masked out).
+    """
+    status = status_band.updateMask(status_band.gt(0)).toInt().rename("status")
+    vectors = status.reduceToVectors(
+        geometry=region, scale=scale, geometryType="polygon",
+        eightConnected=True, labelProperty="status", maxPixels=max_pixels
+    )
+    return vectors.map(lambda f: ee.Feature(f).simplify(maxError=simplify_m))
+
+
+def zones_to_collection(zones):
+    """lease_zones.build_lease_zones() output -> ee.FeatureCollection."""
+    return ee.FeatureCollection([
+        ee.Feature(ee.Geometry(json.loads(shapely.to_geojson(zone["geometry"]))),
+                   {"lease_id": zone["lease_id"], "zone": zone["zone"]})
+        for zone in zones
+    ])
+
+
+def build_zone_reduction(status_band, raw_depth, smooth_surface, zones,
+                         scale=METRICS_SCALE):
+    """
+    Per-lease zone sums in ONE reduceRegions pass over a FeatureCollection of
+    zones (see lease_zones.py). Only mining pixels (status > 0) are counted;
+    which zone they fall in decides whether they are legal for that lease.
+    """
+    stack = (ee.Image.pixelArea().rename("area")
+             .addBands(raw_depth.multiply(ee.Image.pixelArea()).rename("volume"))
+             .addBands(smooth_surface.rename("lid"))
+             .updateMask(status_band.gt(0)))
+    reducer = ee.Reducer.sum().combine(reducer2=ee.Reducer.mean(), sharedInputs=True)
+    reduced = stack.reduceRegions(collection=zones, reducer=reducer, scale=scale)
+    # Properties only: the zone geometries are already known client-side
+    return reduced.select(["lease_id", "zone", "area_sum", "volume_sum", "lid_mean"], retainGeometry=False)
+
+
+def parse_zone_sums(feature_collection):
+    """reduceRegions output -> [{"lease_id", "zone", "area", "volume", "lid"}, ...]"""
+    rows = []
+    for feature in (feature_collection or {}).get("features", []):
+        props = feature.get("properties", {})
+        rows.append({
+            "lease_id": props.get("lease_id"),
+            "zone": props.get("zone"),
+            "area": props.get("area_sum") or 0.0,
+            "volume": props.get("volume_sum") or 0.0,
+            "lid": props.get("lid_mean") or 0.0,
+        })
+    return rows
+
+
+def compute_metrics(status_band, raw_depth, smooth_surface, region, counter=None, vectorize=False,
+                    zones=None, scale=METRICS_SCALE):
+    """
+    Builds the combined reduction and fetches it in a single round-trip.
+    With `vectorize`, the pit polygons ride along in the same request and are
+    returned under "vectors" (a GeoJSON FeatureCollection). With `zones`
+    (an ee.FeatureCollection), the per-lease zone sums come back under "zones".
+    """
+    stats = build_metrics_reduction(status_band, raw_depth, smooth_surface, region, scale=scale)
+    if not vectorize and zones is None:
+        return parse_metrics(fetch(stats, counter, label="metrics"))
+
+    payload = {"stats": stats}
+    labels = ["metrics"]
+    if vectorize:
+        payload["vectors"] = build_vector_reduction(status_band, region, scale=scale)
+        labels.append("vectors")
+    if zones is not None:
+        payload["zones"] = build_zone_reduction(status_band, raw_depth, smooth_surface, zones, scale=scale)
+        labels.append("zones")
+
+    response = fetch(ee.Dictionary(payload), counter, label="+".join(labels))
+    metrics = parse_metrics(response.get("stats"))
+    if vectorize:
+        metrics["vectors"] = response.get("vectors")
+    if zones is not None:
+        metrics["zones"] = parse_zone_sums(response.get("zones"))
+    return metrics
+
+
+# --- ADAPTIVE (coarse-to-fine) METRICS ---
+
+def choose_scale(area_m2, budget_s=None):
+    """Finest METRICS_SCALES scale whose pixel count over `area_m2` fits the latency budget."""
+    max_pixels = (budget_s or METRICS_LATENCY_BUDGET_S) * METRICS_PIXELS_PER_S
+    for scale in METRICS_SCALES:
+        if area_m2 / scale ** 2 <= max_pixels:
+            return scale
+    return METRICS_SCALES[-1]
+
+
+def metrics_grid(scale):
+    """
+    EPSG:4326 grid at `scale` metres. Not raw_depth.projection(): a mosaic's
+    default projection is 1° EPSG:4326, whatever the DEM's native pixels.
+    """
+    return ee.Projection("EPSG:4326").atScale(scale)
+
+
+def build_coarse_reduction(status_band, raw_depth, smooth_surface, region, scale=COARSE_SCALE):
+    """
+    The metrics reduction at a coarse scale, plus what estimates its error and
+    sizes the refinement, all on the coarse grid:
+      refine:          cells with any mining pixel (max over the cell, so pits
+                       smaller than a cell count), or next to such a cell
+      illegal, legal:  cells whose 3x3 neighbourhood is neither all in nor all out
+                       of the class (where the coarse grid can misplace its edge)
+    Returns the lazy dictionary and the refine mask.
+    """
+    grid = metrics_grid(scale)
+    coarse = status_band.reproject(grid)
+    mining = (status_band.gt(0).setDefaultProjection(metrics_grid(METRICS_SCALE))
+              .reduceResolution(ee.Reducer.max(), maxPixels=REFINE_MAX_PIXELS_PER_CELL).reproject(grid))
+    near = mining.focalMax(1, "square", "pixels").reproject(grid)
+    edges = [coarse.eq(code).focalMax(1, "square", "pixels").neq(coarse.eq(code).focalMin(1, "square", "pixels"))
+             .reproject(grid).rename(name)
+             for code, name in ((STATUS_ILLEGAL, "illegal"), (STATUS_LEGAL, "legal"))]
+    areas = ee.Image.cat([near.rename("refine")] + edges).multiply(ee.Image.pixelArea())
+    return ee.Dictionary({
+        "stats": build_metrics_reduction(status_band, raw_depth, smooth_surface, region, scale=scale),
+        "areas": areas.reduceRegion(reducer=ee.Reducer.sum(), geometry=region, scale=scale,
+                                    crs=grid, maxPixels=METRICS_MAX_PIXELS),
+    }), near
+
+
+def coarse_estimate(response, scale=COARSE_SCALE):
+    """
+    Coarse metrics with "error_estimate" (± m² per class: the area of the coarse
+    cells on a class edge; not a bound, since pits that miss the coarse grid are
+    not in it) and the area left to refine.
+    """
+    areas = response.get("areas") or {}
+    metrics = parse_metrics(response.get("stats"))
+    metrics["error_estimate"] = {
+        "illegal_area_m2": round(areas.get("illegal") or 0.0, 2),
+        "legal_area_m2": round(areas.get("legal") or 0.0, 2),
+    }
+    metrics["refine_area_m2"] = areas.get("refine") or 0.0
+    metrics["scale"] = scale
+    return metrics
+
+
+def compute_metrics_adaptive(status_band, raw_depth, smooth_surface, region, zone_area_m2, counter=None,
+                             vectorize=False, zones=None, progress=None, budget_s=None):
+    """
+    compute_metrics() sized to the latency budget. A search zone that fits the
+    budget at METRICS_SCALE takes the single fixed-scale pass. Otherwise a
+    COARSE_SCALE estimate comes back first (reported as the "metrics_estimate"
+    stage, with its error estimate), then METRICS_SCALE-or-coarser sums are taken
+    over the coarse cells holding any mining pixel or next to one only; other
+    pixels are masked out.
+    Details of the plan are returned under "adaptive".
+    """
+    scale = choose_scale(zone_area_m2, budget_s)
+    if scale == METRICS_SCALE:
+        metrics = compute_metrics(status_band, raw_depth, smooth_surface, region, counter, vectorize, zones)
+        metrics["adaptive"] = {"zone_area_m2": round(zone_area_m2, 2), "scale": scale, "refined": False}
+        return metrics
+
+    payload, near = build_coarse_reduction(status_band, raw_depth, smooth_surface, region)
+    estimate = coarse_estimate(fetch(payload, counter, label="metrics_coarse"))
+    if progress:
+        progress.stage("metrics_estimate", scale=COARSE_SCALE,
+                       metrics={k: round(estimate[k], 2) for k in ("illegal_area_m2", "legal_area_m2",
+                                                                   "illegal_vol_m3", "legal_vol_m3")},
+                       error_estimate=estimate["error_estimate"])
+
+    refine_area = estimate.pop("refine_area_m2")
+    scale = choose_scale(refine_area, budget_s)
+    if refine_area > 0:
+        # Fine pass: the mining cells (dilated by one coarse cell) as vectors bound the
+        # reduction region; masking the status band keeps the zone sums to them too
+        cells = near.selfMask().reduceToVectors(geometry=region, crs=near.projection(), scale=COARSE_SCALE,
+                                                geometryType="polygon", eightConnected=True,
+                                                maxPixels=METRICS_MAX_PIXELS)
+        refine_region = cells.geometry().intersection(region, maxError=1)
+        metrics = compute_metrics(status_band.updateMask(near), raw_depth, smooth_surface, refine_region,
+                                  counter, vectorize, zones, scale=scale)
+    else:
+        # No mining on the coarse grid: the estimate is the result
+        metrics = parse_metrics(None)
+        if vectorize:
+            metrics["vectors"] = {"type": "FeatureCollection", "features": []}
+        if zones is not None:
+            metrics["zones"] = []
+    metrics["adaptive"] = {"zone_area_m2": round(zone_area_m2, 2), "coarse_scale": COARSE_SCALE,
+                           "refine_area_m2": round(refine_area, 2), "scale": scale,
+                           "refined": refine_area > 0, "coarse_estimate": estimate}
+    return metrics
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, JSON, Index, ForeignKey, UniqueConstraint
 from geoalchemy2 import Geometry
 from database import Base
 import datetime
@@ -19,12 +19,135 @@ class Inspection(Base):
     # Status
     status = Column(String) 
     
+    # Job Lifecycle (queued -> running -> done / failed)
+    state = Column(String, default="done", index=True)
+    error = Column(String, nullable=True)
+    result = Column(JSON, nullable=True)    # Full API result once the job is done
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
     # Artifact Links
     report_url = Column(String)
     map_url = Column(String)
     model_url = Column(String)
     
-    # Spatial Data (Stores the Polygons)
-    geometry = Column(Geometry('MULTIPOLYGON', srid=4326), nullable=True)
+    # Spatial Data (Stores the Polygons): detected pits, GiST-indexed
+    geometry = Column(Geometry('MULTIPOLYGON', srid=4326, spatial_index=True), nullable=True)        # Illegal
+    legal_geometry = Column(Geometry('MULTIPOLYGON', srid=4326, spatial_index=True), nullable=True)  # Legal
     
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    # Keyset pagination of the history: WHERE state = ? AND (created_at, id) < (?, ?)
+    __table_args__ = (
+        Index("ix_inspections_state_created_id", "state", "created_at", "id"),
+    )
+
+class Lease(Base):
+    __tablename__ = "leases"
+
+    # Registry of every known licensed lease (see lease_registry.py)
+    id = Column(Integer, primary_key=True, index=True)  # The registry refreshes on id > last seen (minus an overlap)
+    lease_id = Column(String, unique=True, index=True)
+    holder = Column(String, nullable=True)
+    geometry = Column(Geometry('MULTIPOLYGON', srid=4326, spatial_index=True))
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class LeaseResult(Base):
+    __tablename__ = "lease_results"
+
+    # Per-lease numbers of a multi-feature (per-lease mode) inspection
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, ForeignKey("inspections.job_id", ondelete="CASCADE"), index=True)
+    lease_id = Column(String, index=True)       # From the lease file's ID field (or feature index)
+
+    legal_area_m2 = Column(Float)
+    legal_vol_m3 = Column(Float)
+    legal_depth_m = Column(Float)
+    illegal_area_m2 = Column(Float)             # In the lease's buffer, outside every lease
+    illegal_vol_m3 = Column(Float)
+    illegal_depth_m = Column(Float)
+    other_lease_area_m2 = Column(Float)         # In the lease's buffer, inside a neighbouring lease
+    other_lease_vol_m3 = Column(Float)
+    lid_elevation = Column(Float)
+    truckloads = Column(Integer)
+
+    geometry = Column(Geometry('MULTIPOLYGON', srid=4326, spatial_index=True), nullable=True)  # The lease
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class Pit(Base):
+    __tablename__ = "pits"
+
+    # Pit inventory of an inspection (pit_inventory.py): one row per connected pit
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, ForeignKey("inspections.job_id", ondelete="CASCADE"))
+    pit_id = Column(Integer)                    # Rank by area within the job, 1 = largest
+
+    area_m2 = Column(Float)
+    volume_m3 = Column(Float)
+    max_depth_m = Column(Float)
+    mean_depth_m = Column(Float)
+    inside_area_m2 = Column(Float)
+    location = Column(String, index=True)       # inside / outside / straddling the lease
+
+    centroid = Column(Geometry('POINT', srid=4326, spatial_index=True))
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    # Keyset pagination of a job's pits: WHERE job_id = ? AND pit_id > ? ORDER BY pit_id
+    __table_args__ = (
+        Index("ix_pits_job_pit", "job_id", "pit_id"),
+    )
+
+class MonitoredLease(Base):
+    __tablename__ = "monitored_leases"
+
+    # A lease re-analysed window by window (monitoring.py)
+    lease_key = Column(String(64), primary_key=True)   # result_cache.cache_key of the lease (no dates)
+    name = Column(String)
+    backend = Column(String)
+    since = Column(Date)                                # Start of the first window
+    lease_geojson = Column(JSON)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    last_run_at = Column(DateTime, nullable=True)
+
+class MonitoringWindow(Base):
+    __tablename__ = "monitoring_windows"
+    __table_args__ = (UniqueConstraint("lease_key", "window_start", name="uq_monitoring_windows_lease_start"),)
+
+    # Metrics of one date window of a monitored lease; computed once, never recomputed
+    id = Column(Integer, primary_key=True, index=True)
+    lease_key = Column(String(64), ForeignKey("monitored_leases.lease_key", ondelete="CASCADE"), index=True)
+    window_start = Column(Date)
+    window_end = Column(Date)                           # Exclusive
+    illegal_area_m2 = Column(Float)
+    legal_area_m2 = Column(Float)
+    volume_m3 = Column(Float)
+    avg_depth_m = Column(Float)
+    truckloads = Column(Integer)
+    duration_s = Column(Float)
+
+    geometry = Column(Geometry('MULTIPOLYGON', srid=4326, spatial_index=True), nullable=True)  # Illegal pits
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class InspectionDailyStats(Base):
+    __tablename__ = "inspection_daily_stats"
+
+    # One row per day (of Inspection.created_at), bumped when a job finishes
+    day = Column(Date, primary_key=True)
+    inspections = Column(Integer, default=0)
+    illegal_area_m2 = Column(Float, default=0.0)
+    volume_m3 = Column(Float, default=0.0)
+    truckloads = Column(Integer, default=0)
+
+class ResultCache(Base):
+    __tablename__ = "result_cache"
+
+    # sha256 of canonical lease geometry + dates + detection parameters
+    cache_key = Column(String(64), primary_key=True)
+    job_id = Column(String)             # Job that produced the cached result
+    result = Column(JSON)               # Full run_unified_detection() output
+    artifact_dir = Column(String)       # Retained copy of the job's artifacts
+    size_bytes = Column(Integer, default=0)
+    hits = Column(Integer, default=0)
+
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    last_accessed = Column(DateTime, default=datetime.datetime.utcnow, index=True)
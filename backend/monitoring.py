@@ -0,0 +1,202 @@
+import datetime
+import hashlib
+import os
+import time
+
+import shapely.geometry
+
+import pit_vectors
+import result_cache
+from models import MonitoredLease, MonitoringWindow
+from phase1_detection import DEFAULT_START, DETECTION_BACKEND
+
+# --- CONFIGURATION ---
+MONITOR_WINDOW_MONTHS = int(os.getenv("MONITOR_WINDOW_MONTHS", "1"))
+MONITOR_DIR = os.getenv("MONITOR_DIR", "static/monitoring")   # Cached depth layers, one dir per lease
+# Local backend: one composite per window in <LOCAL_RASTER_DIR>/windows/<window start>/B4.tif, B8.tif,
+# B11.tif; the DEM (<LOCAL_RASTER_DIR>/DEM.tif) is shared by every window
+WINDOWS_SUBDIR = "windows"
+
+SERIES_COLUMNS = ("window_start", "window_end", "illegal_area_m2", "legal_area_m2", "volume_m3",
+                  "avg_depth_m", "truckloads")
+
+
+def lease_key(lease_geojson, backend):
+    """Lease geometry + detection parameters, without dates: one key per monitored lease."""
+    return result_cache.cache_key(lease_geojson, None, None, backend)
+
+
+def _add_months(day, months):
+    month = day.month - 1 + months
+    return datetime.date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def date_windows(since, until, months=MONITOR_WINDOW_MONTHS):
+    """[start, end) windows of `months` calendar months from since's month, up to the last one ended by `until`."""
+    start = since.replace(day=1)
+    windows = []
+    while _add_months(start, months) <= until:
+        windows.append((start, _add_months(start, months)))
+        start = _add_months(start, months)
+    return windows
+
+
+def window_metrics(stats):
+    """Same headline numbers as a full inspection."""
+    illegal_area, illegal_vol = stats["illegal_area_m2"], stats["illegal_vol_m3"]
+    return {
+        "illegal_area_m2": round(illegal_area, 2),
+        "legal_area_m2": round(stats["legal_area_m2"], 2),
+        "volume_m3": round(illegal_vol, 2),
+        "avg_depth_m": round(illegal_vol / illegal_area, 2) if illegal_area > 0 else 0.0,
+        "truckloads": int(illegal_vol / 15),
+    }
+
+
+# --- WINDOW SCANNERS ---
+# Both return scan(start, end) -> (stats, illegal pits); the depth layer is built
+# on the first window and reused for the rest.
+
+def _local_scanner(lease_geojson, key):
+    import local_detection
+
+    layers = {}
+
+    def scan(start, end):
+        paths = local_detection.resolve_raster_paths(
+            {"DEM": os.path.join(local_detection.LOCAL_RASTER_DIR, "DEM.tif")},
+            raster_dir=os.path.join(local_detection.LOCAL_RASTER_DIR, WINDOWS_SUBDIR, start.isoformat()),
+        )
+        with local_detection.LocalScene(paths, lease_geojson) as scene:
+            grid = hashlib.sha1(repr((tuple(scene.transform), scene.window.flatten())).encode()).hexdigest()[:12]
+            if grid not in layers:
+                path = os.path.join(MONITOR_DIR, key, f"depth_{grid}.npz")
+                if os.path.exists(path):
+                    layers[grid] = local_detection.DepthLayer.load(path)
+                else:
+                    print("⛰️ Computing the lease's depth layer (once; reused for every window)...")
+                    layers[grid] = local_detection.DepthLayer.compute(scene)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    layers[grid].save(path)
+        stats = local_detection.compute_local_metrics(lease_geojson, paths, vectorize=True, depth_layer=layers[grid],
+                                                      start_date=start.isoformat(), end_date=end.isoformat())
+        return stats, stats["vectors"]["illegal"]
+
+    return scan
+
+
+def _ee_scanner(lease_geojson):
+    from metrics_engine import compute_metrics
+    from phase1_detection import _ensure_earth_engine, build_detection_layers
+
+    _ensure_earth_engine()
+    depth = {}
+
+    def scan(start, end):
+        layers = build_detection_layers(lease_geojson, start.isoformat(), end.isoformat(),
+                                        depth_layers=depth.get("layers"))
+        depth["layers"] = {name: layers[name] for name in ("smooth_surface", "raw_depth", "depth_only_mask")}
+        stats = compute_metrics(layers["status_band"], layers["raw_depth"], layers["smooth_surface"],
+                                layers["search_zone"], vectorize=True)
+        return stats, pit_vectors.from_feature_collection(stats["vectors"])["illegal"]
+
+    return scan
+
+
+# --- MONITORING ---
+
+def register_lease(db, lease_geojson, name=None, since=None, backend=None):
+    """Starts monitoring a lease (idempotent: the same lease and parameters give the same key)."""
+    backend = backend or DETECTION_BACKEND
+    key = lease_key(lease_geojson, backend)
+    lease = db.get(MonitoredLease, key)
+    if lease is None:
+        lease = MonitoredLease(lease_key=key, name=name, backend=backend, lease_geojson=lease_geojson,
+                               since=since or datetime.date.fromisoformat(DEFAULT_START))
+        db.add(lease)
+        db.commit()
+    return lease
+
+
+def run_monitoring(db, key, until=None, progress=None):
+    """
+    Computes the windows of a monitored lease that have elapsed since its last
+    run (earlier windows are read back, never recomputed) and returns its change
+    series. A window whose composite is not available yet is left for the next run.
+    """
+    lease = db.get(MonitoredLease, key)
+    if lease is None:
+        raise ValueError(f"Unknown monitored lease: {key}")
+    until = until or datetime.date.today()
+    done = {start for start, in db.query(MonitoringWindow.window_start).filter(MonitoringWindow.lease_key == key)}
+    new = [window for window in date_windows(lease.since, until) if window[0] not in done]
+    print(f"📅 Monitoring {lease.name or key[:12]}: {len(done)} windows stored, {len(new)} to compute")
+
+    computed = 0
+    if new:
+        scan = (_local_scanner(lease.lease_geojson, key) if lease.backend == "local"
+                else _ee_scanner(lease.lease_geojson))
+        for start, end in new:
+            started = time.perf_counter()
+            try:
+                stats, pits = scan(start, end)
+            except Exception as e:
+                print(f"⚠️ Window {start}..{end} skipped (retried next run): {e}")
+                continue
+            metrics = window_metrics(stats)
+            db.add(MonitoringWindow(
+                lease_key=key, window_start=start, window_end=end, **metrics,
+                duration_s=round(time.perf_counter() - started, 3),
+                geometry=pit_vectors.to_db_geometry(shapely.geometry.mapping(pits) if pits else None),
+            ))
+            db.commit()
+            computed += 1
+            print(f"🛰️ {start}..{end}: {metrics['illegal_area_m2']:.0f} m² illegal")
+            if progress:
+                progress.stage("window", window_start=start.isoformat(), metrics=metrics)
+
+    lease.last_run_at = datetime.datetime.utcnow()
+    db.commit()
+    return {"lease_key": key, "name": lease.name, "windows_computed": computed,
+            "windows_reused": len(done), "series": change_series(db, key)}
+
+
+def change_series(db, key):
+    """Per-window metrics in date order, with the change from the previous window."""
+    rows = (db.query(*(getattr(MonitoringWindow, name) for name in SERIES_COLUMNS))
+            .filter(MonitoringWindow.lease_key == key)
+            .order_by(MonitoringWindow.window_start)
+            .all())
+    series, previous = [], None
+    for row in rows:
+        item = dict(row._mapping)
+        item["illegal_area_delta_m2"] = (round(row.illegal_area_m2 - previous.illegal_area_m2, 2)
+                                         if previous else None)
+        item["volume_delta_m3"] = round(row.volume_m3 - previous.volume_m3, 2) if previous else None
+        series.append(item)
+        previous = row
+    return series
+
+
+def refresh_all(session_factory, until=None):
+    """Runs every monitored lease (e.g. from a monthly cron: `python monitoring.py`)."""
+    db = session_factory()
+    try:
+        keys = [key for key, in db.query(MonitoredLease.lease_key)]
+        results = []
+        for key in keys:
+            try:
+                results.append(run_monitoring(db, key, until))
+            except Exception as e:
+                db.rollback()
+                print(f"❌ Monitoring {key[:12]} failed: {e}")
+        return results
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    for result in refresh_all(SessionLocal):
+        print(f"✅ {result['name'] or result['lease_key'][:12]}: {result['windows_computed']} new windows")
@@ -1,15 +1,38 @@
-import ee
-import geemap
+import functools
+import importlib
+import json
 import os
-from google.oauth2 import service_account
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import instrumentation
+from lazy_imports import lazy_module
+from metrics_engine import (
+    METRICS_MODE, RemoteCallCounter, compute_metrics, compute_metrics_adaptive, fetch_pixels, submit,
+    zones_to_collection,
+)
+import lease_zones
+import mesh_lod
+import pit_vectors
+from progress import ProgressTracker
 
-# Import Helpers (Keep your existing error handling)
-try:
-    from phase2_tin_viz import generate_tin_visualization
-    from report_generator import generate_pdf_report
-except ImportError:
-    generate_tin_visualization = None
-    generate_pdf_report = None
+# Imported on first use, so the API starts without the Earth Engine and mapping stacks
+ee = lazy_module("ee")
+geemap = lazy_module("geemap")
+
+# Optional artifact helpers, also imported on first use (None when not installed)
+@functools.lru_cache(maxsize=None)
+def _optional_helper(module, name):
+    try:
+        return getattr(importlib.import_module(module), name)
+    except ImportError:
+        return None
+
+def tin_visualizer():
+    return _optional_helper("phase2_tin_viz", "generate_tin_visualization")
+
+def pdf_reporter():
+    return _optional_helper("report_generator", "generate_pdf_report")
 
 # --- CONFIGURATION (Updated with Script 2 Values) ---
 PROJECT_ID = 'minesector' # Keep your project ID
@@ -22,114 +45,236 @@ CLOUD_THRESHOLD = 20
 OPTICAL_THRESHOLD = 0.07  # Increased from 0.05 to 0.07 (Stricter)
 NDVI_THRESHOLD = 0.25     # Kept for vegetation filtering
 MIN_DEPTH_THRESHOLD = 2.0   
+SEARCH_BUFFER_M = 2000      # Search zone around the lease, for encroachments
 DEM_SOURCE = 'COPERNICUS/DEM/GLO30' 
 
+# Detection backend: 'ee' (Earth Engine) or 'local' (GeoTIFFs via rasterio, see local_detection.py)
+DETECTION_BACKENDS = ("ee", "local")
+DETECTION_BACKEND = os.getenv("DETECTION_BACKEND", "ee")
+
+# Artifacts: 'eager' builds map/TIN/PDF during the run, 'lazy' only persists the
+# inputs needed to build them later (see artifact_store.py)
+ARTIFACT_MODE = os.getenv("ARTIFACT_MODE", "eager")
+ARTIFACT_FILES = {"map_url": "map_2d.html", "model_url": "model_3d.html", "report_url": "report.pdf"}
+ARTIFACT_INPUTS_FILE = "inputs.json"
+
+# 3D model: 'lod' (binary level-of-detail meshes and a small viewer, see mesh_lod.py)
+# or 'html' (the monolithic phase2_tin_viz page, when that module is installed)
+MODEL_3D_FORMAT = os.getenv("MODEL_3D_FORMAT", "lod")
+MODEL_GRID_SCALE_M = 30     # DEM resolution: a finer grid only resamples it
+MODEL_GRID_NODATA = -9999
+
+# Whole auth chain (credential probes + ee.Initialize) gives up after this long
+EE_AUTH_TIMEOUT_S = float(os.getenv("EE_AUTH_TIMEOUT_S", "30"))
+SERVICE_ACCOUNT_EMAIL = "mineguard-sa@minesector.iam.gserviceaccount.com"
+EE_CREDENTIALS_PATH = os.path.expanduser("~/.config/earthengine/credentials")
+
 # Global flag to track initialization status
 _ee_initialized = False
+_ee_init_lock = threading.Lock()
+# Last attempt, for /readyz: pending | initializing | ready | failed
+_ee_status = {"state": "pending", "method": None, "error": None, "seconds": None}
+
+def _service_account_credentials():
+    # Explicit service account with google.oauth2 (more reliable than auto-detection)
+    from google.oauth2 import service_account
+    return service_account.Credentials.from_service_account_file(
+        KEY_PATH, scopes=['https://www.googleapis.com/auth/earthengine'])
 
-def initialize_earth_engine():
+def _ee_service_account_credentials():
+    # EE's ServiceAccountCredentials (legacy method)
+    return ee.ServiceAccountCredentials(SERVICE_ACCOUNT_EMAIL, KEY_PATH)
+
+def _credential_probes():
     """
-    Initialize Earth Engine with explicit service account authentication.
-    This is more robust than relying on auto-detection.
+    (method, project, load credentials or None) in priority order; a method is
+    only listed when its credentials exist. The last one lets EE auto-detect.
     """
-    global _ee_initialized
-    
-    if _ee_initialized:
-        print("✅ Earth Engine already initialized")
-        return True
-    
-    print("🌍 Initializing Earth Engine...")
-    
-    # Method 1: Explicit service account with google.oauth2
+    probes = []
     if os.path.exists(KEY_PATH):
-        try:
-            print(f"📁 Loading service account from: {KEY_PATH}")
-            # Use google.oauth2.service_account for more reliable authentication
-            credentials = service_account.Credentials.from_service_account_file(
-                KEY_PATH,
-                scopes=['https://www.googleapis.com/auth/earthengine']
-            )
-            ee.Initialize(credentials=credentials, project=PROJECT_ID)
-            print(f"✅ Earth Engine initialized with service account for project: {PROJECT_ID}")
-            _ee_initialized = True
-            return True
-        except Exception as e:
-            print(f"⚠️  Explicit service account auth failed: {e}")
+        probes.append(("service account file", PROJECT_ID, _service_account_credentials))
+        probes.append(("EE ServiceAccountCredentials", PROJECT_ID, _ee_service_account_credentials))
     else:
         print(f"⚠️  Service account key not found at: {KEY_PATH}")
-    
-    # Method 2: Try EE's ServiceAccountCredentials (legacy method)
-    if os.path.exists(KEY_PATH):
+    if os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
+        probes.append(("application default credentials", PROJECT_ID, None))
+    if os.path.exists(EE_CREDENTIALS_PATH):
+        probes.append(("mounted host credentials", PROJECT_ID, None))
+    else:
+        print(f"⚠️  No credentials file found at: {EE_CREDENTIALS_PATH}")
+    probes.append(("no project specified", None, None))
+    return probes
+
+def _run_with_deadline(fn, timeout_s):
+    """
+    fn() on a daemon thread, waiting at most timeout_s. A call that overruns is
+    left to finish in the background (ee.Initialize cannot be cancelled).
+    """
+    outcome = {}
+    def target():
         try:
-            print("📁 Trying Earth Engine's ServiceAccountCredentials...")
-            service_account_email = "mineguard-sa@minesector.iam.gserviceaccount.com"
-            credentials = ee.ServiceAccountCredentials(service_account_email, KEY_PATH)
-            ee.Initialize(credentials=credentials, project=PROJECT_ID)
-            print(f"✅ Earth Engine initialized with EE ServiceAccountCredentials")
-            _ee_initialized = True
-            return True
+            outcome["result"] = fn()
         except Exception as e:
-            print(f"⚠️  EE ServiceAccountCredentials failed: {e}")
-    
-    # Method 3: Try environment variable (GOOGLE_APPLICATION_CREDENTIALS)
-    try:
-        if os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
-            print("📁 Trying GOOGLE_APPLICATION_CREDENTIALS environment variable...")
-            ee.Initialize(project=PROJECT_ID)
-            print(f"✅ Earth Engine initialized with application default credentials")
-            _ee_initialized = True
-            return True
-    except Exception as e:
-        print(f"⚠️  Application default credentials failed: {e}")
-    
-    # Method 4: Try mounted credentials from host (~/.config/earthengine)
-    try:
-        cred_path = os.path.expanduser("~/.config/earthengine/credentials")
-        if os.path.exists(cred_path):
-            print(f"📁 Found mounted credentials at: {cred_path}")
-            # Let Earth Engine auto-detect the credentials
-            ee.Initialize(project=PROJECT_ID)
-            print(f"✅ Earth Engine initialized with mounted host credentials")
-            _ee_initialized = True
+            outcome["error"] = e
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(max(timeout_s, 0))
+    if thread.is_alive():
+        raise TimeoutError(f"timed out after {timeout_s:.1f}s")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome.get("result")
+
+def initialize_earth_engine(timeout_s=None):
+    """
+    Initialize Earth Engine, trying each available credential source in turn,
+    within an overall deadline of `timeout_s` (EE_AUTH_TIMEOUT_S).
+
+    Credentials are loaded from disk in parallel (independent, read-only), but
+    ee.Initialize runs one source at a time: it sets process-wide client state,
+    so racing it between sources is not safe.
+    """
+    global _ee_initialized
+    timeout_s = EE_AUTH_TIMEOUT_S if timeout_s is None else timeout_s
+
+    with _ee_init_lock:
+        if _ee_initialized:
+            print("✅ Earth Engine already initialized")
             return True
-        else:
-            print(f"⚠️  No credentials file found at: {cred_path}")
-    except Exception as e:
-        print(f"⚠️  Mounted credentials failed: {e}")
-    
-    # Method 5: Try without project ID (last resort)
-    try:
-        print("📁 Trying initialization without project ID...")
-        ee.Initialize()
-        print(f"✅ Earth Engine initialized (no project specified)")
-        _ee_initialized = True
-        return True
-    except Exception as e:
-        print(f"⚠️  Initialization without project failed: {e}")
-    
-    # All methods failed
-    print("❌ All authentication methods failed!")
-    print("📋 Troubleshooting steps:")
-    print("   1. Register project at: https://code.earthengine.google.com/register")
-    print("   2. Enable Earth Engine API in Cloud Console")
-    print("   3. Grant 'Earth Engine Resource Admin' role to service account")
-    print("   4. Or run 'earthengine authenticate' on host machine")
-    _ee_initialized = False
-    raise Exception("Failed to initialize Earth Engine. Please check credentials and project registration.")
-    
-    return False
 
-def run_unified_detection(lease_geojson=None, filename="Manual_Input", output_dir="output", start_date=DEFAULT_START, end_date=DEFAULT_END):
+        print("🌍 Initializing Earth Engine...")
+        started = time.perf_counter()
+        deadline = started + timeout_s
+        _ee_status.update(state="initializing", method=None, error=None, seconds=None)
+
+        def finish(state, method=None, error=None):
+            _ee_status.update(state=state, method=method, error=error,
+                              seconds=round(time.perf_counter() - started, 3))
+
+        probes = _credential_probes()
+        loaders = {method: loader for method, _, loader in probes if loader}
+        futures = {}
+        if loaders:
+            pool = ThreadPoolExecutor(max_workers=len(loaders), thread_name_prefix="ee-auth")
+            futures = {method: pool.submit(loader) for method, loader in loaders.items()}
+            wait(futures.values(), timeout=max(deadline - time.perf_counter(), 0))
+            pool.shutdown(wait=False)
+
+        errors = []
+        for method, project, loader in probes:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                errors.append(f"{method}: skipped, auth deadline reached")
+                continue
+            creds = None
+            if loader:
+                if not futures[method].done():
+                    errors.append(f"{method}: credentials did not load in time")
+                    continue
+                if futures[method].exception():
+                    print(f"⚠️  {method} failed: {futures[method].exception()}")
+                    errors.append(f"{method}: {futures[method].exception()}")
+                    continue
+                creds = futures[method].result()
+            try:
+                print(f"📁 Trying {method}...")
+                kwargs = {"credentials": creds} if creds else {}
+                if project:
+                    kwargs["project"] = project
+                _run_with_deadline(lambda: ee.Initialize(**kwargs), remaining)
+                print(f"✅ Earth Engine initialized with {method}"
+                      + (f" for project: {project}" if project else "")
+                      + f" ({time.perf_counter() - started:.1f}s)")
+                _ee_initialized = True
+                finish("ready", method)
+                return True
+            except Exception as e:
+                print(f"⚠️  {method} failed: {e}")
+                errors.append(f"{method}: {e}")
+                if isinstance(e, TimeoutError):
+                    # The overrunning ee.Initialize may still be running; don't start another
+                    break
+
+        # All methods failed
+        print("❌ All authentication methods failed!")
+        print("📋 Troubleshooting steps:")
+        print("   1. Register project at: https://code.earthengine.google.com/register")
+        print("   2. Enable Earth Engine API in Cloud Console")
+        print("   3. Grant 'Earth Engine Resource Admin' role to service account")
+        print("   4. Or run 'earthengine authenticate' on host machine")
+        _ee_initialized = False
+        finish("failed", error="; ".join(errors))
+        raise Exception("Failed to initialize Earth Engine. Please check credentials and project registration.")
+
+def earth_engine_status():
+    """Copy of the last initialization attempt (state, method, error, seconds)."""
+    return dict(_ee_status)
+
+def run_unified_detection(lease_geojson=None, filename="Manual_Input", output_dir="output", start_date=DEFAULT_START, end_date=DEFAULT_END, backend=None, **backend_options):
+    """
+    Runs the triple-lock detection on the selected backend ('ee' or 'local').
+    Both backends return the same result dictionary.
+    """
+    runner = get_detection_backend(backend or DETECTION_BACKEND)
+    return runner(lease_geojson, filename=filename, output_dir=output_dir,
+                  start_date=start_date, end_date=end_date, **backend_options)
+
+def get_detection_backend(name):
+    """Resolves a backend name to its runner; the local one is imported lazily."""
+    if name == "ee":
+        return run_ee_detection
+    if name == "local":
+        from local_detection import run_local_detection
+        return run_local_detection
+    raise ValueError(f"Unknown detection backend '{name}' (expected one of: {', '.join(DETECTION_BACKENDS)})")
+
+def _ensure_earth_engine():
     # Ensure Earth Engine is initialized before proceeding
     if not _ee_initialized:
         try:
             initialize_earth_engine()
         except Exception as e:
             raise Exception(f"Cannot run detection: Earth Engine initialization failed - {e}")
-    
-    os.makedirs(output_dir, exist_ok=True)
-    lid_elevation = 0.0
-    
+
+def build_depth_layers(search_zone):
+    """
+    The date-independent half of the triple lock: DEM, smoothed surface and depth.
+    Monitoring builds it once per lease and reuses it for every date window.
+    """
+    # Script 2 Logic: Focal Mean (Smoothed) - Raw DEM
+    dem = ee.ImageCollection(DEM_SOURCE).select("DEM").mosaic().clip(search_zone)
+
+    # Calculate "Smoothed" surface (Hypothetical pre-mining surface)
+    smooth_surface = dem.focal_mean(radius=250, units="meters")
+
+    # Depth = Smoothed Surface - Actual Ground
+    raw_depth = smooth_surface.subtract(dem).rename("depth")
+    depth_only_mask = raw_depth.gt(MIN_DEPTH_THRESHOLD)
+    return {"smooth_surface": smooth_surface, "raw_depth": raw_depth, "depth_only_mask": depth_only_mask}
+
+def _utm_search_zone(lease_geojson, search_buffer_m=SEARCH_BUFFER_M):
+    """The buffered search zone on the lease's UTM grid (client-side), and that grid's CRS."""
+    import shapely.geometry
+    from file_processor import reproject, utm_transformers
+
+    geom = shapely.geometry.shape(lease_geojson or {
+        "type": "Polygon", "coordinates": [[[86.40, 23.70], [86.45, 23.70], [86.45, 23.75], [86.40, 23.75]]]})
+    forward, _ = utm_transformers(geom)
+    return reproject(geom, forward).buffer(search_buffer_m), forward.target_crs.to_string()
+
+def search_zone_area_m2(lease_geojson, search_buffer_m=SEARCH_BUFFER_M):
+    """Area of the buffered search zone, computed client-side (sizes the adaptive metrics)."""
+    return _utm_search_zone(lease_geojson, search_buffer_m)[0].area
+
+def build_detection_layers(lease_geojson=None, start_date=DEFAULT_START, end_date=DEFAULT_END, progress=None,
+                           search_buffer_m=SEARCH_BUFFER_M, depth_layers=None):
+    """
+    Builds the (lazy, server-side) Earth Engine graph of the triple lock.
+    Nothing is computed until a layer is reduced, mapped or exported.
+    `depth_layers` (build_depth_layers() of the same search zone) are reused as is.
+    """
+    progress = progress or ProgressTracker()
+
     # --- A. INPUT GEOMETRY ---
     if lease_geojson:
         try:
@@ -137,9 +282,10 @@ def run_unified_detection(lease_geojson=None, filename="Manual_Input", output_di
         except:
             roi = ee.Geometry.Polygon([[86.40, 23.70], [86.45, 23.70], [86.45, 23.75], [86.40, 23.75]])
     else:
+        print("⚠️ No lease polygon: scanning the default demo ROI (use sweep.py for regional scans)")
         roi = ee.Geometry.Polygon([[86.40, 23.70], [86.45, 23.70], [86.45, 23.75], [86.40, 23.75]])
 
-    search_zone = roi.buffer(2000) # Keep buffer to find encroachments
+    search_zone = roi.buffer(search_buffer_m) # Keep buffer to find encroachments
 
     # --- B. SENSOR DETECTION (IMPROVED LOGIC) ---
     print(f"🚀 Step 1: Multi-Sensor Scan ({start_date} to {end_date})...")
@@ -160,15 +306,10 @@ def run_unified_detection(lease_geojson=None, filename="Manual_Input", output_di
     optical_mask = ndbi.gt(OPTICAL_THRESHOLD).And(ndvi.lt(NDVI_THRESHOLD))
 
     # 2. DEPTH (Local vs Regional Elevation)
-    # Script 2 Logic: Focal Mean (Smoothed) - Raw DEM
-    dem = ee.ImageCollection(DEM_SOURCE).select("DEM").mosaic().clip(search_zone)
-    
-    # Calculate "Smoothed" surface (Hypothetical pre-mining surface)
-    smooth_surface = dem.focal_mean(radius=250, units="meters")
-    
-    # Depth = Smoothed Surface - Actual Ground
-    raw_depth = smooth_surface.subtract(dem).rename("depth")
-    depth_only_mask = raw_depth.gt(MIN_DEPTH_THRESHOLD)
+    depth_layers = depth_layers or build_depth_layers(search_zone)
+    smooth_surface, raw_depth = depth_layers["smooth_surface"], depth_layers["raw_depth"]
+    depth_only_mask = depth_layers["depth_only_mask"]
+    progress.stage("sensor_scan")
 
    # --- C. TRIPLE LOCK FUSION & CLASSIFICATION ---
     print("🔒 Applying Triple Lock Verification...")
@@ -196,40 +337,9 @@ def run_unified_detection(lease_geojson=None, filename="Manual_Input", output_di
 
 # 🔴 ILLEGAL: Outside Boundary + Triple Lock
     illegal_mining = mining_base.And(boundary_mask.eq(0))
+    progress.stage("triple_lock")
 
-    # --- D. QUANTIFICATION (UNCHANGED) ---
-    print("📊 Calculating Metrics...")
-    
-    def get_metrics(mask, name):
-        # Calculate Area
-        area = mask.multiply(ee.Image.pixelArea()).reduceRegion(
-            reducer=ee.Reducer.sum(), geometry=search_zone, scale=10, maxPixels=1e9
-        ).values().get(0).getInfo() or 0.0
-        
-        # Calculate Volume (Area * Depth at that pixel)
-        vol_layer = raw_depth.updateMask(mask)
-        vol = vol_layer.multiply(ee.Image.pixelArea()).reduceRegion(
-            reducer=ee.Reducer.sum(), geometry=search_zone, scale=30, maxPixels=1e9
-        ).values().get(0).getInfo() or 0.0
-        
-        return area, vol
-
-    legal_area_m2, legal_vol_m3 = get_metrics(legal_mining, "Legal")
-    illegal_area_m2, illegal_vol_m3 = get_metrics(illegal_mining, "Illegal")
-
-    total_area_m2 = legal_area_m2 + illegal_area_m2
-    total_vol_m3 = legal_vol_m3 + illegal_vol_m3
-    avg_depth_m = illegal_vol_m3 / illegal_area_m2 if illegal_area_m2 > 0 else 0.0
-
-    # Get Lid Elevation (for 3D viz referencing)
-    if legal_area_m2 > 0:
-        lid_stats = smooth_surface.updateMask(legal_mining).reduceRegion(
-            reducer=ee.Reducer.mean(), geometry=search_zone, scale=30, maxPixels=1e9
-        )
-        lid_val = lid_stats.values().get(0).getInfo()
-        lid_elevation = lid_val if lid_val else 0.0
-
-    # --- E. PREPARE 3D DATA ---
+    # --- D. PREPARE 3D DATA ---
     status_band = ee.Image.constant(0) \
         .where(illegal_mining, 1) \
         .where(legal_mining, 2) \
@@ -237,64 +347,235 @@ def run_unified_detection(lease_geojson=None, filename="Manual_Input", output_di
     
     combined_image = raw_depth.addBands(status_band)
 
-    # --- F. OUTPUT GENERATION ---
-    
-    # 1. 2D Map (Updated Layers)
-    Map = geemap.Map()
-    Map.centerObject(roi, 14)
-    Map.addLayer(s2_image, {"min":0, "max":3000, "bands":["B4","B3","B2"]}, "Satellite Image")
-    
-    # Visualizing the components helps debug
-    Map.addLayer(optical_mask.selfMask(), {"palette":["yellow"]}, "Optical Hints (NDBI)")
-    Map.addLayer(depth_only_mask.selfMask(), {"palette":["cyan"]}, "Depth Hints")
-    
-    # Final Result
-    Map.addLayer(legal_mining.selfMask(), {"palette":["#00ff00"]}, "✅ LEGAL MINING")
-    Map.addLayer(illegal_mining.selfMask(), {"palette":["#ff0000"]}, "🚨 ILLEGAL MINING")
-    Map.addLayer(roi, {"color":"blue", "width":3}, "Lease Boundary")
+    return {
+        "roi": roi, "search_zone": search_zone, "s2_image": s2_image,
+        "optical_mask": optical_mask, "depth_only_mask": depth_only_mask,
+        "smooth_surface": smooth_surface, "raw_depth": raw_depth,
+        "legal_mining": legal_mining, "illegal_mining": illegal_mining,
+        "status_band": status_band, "combined_image": combined_image,
+    }
+
+def run_ee_detection(lease_geojson=None, filename="Manual_Input", output_dir="output", start_date=DEFAULT_START, end_date=DEFAULT_END, progress=None, artifact_mode=None, leases=None):
+    """
+    Earth Engine backend. With `leases` (process_lease_features() output, whose
+    union is `lease_geojson`), per-lease results are returned under "leases".
+    """
+    _ensure_earth_engine()
     
-    map_filename = "map_2d.html"
-    Map.to_html(os.path.join(output_dir, map_filename))
+    os.makedirs(output_dir, exist_ok=True)
+    progress = progress or ProgressTracker()
+    artifact_mode = artifact_mode or ARTIFACT_MODE
 
-    # 2. 3D TIN
-    tin_filename = "model_3d.html"
-    tin_full_path = os.path.join(output_dir, tin_filename)
-    if (total_area_m2) > 0 and generate_tin_visualization:
-        generate_tin_visualization(combined_image, search_zone, total_area_m2, output_path=tin_full_path)
+    layers = build_detection_layers(lease_geojson, start_date, end_date, progress)
+    search_zone = layers["search_zone"]
 
-    # 3. PDF Report
-    pdf_filename = "report.pdf"
-    if generate_pdf_report:
-        report_data = {
-            "start_date": start_date, "end_date": end_date, "dem_source": DEM_SOURCE,
-            "filename": os.path.basename(filename),
-            "illegal_area": illegal_area_m2, 
-            "legal_area": legal_area_m2,
-            "lid_elevation": lid_elevation, 
-            "avg_depth": avg_depth_m, 
-            "volume": illegal_vol_m3, 
-            "total_volume": total_vol_m3,
-            "trucks": int(illegal_vol_m3 / 15) if illegal_vol_m3 else 0
-        }
-        try:
-            generate_pdf_report(report_data, output_path=os.path.join(output_dir, pdf_filename))
-        except Exception as e:
-            print(f"PDF Error: {e}")
+    # --- E. QUANTIFICATION (single round-trip) ---
+    print("📊 Calculating Metrics...")
+    remote_calls = RemoteCallCounter()
+
+    # One grouped reduction keyed on the status band replaces the old
+    # per-class area/volume getInfo() calls and the separate lid elevation fetch.
+    # The pit outlines are vectorised in the same request.
+    # Per-lease zone sums (one reduceRegions) ride along in the same request too.
+    # The map's tile requests are independent of the metrics: start them first, they run concurrently.
+    map_requests = request_map_layers(layers, remote_calls) if artifact_mode != "lazy" else None
+
+    # In adaptive mode, large search zones get a coarse estimate first (see metrics_engine.py).
+    zones = lease_zones.build_lease_zones(leases) if leases else None
+    zones = zones_to_collection(zones) if zones else None
+    if METRICS_MODE == "adaptive":
+        stats = compute_metrics_adaptive(layers["status_band"], layers["raw_depth"], layers["smooth_surface"],
+                                         search_zone, search_zone_area_m2(lease_geojson), counter=remote_calls,
+                                         vectorize=True, zones=zones, progress=progress)
+    else:
+        stats = compute_metrics(layers["status_band"], layers["raw_depth"], layers["smooth_surface"],
+                                search_zone, counter=remote_calls, vectorize=True, zones=zones)
+    vectors = pit_vectors.to_geojson(pit_vectors.from_feature_collection(stats["vectors"]))
+    lease_results = (lease_zones.summarize_zones(stats["zones"], [lease["lease_id"] for lease in leases])
+                     if leases else None)
+
+    legal_area_m2, legal_vol_m3 = stats["legal_area_m2"], stats["legal_vol_m3"]
+    illegal_area_m2, illegal_vol_m3 = stats["illegal_area_m2"], stats["illegal_vol_m3"]
+    lid_elevation = stats["lid_elevation"]
+
+    total_area_m2 = legal_area_m2 + illegal_area_m2
+    total_vol_m3 = legal_vol_m3 + illegal_vol_m3
+    avg_depth_m = illegal_vol_m3 / illegal_area_m2 if illegal_area_m2 > 0 else 0.0
+    print(f"📡 Remote calls for metrics and map: {remote_calls.count}")
+
+    metrics = {
+        "illegal_area_m2": round(illegal_area_m2, 2),
+        "legal_area_m2": round(legal_area_m2, 2),
+        "volume_m3": round(illegal_vol_m3, 2),
+        "total_vol_m3": round(total_vol_m3, 2),
+        "avg_depth_m": round(avg_depth_m, 2),
+        "truckloads": int(illegal_vol_m3 / 15)
+    }
+    # Metrics go out before the (slow) artifacts are built
+    progress.stage("metrics", metrics=metrics, **({"leases": lease_results} if leases else {}))
+
+    # --- F. OUTPUT GENERATION ---
+    report_data = {
+        "start_date": start_date, "end_date": end_date, "dem_source": DEM_SOURCE,
+        "filename": os.path.basename(filename),
+        "illegal_area": illegal_area_m2, 
+        "legal_area": legal_area_m2,
+        "lid_elevation": lid_elevation, 
+        "avg_depth": avg_depth_m, 
+        "volume": illegal_vol_m3, 
+        "total_volume": total_vol_m3,
+        "trucks": int(illegal_vol_m3 / 15) if illegal_vol_m3 else 0
+    }
+    save_artifact_inputs(output_dir, {
+        "backend": "ee", "lease_geojson": lease_geojson,
+        "start_date": start_date, "end_date": end_date,
+        "total_area_m2": total_area_m2, "report_data": report_data,
+    })
+
+    map_filename = ARTIFACT_FILES["map_url"]
+    tin_filename = ARTIFACT_FILES["model_url"]
+    pdf_filename = ARTIFACT_FILES["report_url"]
+
+    if artifact_mode == "lazy":
+        # Built on first download from inputs.json (see artifact_store.py)
+        for stage in ("map_2d", "model_3d", "pdf"):
+            progress.stage(stage, deferred=True)
+        # Only advertise what can actually be built later
+        if not model_3d_available():
+            tin_filename = None
+        if not pdf_reporter():
+            pdf_filename = None
+    else:
+        # 1. 2D Map (Updated Layers)
+        build_map_artifact(layers, os.path.join(output_dir, map_filename), map_requests)
+        progress.stage("map_2d")
+
+        # 2. 3D TIN
+        build_tin_artifact(layers, total_area_m2, os.path.join(output_dir, tin_filename), lease_geojson)
+        progress.stage("model_3d")
+
+        # 3. PDF Report
+        build_report_artifact(report_data, os.path.join(output_dir, pdf_filename))
+        progress.stage("pdf")
 
     # --- G. RETURN METRICS ---
     return {
         "status": "success",
-        "metrics": {
-            "illegal_area_m2": round(illegal_area_m2, 2),
-            "legal_area_m2": round(legal_area_m2, 2),
-            "volume_m3": round(illegal_vol_m3, 2),
-            "total_vol_m3": round(total_vol_m3, 2),
-            "avg_depth_m": round(avg_depth_m, 2),
-            "truckloads": int(illegal_vol_m3 / 15)
-        },
+        "metrics": metrics,
         "artifacts": {
             "map_url": map_filename,
             "model_url": tin_filename if total_area_m2 > 0 else None,
             "report_url": pdf_filename
-        }
-    }
\ No newline at end of file
+        },
+        "vectors": vectors,
+        "leases": lease_results,
+        "diagnostics": {**remote_calls.as_dict(), **({"metrics": stats["adaptive"]} if "adaptive" in stats else {})}
+    }
+
+# --- ARTIFACT BUILDERS (used eagerly above, or lazily by artifact_store.py) ---
+
+def request_map_layers(layers, counter=None):
+    """
+    Starts every getMapId() request of the 2D map (and its centre) on the EE
+    scheduler at once; build_map_artifact() collects the results.
+    """
+    outline = ee.Image().byte().paint(ee.FeatureCollection([ee.Feature(layers["roi"])]), 0, 3)
+    specs = [
+        (layers["s2_image"], {"min":0, "max":3000, "bands":["B4","B3","B2"]}, "Satellite Image"),
+        # Visualizing the components helps debug
+        (layers["optical_mask"].selfMask(), {"palette":["yellow"]}, "Optical Hints (NDBI)"),
+        (layers["depth_only_mask"].selfMask(), {"palette":["cyan"]}, "Depth Hints"),
+        # Final Result
+        (layers["legal_mining"].selfMask(), {"palette":["#00ff00"]}, "✅ LEGAL MINING"),
+        (layers["illegal_mining"].selfMask(), {"palette":["#ff0000"]}, "🚨 ILLEGAL MINING"),
+        (outline, {"palette":["blue"]}, "Lease Boundary"),
+    ]
+    return {
+        "center": submit(layers["roi"].centroid(1).coordinates().getInfo, counter=counter, label="map_center"),
+        "layers": [(name, submit(image.getMapId, vis, counter=counter, label="map_id")) for image, vis, name in specs],
+    }
+
+def build_map_artifact(layers, output_path, requests=None):
+    """2D geemap HTML with the sensor hints and the legal/illegal result layers."""
+    with instrumentation.timer("artifact_build_seconds", artifact="map_2d"):
+        requests = requests or request_map_layers(layers)
+        Map = geemap.Map()
+        lon, lat = requests["center"].result()
+        Map.set_center(lon, lat, 14)
+        for name, map_id in requests["layers"]:
+            Map.add_tile_layer(map_id.result()["tile_fetcher"].url_format, name=name, attribution="Google Earth Engine")
+        Map.to_html(output_path)
+
+def model_3d_available():
+    return MODEL_3D_FORMAT == "lod" or tin_visualizer() is not None
+
+def request_model_grid(layers, lease_geojson, search_buffer_m=SEARCH_BUFFER_M):
+    """
+    Depth (NaN outside the search zone) and status of the search zone on a UTM grid
+    of at most mesh_lod.MESH_MAX_GRID pixels a side, in one computePixels request.
+    Returns (depth, status, pixel size in metres).
+    """
+    import numpy as np
+
+    zone, crs = _utm_search_zone(lease_geojson, search_buffer_m)
+    minx, miny, maxx, maxy = zone.bounds
+    scale = max(MODEL_GRID_SCALE_M, max(maxx - minx, maxy - miny) / (mesh_lod.MESH_MAX_GRID - 1))
+    grid = {
+        "dimensions": {"width": int(np.ceil((maxx - minx) / scale)) + 1,
+                       "height": int(np.ceil((maxy - miny) / scale)) + 1},
+        "affineTransform": {"scaleX": scale, "shearX": 0, "translateX": minx,
+                            "shearY": 0, "scaleY": -scale, "translateY": maxy},
+        "crsCode": crs,
+    }
+    pixels = fetch_pixels(layers["combined_image"].unmask(MODEL_GRID_NODATA).toFloat(), grid, label="model_grid")
+    depth = pixels["depth"].astype(np.float32)
+    depth[depth == MODEL_GRID_NODATA] = np.nan
+    return depth, pixels["status"].astype(np.uint8), scale
+
+def build_tin_artifact(layers, total_area_m2, output_path, lease_geojson=None):
+    """3D model of depth + status, only when there is mining (see MODEL_3D_FORMAT)."""
+    if total_area_m2 <= 0:
+        return
+    if MODEL_3D_FORMAT == "lod":
+        depth, status, scale = request_model_grid(layers, lease_geojson)
+        mesh_lod.write_lod_model(depth, status, scale, output_path)
+        return
+    generate_tin_visualization = tin_visualizer()
+    if generate_tin_visualization:
+        with instrumentation.timer("artifact_build_seconds", artifact="model_3d"):
+            generate_tin_visualization(layers["combined_image"], layers["search_zone"], total_area_m2, output_path=output_path)
+
+def build_report_artifact(report_data, output_path):
+    """PDF report from the metrics (no Earth Engine access needed)."""
+    generate_pdf_report = pdf_reporter()
+    if generate_pdf_report:
+        try:
+            with instrumentation.timer("artifact_build_seconds", artifact="pdf"):
+                generate_pdf_report(report_data, output_path=output_path)
+        except Exception as e:
+            print(f"PDF Error: {e}")
+
+def save_artifact_inputs(output_dir, inputs):
+    """Persists everything needed to (re)build the job's artifacts later."""
+    with open(os.path.join(output_dir, ARTIFACT_INPUTS_FILE), "w") as f:
+        json.dump(inputs, f)
+
+def build_artifact(filename, inputs, output_path):
+    """
+    Builds one artifact from persisted inputs. The map and TIN re-create the
+    Earth Engine graph (no metric round-trips); the PDF only needs the metrics.
+    """
+    if filename == ARTIFACT_FILES["report_url"]:
+        build_report_artifact(inputs["report_data"], output_path)
+        return
+    if inputs.get("backend", "ee") != "ee":
+        raise ValueError(f"{filename} is only available for Earth Engine jobs")
+
+    _ensure_earth_engine()
+    layers = build_detection_layers(inputs["lease_geojson"], inputs["start_date"], inputs["end_date"])
+    if filename == ARTIFACT_FILES["map_url"]:
+        build_map_artifact(layers, output_path)
+    elif filename == ARTIFACT_FILES["model_url"]:
+        build_tin_artifact(layers, inputs["total_area_m2"], output_path, inputs["lease_geojson"])
+    else:
+        raise ValueError(f"Unknown artifact: {filename}")
@@ -0,0 +1,150 @@
+import os
+
+import numpy as np
+from rasterio.warp import transform as transform_coords
+
+# --- CONFIGURATION ---
+# Pits smaller than this are dropped from the inventory (noise, single pixels)
+PIT_MIN_AREA_M2 = float(os.getenv("PIT_MIN_AREA_M2", "300"))
+
+# Sums are fixed-point integers, like local_detection, so blocks never change the result
+FIXED_POINT_SCALE = 1e6
+
+# Per-run columns: scene row, first col, end col (exclusive), pixels, pixels inside
+# the lease, sum of depth (fixed point), max depth
+RUN_FIELDS = ("row", "c0", "c1", "px", "inside_px", "depth_sum", "depth_max")
+
+LOCATIONS = ("outside", "inside", "straddling")
+
+
+def block_runs(mining, inside, depth, row_off, col_off):
+    """
+    Horizontal runs of mining pixels in one block, with their sums, in one pass:
+    the run boundaries come from a row-wise diff, and because mining[mining]
+    lists the pixels run by run, every statistic is a reduceat over those runs.
+    """
+    # Row-major edges alternate run start, run end
+    rows, cols = np.nonzero(np.diff(np.pad(mining, ((0, 0), (1, 1))).view(np.int8), axis=1))
+    if rows.size == 0:
+        return None
+    rows, c0, c1 = rows[0::2], cols[0::2], cols[1::2]
+    starts = np.concatenate(([0], np.cumsum(c1 - c0)[:-1]))
+    pit_depth = depth[mining]
+    return {
+        "row": (rows + row_off).astype(np.int64),
+        "c0": (c0 + col_off).astype(np.int64),
+        "c1": (c1 + col_off).astype(np.int64),
+        "px": (c1 - c0).astype(np.int64),
+        "inside_px": np.add.reduceat(inside[mining].astype(np.int64), starts),
+        "depth_sum": np.add.reduceat(np.rint(pit_depth * FIXED_POINT_SCALE).astype(np.int64), starts),
+        "depth_max": np.maximum.reduceat(pit_depth, starts),
+    }
+
+
+def concat_runs(parts):
+    """Runs of every block as one table sorted by (row, c0)."""
+    parts = [part for part in parts if part]
+    if not parts:
+        return None
+    runs = {field: np.concatenate([part[field] for part in parts]) for field in RUN_FIELDS}
+    order = np.lexsort((runs["c0"], runs["row"]))
+    return {field: values[order] for field, values in runs.items()}
+
+
+def _adjacent_runs(runs):
+    """
+    Pairs of 8-connected runs: overlapping (or diagonally touching) runs on
+    consecutive rows, plus runs of one row that a block edge split in two.
+    """
+    row = runs["row"] - runs["row"].min()
+    c0, c1 = runs["c0"] - runs["c0"].min(), runs["c1"] - runs["c0"].min()
+    stride = int(c1.max()) + 2
+    start, end = row * stride + c0, row * stride + c1     # Both sorted: runs of a row are disjoint
+
+    # Runs of the previous row with c1 >= b0 and c0 <= b1 are a contiguous range
+    lo = np.searchsorted(end, (row - 1) * stride + c0, side="left")
+    hi = np.searchsorted(start, (row - 1) * stride + c1, side="right")
+    counts = np.maximum(hi - lo, 0)
+    b = np.repeat(np.arange(row.size), counts)
+    a = np.repeat(lo, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+
+    split = np.nonzero((row[1:] == row[:-1]) & (c0[1:] == c1[:-1]))[0]
+    return np.concatenate((a, split)), np.concatenate((b, split + 1))
+
+
+def _find(parent):
+    """Full path compression (pointer jumping) of the whole forest."""
+    while True:
+        grand = parent[parent]
+        if np.array_equal(grand, parent):
+            return parent
+        parent = grand
+
+
+def union_find(n, a, b):
+    """
+    Component root of each of n nodes given edges a-b: every round hooks the
+    larger root of each unjoined edge under the smaller one, then compresses.
+    """
+    parent = np.arange(n)
+    while a.size:
+        ra, rb = parent[a], parent[b]
+        joined = ra != rb
+        a, b, ra, rb = a[joined], b[joined], ra[joined], rb[joined]
+        if not a.size:
+            break
+        np.minimum.at(parent, np.maximum(ra, rb), np.minimum(ra, rb))
+        parent = _find(parent)
+    return parent
+
+
+def build_inventory(runs, transform, crs, pixel_area, min_area_m2=None):
+    """
+    Connected components of the runs (8-connected pits) with per-pit area,
+    volume, max/mean depth, centroid (lon, lat) and location relative to the
+    lease, largest first. Pits under `min_area_m2` are dropped.
+    """
+    min_area_m2 = PIT_MIN_AREA_M2 if min_area_m2 is None else min_area_m2
+    if runs is None:
+        return []
+    roots = union_find(runs["row"].size, *_adjacent_runs(runs))
+    _, pit = np.unique(roots, return_inverse=True)
+
+    px = np.bincount(pit, weights=runs["px"]).astype(np.int64)
+    inside_px = np.bincount(pit, weights=runs["inside_px"]).astype(np.int64)
+    # Pixel-centre sums: cols of a run add up to px * (c0 + c1 - 1) / 2, an exact integer
+    row_sum = np.bincount(pit, weights=runs["row"] * runs["px"])
+    col_sum = np.bincount(pit, weights=runs["px"] * (runs["c0"] + runs["c1"] - 1) // 2)
+    # Integer sums stay exact in int64 (bincount weights are float64)
+    order = np.argsort(pit, kind="stable")
+    first = np.searchsorted(pit[order], np.arange(px.size))
+    depth_sum = np.add.reduceat(runs["depth_sum"][order], first) / FIXED_POINT_SCALE
+    depth_max = np.maximum.reduceat(runs["depth_max"][order], first)
+
+    keep = np.nonzero(px * pixel_area >= min_area_m2)[0]
+    keep = keep[np.lexsort((row_sum[keep] / px[keep], -px[keep]))]   # Largest first, then north to south
+    px, inside_px, depth_sum, depth_max = px[keep], inside_px[keep], depth_sum[keep], depth_max[keep]
+    xs, ys = transform * (col_sum[keep] / px + 0.5, row_sum[keep] / px + 0.5)
+    lons, lats = transform_coords(crs, "EPSG:4326", np.atleast_1d(xs), np.atleast_1d(ys))
+
+    location = np.where(inside_px == px, 1, np.where(inside_px > 0, 2, 0))
+    columns = zip(
+        np.round(px * pixel_area, 2).tolist(), np.round(depth_sum * pixel_area, 2).tolist(),
+        np.round(depth_max, 2).tolist(), np.round(depth_sum / px, 2).tolist(),
+        np.round(inside_px * pixel_area, 2).tolist(), location.tolist(),
+        np.round(lons, 7).tolist(), np.round(lats, 7).tolist(),
+    )
+    return [
+        {"pit_id": rank, "area_m2": area, "volume_m3": volume, "max_depth_m": max_depth,
+         "mean_depth_m": mean_depth, "inside_area_m2": inside_area, "location": LOCATIONS[loc],
+         "centroid": [lon, lat]}
+        for rank, (area, volume, max_depth, mean_depth, inside_area, loc, lon, lat) in enumerate(columns, start=1)
+    ]
+
+
+def summarize(pits):
+    """Counts by location, for the API response and the progress event."""
+    summary = {"count": len(pits), "min_area_m2": PIT_MIN_AREA_M2}
+    for location in LOCATIONS:
+        summary[location] = sum(1 for p in pits if p["location"] == location)
+    return summary
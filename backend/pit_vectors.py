@@ -0,0 +1,102 @@
+import os
+
+import shapely
+import shapely.geometry
+import shapely.ops
+
+from file_processor import MIN_RING_VERTICES, ring_count
+
+# --- CONFIGURATION ---
+# Vertex budget per class (legal / illegal) for the stored MULTIPOLYGON
+PIT_MAX_VERTICES = int(os.getenv("PIT_MAX_VERTICES", "5000"))
+# Initial simplification tolerance; doubled until the budget is met (at most PIT_SIMPLIFY_MAX_STEPS times)
+PIT_SIMPLIFY_M = float(os.getenv("PIT_SIMPLIFY_M", "5"))
+PIT_SIMPLIFY_MAX_STEPS = 12
+PIT_SIMPLIFY_DEG = PIT_SIMPLIFY_M / 111_320  # Same tolerance for EPSG:4326 geometries
+
+PIT_CLASSES = ("illegal", "legal")
+STATUS_TO_CLASS = {1: "illegal", 2: "legal"}
+
+
+def to_multipolygon(geom):
+    """Keeps only the polygonal parts of `geom` as a MultiPolygon (None when empty)."""
+    if geom is None or geom.is_empty:
+        return None
+    if geom.geom_type == "Polygon":
+        return shapely.geometry.MultiPolygon([geom])
+    if geom.geom_type == "MultiPolygon":
+        return geom
+    parts = [g for g in getattr(geom, "geoms", []) if g.geom_type in ("Polygon", "MultiPolygon")]
+    return to_multipolygon(shapely.ops.unary_union(parts)) if parts else None
+
+
+def _keep_largest(multipolygon, max_vertices):
+    """Drops the smallest polygons until the rest fit in max_vertices."""
+    kept, count = [], 0
+    for polygon in sorted(multipolygon.geoms, key=lambda p: p.area, reverse=True):
+        n = shapely.get_num_coordinates(polygon)
+        if count + n <= max_vertices:
+            kept.append(polygon)
+            count += n
+    return shapely.geometry.MultiPolygon(kept) if kept else None
+
+
+def simplify_to_budget(geom, max_vertices=PIT_MAX_VERTICES, tolerance=PIT_SIMPLIFY_DEG):
+    """
+    Topology-preserving simplification, coarsened until the vertex budget is met.
+    A simplified ring keeps at least 4 coordinates, so when coarsening stops
+    paying off (too many pits for the budget) the smallest pits are dropped.
+    """
+    if geom is None:
+        return None
+    simplified = geom.simplify(tolerance, preserve_topology=True)
+    count = shapely.get_num_coordinates(simplified)
+    for _ in range(PIT_SIMPLIFY_MAX_STEPS):
+        if count <= max_vertices or count <= MIN_RING_VERTICES * ring_count(simplified):
+            break
+        tolerance *= 2
+        simplified = geom.simplify(tolerance, preserve_topology=True)
+        count = shapely.get_num_coordinates(simplified)
+    simplified = to_multipolygon(simplified)
+    if simplified is not None and count > max_vertices:
+        kept = _keep_largest(simplified, max_vertices)
+        dropped = len(simplified.geoms) - (len(kept.geoms) if kept else 0)
+        print(f"⚠️ Pit outlines: vertex budget not met ({count} > {max_vertices}), "
+              f"dropped the {dropped} smallest of {len(simplified.geoms)} polygons")
+        simplified = kept
+    return simplified
+
+
+def merge_shapes(shapes):
+    """Unions polygon fragments (e.g. pits split across tiles) into one MultiPolygon."""
+    polygons = [shapely.geometry.shape(s) for s in shapes]
+    return to_multipolygon(shapely.ops.unary_union(polygons)) if polygons else None
+
+
+def from_feature_collection(feature_collection):
+    """
+    Splits an Earth Engine reduceToVectors() result (labelProperty='status')
+    into one simplified MultiPolygon per class.
+    """
+    shapes = {name: [] for name in PIT_CLASSES}
+    for feature in (feature_collection or {}).get("features", []):
+        name = STATUS_TO_CLASS.get(int(feature.get("properties", {}).get("status", 0)))
+        if name and feature.get("geometry"):
+            shapes[name].append(feature["geometry"])
+    return {name: simplify_to_budget(merge_shapes(parts)) for name, parts in shapes.items()}
+
+
+def to_geojson(multipolygons):
+    """{'illegal': geojson|None, 'legal': geojson|None} for the API / job store."""
+    return {
+        name: shapely.geometry.mapping(geom) if geom is not None else None
+        for name, geom in multipolygons.items()
+    }
+
+
+def to_db_geometry(geojson):
+    """GeoJSON -> value for a Geometry('MULTIPOLYGON', srid=4326) column."""
+    from geoalchemy2.shape import from_shape
+
+    geom = to_multipolygon(shapely.geometry.shape(geojson)) if geojson else None
+    return from_shape(geom, srid=4326) if geom is not None else None
@@ -0,0 +1,38 @@
+import datetime
+import time
+
+# Pipeline stages in the order they are emitted
+STAGES = ("queued", "file_parsed", "sensor_scan", "triple_lock", "metrics_estimate", "metrics",
+          "map_2d", "model_3d", "pdf", "db_saved", "done")
+
+
+class ProgressTracker:
+    """
+    Records a timestamp and duration for each pipeline stage and forwards every
+    event to an optional listener (e.g. the streaming endpoint's queue).
+    """
+
+    def __init__(self, listener=None):
+        self.listener = listener
+        self.started = self._last = time.perf_counter()
+        self.stages = []
+
+    def stage(self, name, **data):
+        now = time.perf_counter()
+        event = {
+            "stage": name,
+            "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
+            "duration_s": round(now - self._last, 3),
+            "elapsed_s": round(now - self.started, 3),
+            **data,
+        }
+        self._last = now
+        self.stages.append({"stage": name, "duration_s": event["duration_s"]})
+
+        if self.listener:
+            try:
+                self.listener(event)
+            except Exception as e:
+                # A disconnected client must never break the job itself
+                print(f"⚠️ Progress listener error: {e}")
+        return event
@@ -0,0 +1,175 @@
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import shapely
+import shapely.geometry
+
+import tile_cache
+from metrics_engine import METRICS_LATENCY_BUDGET_S, METRICS_MODE, METRICS_PIXELS_PER_S
+from models import ResultCache
+from phase1_detection import (
+    CLOUD_THRESHOLD, DEM_SOURCE, DETECTION_BACKEND, MIN_DEPTH_THRESHOLD, NDVI_THRESHOLD,
+    OPTICAL_THRESHOLD,
+)
+
+# --- CONFIGURATION ---
+CACHE_DIR = "static/cache"
+CACHE_TTL_HOURS = float(os.getenv("CACHE_TTL_HOURS", str(24 * 30)))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "500"))
+CACHE_MAX_ARTIFACT_MB = float(os.getenv("CACHE_MAX_ARTIFACT_MB", "2048"))
+
+# Coordinates are snapped to 1e-7 degrees (~1 cm) before hashing
+KEY_PRECISION = 1e-7
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def canonical_geometry(lease_geojson):
+    """
+    Normalized WKB of the lease: snapped to KEY_PRECISION, then GEOS-normalized so
+    ring orientation, ring start vertex and part order do not change the bytes.
+    """
+    if not lease_geojson:
+        return "default-roi"
+    geom = shapely.geometry.shape(lease_geojson)
+    geom = shapely.normalize(shapely.set_precision(geom, KEY_PRECISION))
+    return shapely.to_wkb(geom, hex=True, output_dimension=2)
+
+
+def cache_key(lease_geojson, start_date, end_date, backend=None, leases=None):
+    """Hash of everything that determines the detection result."""
+    payload = {
+        "geometry": canonical_geometry(lease_geojson),
+        # Per-lease mode: the split into leases (and their IDs) changes the result too
+        "leases": [[lease["lease_id"], canonical_geometry(lease["geometry"])] for lease in leases or []],
+        "start_date": start_date,
+        "end_date": end_date,
+        "backend": backend or DETECTION_BACKEND,
+        "optical_threshold": OPTICAL_THRESHOLD,
+        "ndvi_threshold": NDVI_THRESHOLD,
+        "min_depth_threshold": MIN_DEPTH_THRESHOLD,
+        "cloud_threshold": CLOUD_THRESHOLD,
+        "dem_source": DEM_SOURCE,
+    }
+    if METRICS_MODE == "adaptive" and payload["backend"] == "ee":
+        payload["metrics_mode"] = [METRICS_MODE, METRICS_LATENCY_BUDGET_S, METRICS_PIXELS_PER_S]
+    if tile_cache.enabled() and payload["backend"] == "local":
+        # Cached depth tiles are smoothed over the whole DEM (see tile_cache.scene_tiles)
+        payload["depth"] = "tiled"
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def _link_or_copy(src, dst):
+    """Hard links keep cache hits O(1) on the same filesystem; copy otherwise."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _copy_tree(src_dir, dst_dir):
+    os.makedirs(dst_dir, exist_ok=True)
+    size = 0
+    for name in os.listdir(src_dir):
+        src = os.path.join(src_dir, name)
+        if os.path.isfile(src):
+            dst = os.path.join(dst_dir, name)
+            if not os.path.exists(dst):
+                _link_or_copy(src, dst)
+            size += os.path.getsize(src)
+    return size
+
+
+def _is_expired(entry, now):
+    return entry.created_at < now - datetime.timedelta(hours=CACHE_TTL_HOURS)
+
+
+def _drop(db, entry):
+    if entry.artifact_dir and os.path.isdir(entry.artifact_dir):
+        shutil.rmtree(entry.artifact_dir, ignore_errors=True)
+    db.delete(entry)
+    _count("evictions")
+
+
+def lookup(db, key):
+    """Returns the live cache entry for `key` (touching its LRU stamp) or None."""
+    entry = db.get(ResultCache, key)
+    now = datetime.datetime.utcnow()
+    if entry is not None and _is_expired(entry, now):
+        _drop(db, entry)
+        db.commit()
+        entry = None
+
+    if entry is None:
+        _count("misses")
+        return None
+
+    entry.hits = (entry.hits or 0) + 1
+    entry.last_accessed = now
+    db.commit()
+    _count("hits")
+    return entry
+
+
+def materialize(entry, job_output_dir):
+    """Links the cached artifacts into a new job folder and returns the stored result."""
+    if entry.artifact_dir and os.path.isdir(entry.artifact_dir):
+        _copy_tree(entry.artifact_dir, job_output_dir)
+    result = dict(entry.result)
+    result["cache"] = {"status": "hit", "source_job_id": entry.job_id}
+    return result
+
+
+def store(db, key, job_id, result, job_output_dir):
+    """Retains a copy of the job's artifacts and records the result, then evicts."""
+    artifact_dir = os.path.join(CACHE_DIR, key)
+    size = _copy_tree(job_output_dir, artifact_dir) if os.path.isdir(job_output_dir) else 0
+
+    entry = db.get(ResultCache, key) or ResultCache(cache_key=key)
+    entry.job_id = job_id
+    entry.result = {k: v for k, v in result.items() if k != "cache"}
+    entry.artifact_dir = artifact_dir
+    entry.size_bytes = size
+    entry.created_at = entry.last_accessed = datetime.datetime.utcnow()
+    db.add(entry)
+    db.commit()
+    evict(db)
+
+
+def evict(db):
+    """Drops expired entries, then least-recently-used ones over the entry/size budget."""
+    now = datetime.datetime.utcnow()
+    entries = db.query(ResultCache).order_by(ResultCache.last_accessed.asc()).all()
+
+    live = []
+    for entry in entries:
+        if _is_expired(entry, now):
+            _drop(db, entry)
+        else:
+            live.append(entry)
+
+    budget = CACHE_MAX_ARTIFACT_MB * 1024 * 1024
+    total = sum(entry.size_bytes or 0 for entry in live)
+    while live and (len(live) > CACHE_MAX_ENTRIES or total > budget):
+        entry = live.pop(0)
+        total -= entry.size_bytes or 0
+        _drop(db, entry)
+    db.commit()
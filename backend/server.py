@@ -1,42 +1,93 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Form
+import time
+_imports_started = time.perf_counter()
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Form, Request, Response, Body
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-import shutil
+import asyncio
+import datetime
+import email.utils
+import json
+import mimetypes
 import os
+import threading
 import uuid
 
 # Import Engines
-from file_processor import process_lease_file
-from phase1_detection import run_unified_detection, initialize_earth_engine
+from phase1_detection import DETECTION_BACKEND, earth_engine_status, initialize_earth_engine
+from file_processor import process_lease_features, process_lease_file
+from analysis_pipeline import API_PUBLIC_URL, UPLOAD_DIR, OUTPUT_DIR, run_analysis
+from job_queue import QUEUED, RUNNING, JobQueue, JobQueueFull, MemoryJobStore, SqlJobStore
+from progress import ProgressTracker
+import artifact_store
+import ee_scheduler
+import history_queries
+import instrumentation
+import lazy_imports
+import lease_registry
+import monitoring
+import result_cache
+import spatial_queries
+import sweep
+import tile_cache
+from upload_limits import UploadSizeLimit, UploadTooLarge, save_upload
 
 # Import Database
-from database import get_db
-from models import Inspection
+from database import get_db, SessionLocal
+from models import LeaseResult, MonitoredLease
+
+LEASE_RESULT_COLUMNS = [column for column in LeaseResult.__table__.columns if column.name != "geometry"]
+
+# Import and start-up timings (seconds), reported by /readyz
+startup_timings = {"imports_s": round(time.perf_counter() - _imports_started, 3)}
 
 # Initialize FastAPI app
 app = FastAPI(title="MineGuard Enterprise API")
 
-# --- INITIALIZE EARTH ENGINE AT STARTUP ---
-@app.on_event("startup")
-async def startup_event():
-    """Initialize Earth Engine when FastAPI starts"""
-    print("🚀 Starting MineGuard API...", flush=True)
+# --- START-UP (in the background: the API answers /healthz at once, /readyz when warm) ---
+def _timed(name, fn, *args):
+    started = time.perf_counter()
     try:
-        initialize_earth_engine()
-        print("✅ Startup complete!", flush=True)
+        return fn(*args)
+    finally:
+        startup_timings[name] = round(time.perf_counter() - started, 3)
+
+def _initialize_earth_engine():
+    try:
+        _timed("earth_engine_s", initialize_earth_engine)
+        print("✅ Earth Engine ready", flush=True)
     except Exception as e:
         print(f"⚠️  WARNING: Earth Engine initialization failed: {e}", flush=True)
         print("⚠️  API will start but Earth Engine operations will fail!", flush=True)
 
+def _warm_lease_registry():
+    # Load the lease registry now so the first inspection doesn't pay for it
+    _timed("lease_registry_s", lease_registry.get_registry, SessionLocal, 0)
+
+@app.on_event("startup")
+async def startup_event():
+    """Starts Earth Engine authentication and the lease registry load, concurrently, without waiting."""
+    print("🚀 Starting MineGuard API...", flush=True)
+    startup_timings["startup_s"] = round(time.perf_counter() - _imports_started, 3)
+    for target in (_initialize_earth_engine, _warm_lease_registry):
+        threading.Thread(target=target, name=target.__name__.strip("_"), daemon=True).start()
+    print(f"✅ Startup complete in {startup_timings['startup_s']:.1f}s (warming up in the background)", flush=True)
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     print("🛑 Shutting down MineGuard API...", flush=True)
+    job_queue.shutdown(wait=False)
+    sweep_queue.shutdown(wait=False)
+    monitor_queue.shutdown(wait=False)
 
-# --- CONFIGURATION ---
-# Get public URL from environment or default to localhost
-API_PUBLIC_URL = os.getenv("API_PUBLIC_URL", "http://localhost:8000")
+# Refuse oversized uploads while they stream in (413). Added before CORS, which
+# makes CORS the outer middleware: the 413 must carry its headers for the browser
+app.add_middleware(UploadSizeLimit)
 
 # Setup CORS
 app.add_middleware(
@@ -47,103 +98,474 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 3D model levels (mesh_lod.py); not in every system's mime.types
+mimetypes.add_type("model/gltf-binary", ".glb")
+
 # Setup Directories
-UPLOAD_DIR = "static/uploads"
-OUTPUT_DIR = "static/outputs"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# --- ARTIFACTS (registered before the /static mount so it takes precedence) ---
+@app.get("/static/outputs/{job_id}/{name}")
+async def get_artifact(job_id: str, name: str, request: Request):
+    """
+    Map / 3D model / PDF are built on first request from the job's persisted
+    inputs, stored content-addressed and served gzip-compressed with
+    ETag / Last-Modified so repeat downloads end in a 304.
+    """
+    if name not in artifact_store.LAZY_ARTIFACTS:
+        path = os.path.join(OUTPUT_DIR, os.path.basename(job_id), os.path.basename(name))
+        if not os.path.isfile(path):
+            raise HTTPException(status_code=404, detail="Not Found")
+        return FileResponse(path)
+
+    try:
+        entry = await run_in_threadpool(artifact_store.get_or_build, job_id, name)
+    except artifact_store.ArtifactNotFound:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    etag = f'"{entry["digest"]}"'
+    created = datetime.datetime.fromisoformat(entry["created"].rstrip("Z")).replace(tzinfo=datetime.timezone.utc)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": email.utils.format_datetime(created, usegmt=True),
+        # A job's artifact never changes once built
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Vary": "Accept-Encoding",
+    }
+
+    # Conditional requests: If-None-Match wins over If-Modified-Since
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since"):
+        try:
+            since = email.utils.parsedate_to_datetime(request.headers["if-modified-since"])
+            if created <= since:
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return FileResponse(artifact_store.blob_path(entry["digest"]), media_type=media_type, headers=headers)
+    body = await run_in_threadpool(artifact_store.read_blob, entry)
+    return Response(content=body, media_type=media_type, headers=headers)
+
 # Mount Static Files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+# Analysis jobs run on a bounded worker pool; state lives on the Inspection row
+job_queue = JobQueue(SqlJobStore(SessionLocal))
+# Regional sweeps are long; one at a time, tracked in memory (their checkpoints are on disk)
+sweep_queue = JobQueue(MemoryJobStore(), workers=1, max_queue=4)
+# Monitoring refreshes (one lease each), tracked in memory; the windows are in the database
+monitor_queue = JobQueue(MemoryJobStore(), workers=1, max_queue=64)
+
 @app.get("/")
 def home():
     return {"status": "MineGuard System v2.0 Online", "public_url": API_PUBLIC_URL}
 
-@app.post("/api/analyze")
-async def analyze_mining_site(
-    file: UploadFile = File(...), 
-    db: Session = Depends(get_db),
-    start_date: str = Form("2024-01-01"),
-    end_date: str = Form("2024-04-30")
-):
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok", "uptime_s": round(time.perf_counter() - _imports_started, 1)}
+
+@app.get("/readyz")
+def readyz(response: Response):
     """
-    Analyzes the file AND saves the result to the PostgreSQL Database.
+    Readiness: Earth Engine is initialized (unless the local backend is the
+    default) and the lease registry is loaded. 503 until then.
     """
+    earth_engine = earth_engine_status()
+    checks = {
+        "earth_engine": DETECTION_BACKEND == "local" or earth_engine["state"] == "ready",
+        "lease_registry": lease_registry.get_registry().refreshed_at is not None,
+    }
+    ready = all(checks.values())
+    status = "ready" if ready else "failed" if earth_engine["state"] == "failed" and not checks["earth_engine"] else "starting"
+    if not ready:
+        response.status_code = 503
+    return {"status": status, "checks": checks, "earth_engine": earth_engine,
+            "timings_s": startup_timings, "deferred_imports_s": lazy_imports.import_seconds()}
+
+async def _queue_upload(file, start_date, end_date, progress=None, per_lease=False, lease_id_field=None):
+    """Saves the upload off the event loop and queues its analysis job."""
     job_id = str(uuid.uuid4())[:8]
     user_filename = file.filename
-    # Sanitize filename
-    safe_filename = f"{job_id}_{user_filename.replace(' ', '_')}"
+    # Sanitize filename (one file per job: concurrent uploads never share a path)
+    safe_filename = f"{job_id}_{os.path.basename(user_filename).replace(' ', '_')}"
     file_path = os.path.join(UPLOAD_DIR, safe_filename)
-    
-    print(f"📥 Processing Job: {job_id} | File: {user_filename}")
 
-    # 1. Save & Process File
+    # 1. Save File (off the event loop, chunked, size-capped)
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        lease_geojson = process_lease_file(file_path)
+        await run_in_threadpool(save_upload, file.file, file_path)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         print(f"❌ File Error: {e}")
         raise HTTPException(status_code=500, detail=f"File Error: {str(e)}")
 
-    # 2. Run AI Engine
+    # 2. Queue the pipeline (the job store writes the Inspection row)
     try:
-        job_output_dir = os.path.join(OUTPUT_DIR, job_id)
-        
-        result = run_unified_detection(
-            lease_geojson, 
-            filename=user_filename,
-            output_dir=job_output_dir,
-            start_date=start_date,
-            end_date=end_date
-        )
-        
-        metrics = result["metrics"]
-        artifacts = result.get("artifacts", {})
-        
-        # 3. SAVE TO DATABASE
-        # Construct URLs using the dynamic API_PUBLIC_URL
-        url_report = f"{API_PUBLIC_URL}/static/outputs/{job_id}/{artifacts.get('report_url')}"
-        url_map = f"{API_PUBLIC_URL}/static/outputs/{job_id}/{artifacts.get('map_url')}"
-        url_model = None
-        if artifacts.get('model_url'):
-            url_model = f"{API_PUBLIC_URL}/static/outputs/{job_id}/{artifacts.get('model_url')}"
-        
-        new_inspection = Inspection(
-            job_id=job_id,
-            filename=user_filename,
-            illegal_area_m2=metrics["illegal_area_m2"],
-            volume_m3=metrics["volume_m3"],
-            avg_depth_m=metrics["avg_depth_m"],
-            truckloads=metrics["truckloads"],
-            status=result["status"],
-            report_url=url_report,
-            map_url=url_map,
-            model_url=url_model
+        await run_in_threadpool(
+            job_queue.submit, job_id, run_analysis,
+            job_id, file_path, user_filename, start_date, end_date,
+            fields={"filename": user_filename}, progress=progress,
+            per_lease=per_lease, lease_id_field=lease_id_field or None
         )
-        
-        db.add(new_inspection)
-        db.commit()
-        db.refresh(new_inspection)
-        print(f"💾 Saved to Database: Inspection ID {new_inspection.id}")
+    except JobQueueFull as e:
+        os.remove(file_path)
+        raise HTTPException(status_code=503, detail=str(e))
 
-        # Return result with correct URLs
-        result["urls"] = {
-            "report": url_report,
-            "map": url_map,
-            "3d_model": url_model
-        }
+    print(f"🧾 Queued Job: {job_id} | File: {user_filename}")
+    return job_id
 
-        return result
+@app.post("/api/analyze", status_code=202)
+async def analyze_mining_site(
+    file: UploadFile = File(...), 
+    start_date: str = Form("2024-01-01"),
+    end_date: str = Form("2024-04-30"),
+    per_lease: bool = Form(False),
+    lease_id_field: str = Form(None)
+):
+    """
+    Queues the file for analysis and returns the job ID immediately.
+    Poll /api/jobs/{job_id} for progress; the result is saved to the database.
+    With per_lease, each feature of the file is scored as its own lease.
+    """
+    job_id = await _queue_upload(file, start_date, end_date, per_lease=per_lease, lease_id_field=lease_id_field)
+    return {
+        "job_id": job_id,
+        "state": "queued",
+        "status_url": f"{API_PUBLIC_URL}/api/jobs/{job_id}"
+    }
 
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        print(f"❌ Pipeline Error: {e}")
-        raise HTTPException(status_code=500, detail=f"Pipeline Error: {str(e)}")
+@app.post("/api/analyze/stream")
+async def analyze_mining_site_stream(
+    file: UploadFile = File(...),
+    start_date: str = Form("2024-01-01"),
+    end_date: str = Form("2024-04-30"),
+    per_lease: bool = Form(False),
+    lease_id_field: str = Form(None)
+):
+    """
+    Same job as /api/analyze, but streams one NDJSON event per pipeline stage
+    (with timestamp and stage duration). Metrics arrive in the 'metrics' event,
+    before the artifacts are built; the stream ends with 'done' or 'failed'.
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    progress = ProgressTracker(lambda event: loop.call_soon_threadsafe(events.put_nowait, event))
+    await _queue_upload(file, start_date, end_date, progress=progress,
+                        per_lease=per_lease, lease_id_field=lease_id_field)
+
+    async def event_stream():
+        try:
+            while True:
+                event = await events.get()
+                yield json.dumps(jsonable_encoder(event)) + "\n"
+                if event["stage"] in ("done", "failed"):
+                    break
+        finally:
+            # Client gone (or stream over): the job keeps running, its events stop queueing
+            progress.listener = None
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str, timings: bool = False):
+    """Job state, and the full result once it is done (with its hot-path timings if `timings`)."""
+    job = job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    if not timings and isinstance(job.get("result"), dict):
+        job["result"] = {k: v for k, v in job["result"].items() if k != "timings"}
+    return job
+
+@app.get("/api/jobs/{job_id}/leases")
+def get_job_leases(job_id: str, db: Session = Depends(get_db)):
+    """Per-lease results of a per-lease inspection (geometry excluded)."""
+    rows = (db.query(*LEASE_RESULT_COLUMNS)
+            .filter(LeaseResult.job_id == job_id)
+            .order_by(LeaseResult.illegal_area_m2.desc())
+            .all())
+    return [dict(row._mapping) for row in rows]
+
+@app.get("/api/jobs/{job_id}/pits")
+def get_job_pits(job_id: str, location: str = None, min_area_m2: float = 0.0, after: int = 0,
+                 limit: int = spatial_queries.MAX_RESULTS, db: Session = Depends(get_db)):
+    """Pit inventory of a job (local backend), largest first; pass the last pit_id as `after` for the next page."""
+    try:
+        return spatial_queries.job_pits(db, job_id, location, min_area_m2, after, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/jobs")
+def get_job_queue_stats():
+    """Worker pool occupancy for this API process."""
+    return job_queue.stats()
+
+def _parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value) if value else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value} (expected YYYY-MM-DD)")
 
 @app.get("/api/history")
-def get_history(db: Session = Depends(get_db)):
-    """Fetch past inspections for the Dashboard."""
-    return db.query(Inspection).order_by(Inspection.created_at.desc()).all()
\ No newline at end of file
+def get_history(
+    limit: int = history_queries.HISTORY_PAGE_SIZE, cursor: str = None,
+    start: str = None, end: str = None, state: str = "done", status: str = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Past inspections for the Dashboard, newest first, one page at a time.
+    Pass the returned next_cursor back as `cursor` for the next page.
+    """
+    try:
+        return history_queries.history_page(db, limit, cursor, _parse_date(start), _parse_date(end),
+                                            state, status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/history/summary")
+def get_history_summary(start: str = None, end: str = None, db: Session = Depends(get_db)):
+    """Total illegal area, volume and truckloads (from the per-day aggregate table)."""
+    return history_queries.summary(db, _parse_date(start), _parse_date(end))
+
+# --- SPATIAL QUERIES (PostGIS, GiST-indexed pit geometries) ---
+
+@app.get("/api/inspections/bbox")
+def get_inspections_in_bbox(
+    min_lon: float, min_lat: float, max_lon: float, max_lat: float,
+    kind: str = "illegal", since: str = None, include_geometry: bool = False,
+    limit: int = spatial_queries.MAX_RESULTS, db: Session = Depends(get_db)
+):
+    """Inspections with pits inside a lon/lat bounding box."""
+    try:
+        return spatial_queries.in_bbox(db, min_lon, min_lat, max_lon, max_lat, kind,
+                                       _parse_date(since), include_geometry, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/inspections/intersects")
+def get_inspections_intersecting(
+    geometry: dict = Body(..., embed=True),
+    kind: str = Body("illegal", embed=True),
+    since: str = Body(None, embed=True),
+    include_geometry: bool = Body(False, embed=True),
+    db: Session = Depends(get_db)
+):
+    """Inspections with pits intersecting a GeoJSON geometry, e.g. 'illegal pits in this district since X'."""
+    try:
+        return spatial_queries.intersecting(db, geometry, kind, _parse_date(since), include_geometry)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/inspections/nearest")
+def get_nearest_inspections(
+    lon: float, lat: float, k: int = 10, kind: str = "illegal",
+    since: str = None, include_geometry: bool = False, db: Session = Depends(get_db)
+):
+    """The k inspections with pits nearest to a point (KNN over the spatial index)."""
+    try:
+        return spatial_queries.nearest(db, lon, lat, k, kind, _parse_date(since), include_geometry)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/leases", status_code=201)
+async def register_lease_file(
+    file: UploadFile = File(...),
+    lease_id_field: str = Form(None),
+    holder: str = Form(None)
+):
+    """
+    Adds every feature of a lease file to the lease registry, which later
+    inspections classify detected pits against. Known lease IDs are skipped.
+    """
+    file_path = os.path.join(UPLOAD_DIR, f"lease_{uuid.uuid4().hex[:8]}_{os.path.basename(file.filename)}")
+    try:
+        await run_in_threadpool(save_upload, file.file, file_path)
+        leases = await run_in_threadpool(process_lease_features, file_path, lease_id_field or None)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    finally:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+    if not leases:
+        raise HTTPException(status_code=400, detail="No lease polygons found in file")
+
+    db = SessionLocal()
+    try:
+        counts = await run_in_threadpool(lease_registry.register_leases, db, leases, holder)
+    finally:
+        db.close()
+    registry = await run_in_threadpool(lease_registry.get_registry, SessionLocal, 0)
+    print(f"📚 Registered {counts['added']} leases ({counts['skipped']} already known)")
+    return {**counts, "registry": registry.stats()}
+
+@app.get("/api/leases/registry")
+def get_lease_registry_stats():
+    """Size and freshness of the in-memory lease registry."""
+    return lease_registry.get_registry(SessionLocal).stats()
+
+# --- REGIONAL SWEEPS (no lease: a whole district, cell by cell) ---
+
+def _with_hotspots_url(summary):
+    summary["hotspots_url"] = f"{API_PUBLIC_URL}/{summary.pop('hotspots_file')}"
+    return summary
+
+def _run_sweep_job(region, start_date, end_date, cell_km):
+    registry = lease_registry.get_registry(SessionLocal)
+    summary = sweep.run_sweep(region, start_date, end_date, cell_km, registry=registry)
+    return {"result": _with_hotspots_url(summary)}
+
+@app.post("/api/sweeps", status_code=202)
+def start_sweep(
+    bbox: list = Body(None, embed=True),
+    geometry: dict = Body(None, embed=True),
+    start_date: str = Body("2024-01-01", embed=True),
+    end_date: str = Body("2024-04-30", embed=True),
+    cell_km: float = Body(sweep.SWEEP_CELL_KM, embed=True)
+):
+    """
+    Queues a sweep of a district (bbox or GeoJSON polygon) for mining without a
+    lease. Posting the same sweep again resumes it from its checkpoint.
+    """
+    try:
+        region = sweep.region_geometry(geometry or bbox or [])
+        cells = len(sweep.grid_cells(region, cell_km))
+    except (ValueError, TypeError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid sweep region: {e}")
+    sweep_id = sweep.sweep_id(region, start_date, end_date, DETECTION_BACKEND, cell_km)
+
+    job = sweep_queue.store.get(sweep_id)
+    if not job or job["state"] not in (QUEUED, RUNNING):
+        try:
+            sweep_queue.submit(sweep_id, _run_sweep_job, geometry or bbox, start_date, end_date, cell_km)
+        except JobQueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        print(f"🧾 Queued Sweep: {sweep_id} | {cells} cells")
+    return {
+        "sweep_id": sweep_id,
+        "cells": cells,
+        "state": sweep_queue.store.get(sweep_id)["state"],
+        "status_url": f"{API_PUBLIC_URL}/api/sweeps/{sweep_id}"
+    }
+
+@app.get("/api/sweeps/{sweep_id}")
+def get_sweep(sweep_id: str):
+    """Sweep state and, once it has run, its summary with the top-ranked hotspots."""
+    job = sweep_queue.store.get(sweep_id)
+    if job:
+        return job
+    summary = sweep.load_summary(sweep_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"Unknown sweep: {sweep_id}")
+    # From an earlier API process: only what was written to disk
+    return {"job_id": sweep_id, "state": "done" if summary["complete"] else "incomplete",
+            "result": _with_hotspots_url(summary)}
+
+# --- MONITORING (per-lease change series, one date window at a time) ---
+
+def _run_monitoring_job(lease_key):
+    db = SessionLocal()
+    try:
+        return {"result": monitoring.run_monitoring(db, lease_key)}
+    finally:
+        db.close()
+
+def _queue_monitoring(lease_key):
+    job = monitor_queue.store.get(lease_key)
+    if not job or job["state"] not in (QUEUED, RUNNING):
+        try:
+            monitor_queue.submit(lease_key, _run_monitoring_job, lease_key)
+        except JobQueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e))
+    return {"lease_key": lease_key, "state": monitor_queue.store.get(lease_key)["state"],
+            "status_url": f"{API_PUBLIC_URL}/api/monitoring/{lease_key}"}
+
+@app.post("/api/monitoring", status_code=202)
+async def start_monitoring(
+    file: UploadFile = File(...),
+    name: str = Form(None),
+    since: str = Form("2024-01-01")
+):
+    """
+    Starts monitoring a lease and computes its windows since `since`. Uploading
+    the same lease again only computes the windows that elapsed in between.
+    """
+    file_path = os.path.join(UPLOAD_DIR, f"monitor_{uuid.uuid4().hex[:8]}_{os.path.basename(file.filename)}")
+    try:
+        await run_in_threadpool(save_upload, file.file, file_path)
+        lease_geojson = await run_in_threadpool(process_lease_file, file_path)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    finally:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+    if not lease_geojson:
+        raise HTTPException(status_code=400, detail="No lease polygon found in file")
+
+    db = SessionLocal()
+    try:
+        lease = await run_in_threadpool(monitoring.register_lease, db, lease_geojson,
+                                        name or file.filename, _parse_date(since))
+        lease_key = lease.lease_key
+    finally:
+        db.close()
+    return _queue_monitoring(lease_key)
+
+@app.post("/api/monitoring/{lease_key}/refresh", status_code=202)
+def refresh_monitoring(lease_key: str, db: Session = Depends(get_db)):
+    """Computes the windows of a monitored lease that elapsed since its last run."""
+    if db.get(MonitoredLease, lease_key) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown monitored lease: {lease_key}")
+    return _queue_monitoring(lease_key)
+
+@app.get("/api/monitoring")
+def list_monitored_leases(db: Session = Depends(get_db)):
+    """Monitored leases (without their geometry)."""
+    rows = db.query(MonitoredLease.lease_key, MonitoredLease.name, MonitoredLease.backend,
+                    MonitoredLease.since, MonitoredLease.last_run_at).order_by(MonitoredLease.created_at).all()
+    return [dict(row._mapping) for row in rows]
+
+@app.get("/api/monitoring/{lease_key}")
+def get_monitoring_series(lease_key: str, db: Session = Depends(get_db)):
+    """Change series of a monitored lease: illegal area and volume per window, with deltas."""
+    lease = db.get(MonitoredLease, lease_key)
+    if lease is None:
+        raise HTTPException(status_code=404, detail=f"Unknown monitored lease: {lease_key}")
+    job = monitor_queue.store.get(lease_key)
+    return {
+        "lease_key": lease_key, "name": lease.name, "since": lease.since, "last_run_at": lease.last_run_at,
+        "state": job["state"] if job else None,
+        "series": monitoring.change_series(db, lease_key),
+    }
+
+@app.get("/api/cache/stats")
+def get_cache_stats():
+    """Result cache hit/miss counters for this API process."""
+    return result_cache.get_stats()
+
+@app.get("/api/tiles/stats")
+def get_tile_cache_stats():
+    """Raster tile cache (local backend) hit rate, size and evictions for this API process."""
+    return tile_cache.get_stats()
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus metrics of this API process (text exposition format)."""
+    for name, queue in (("analysis", job_queue), ("sweep", sweep_queue), ("monitoring", monitor_queue)):
+        stats = queue.stats()
+        instrumentation.set_gauge("jobs_in_flight", stats["running"], queue=name)
+        instrumentation.set_gauge("jobs_queued", stats["queued"], queue=name)
+    return Response(content=instrumentation.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/ee/stats")
+def get_ee_scheduler_stats():
+    """Earth Engine calls, retries, throttling and per-call latency histograms for this API process."""
+    return ee_scheduler.get_scheduler().stats()
@@ -0,0 +1,111 @@
+import json
+
+from sqlalchemy import func, or_
+
+import pit_inventory
+from models import Inspection, Pit
+
+# --- CONFIGURATION ---
+MAX_RESULTS = 500
+PIT_KINDS = {
+    "illegal": (Inspection.geometry,),
+    "legal": (Inspection.legal_geometry,),
+    "any": (Inspection.geometry, Inspection.legal_geometry),
+}
+
+# Light projection: no full result JSON, geometry only on request
+SUMMARY_COLUMNS = (Inspection.id, Inspection.job_id, Inspection.filename, Inspection.status,
+                   Inspection.illegal_area_m2, Inspection.volume_m3, Inspection.avg_depth_m,
+                   Inspection.truckloads, Inspection.created_at)
+
+
+def _columns(kind):
+    if kind not in PIT_KINDS:
+        raise ValueError(f"kind must be one of {sorted(PIT_KINDS)}")
+    return PIT_KINDS[kind]
+
+
+def _base_query(db, since=None, include_geometry=False, extra=()):
+    columns = list(SUMMARY_COLUMNS) + list(extra)
+    if include_geometry:
+        columns += [func.ST_AsGeoJSON(Inspection.geometry).label("illegal_geojson"),
+                    func.ST_AsGeoJSON(Inspection.legal_geometry).label("legal_geojson")]
+    query = db.query(*columns).filter(Inspection.state == "done")
+    if since is not None:
+        query = query.filter(Inspection.created_at >= since)
+    return query
+
+
+def _rows(query):
+    rows = []
+    for row in query.all():
+        item = dict(row._mapping)
+        for name in ("illegal_geojson", "legal_geojson"):
+            if name in item:
+                item[name] = json.loads(item[name]) if item[name] else None
+        rows.append(item)
+    return rows
+
+
+def _matches(kind, predicate):
+    """OR of the predicate over the geometry column(s) of `kind` (each hits its GiST index)."""
+    return or_(*(predicate(column) for column in _columns(kind)))
+
+
+def in_bbox(db, min_lon, min_lat, max_lon, max_lat, kind="illegal", since=None,
+            include_geometry=False, limit=MAX_RESULTS):
+    """Inspections whose pits intersect a lon/lat bounding box."""
+    envelope = func.ST_MakeEnvelope(min_lon, min_lat, max_lon, max_lat, 4326)
+    query = (_base_query(db, since, include_geometry)
+             .filter(_matches(kind, lambda column: func.ST_Intersects(column, envelope)))
+             .order_by(Inspection.created_at.desc())
+             .limit(min(limit, MAX_RESULTS)))
+    return _rows(query)
+
+
+def intersecting(db, geojson, kind="illegal", since=None, include_geometry=False, limit=MAX_RESULTS):
+    """Inspections whose pits intersect an arbitrary GeoJSON geometry (e.g. a district)."""
+    area = func.ST_SetSRID(func.ST_GeomFromGeoJSON(json.dumps(geojson)), 4326)
+    query = (_base_query(db, since, include_geometry)
+             .filter(_matches(kind, lambda column: func.ST_Intersects(column, area)))
+             .order_by(Inspection.created_at.desc())
+             .limit(min(limit, MAX_RESULTS)))
+    return _rows(query)
+
+
+def nearest(db, lon, lat, k=10, kind="illegal", since=None, include_geometry=False):
+    """
+    The k inspections with pits closest to a point. Ordering uses the KNN
+    operator (<->) so PostGIS walks the GiST index instead of scanning;
+    distance_m is the exact geodesic distance of each hit. kind="any" orders by
+    the closer of the two pit columns (LEAST skips a NULL column), which the
+    index cannot serve.
+    """
+    columns = _columns(kind)
+    point = func.ST_SetSRID(func.ST_MakePoint(lon, lat), 4326)
+
+    def closest(per_column):
+        values = [per_column(column) for column in columns]
+        return values[0] if len(values) == 1 else func.least(*values)
+
+    distance = closest(lambda column: func.ST_Distance(func.geography(column), func.geography(point)))
+    query = (_base_query(db, since, include_geometry, extra=(distance.label("distance_m"),))
+             .filter(_matches(kind, lambda column: column.isnot(None)))
+             .order_by(closest(lambda column: column.distance_centroid(point)))
+             .limit(min(k, MAX_RESULTS)))
+    return _rows(query)
+
+
+PIT_COLUMNS = [column for column in Pit.__table__.columns if column.name not in ("id", "job_id", "centroid")]
+
+
+def job_pits(db, job_id, location=None, min_area_m2=0.0, after=0, limit=MAX_RESULTS):
+    """One page of a job's pit inventory in pit_id (area) order, with centroid lon/lat."""
+    if location and location not in pit_inventory.LOCATIONS:
+        raise ValueError(f"location must be one of {list(pit_inventory.LOCATIONS)}")
+    query = (db.query(*PIT_COLUMNS, func.ST_X(Pit.centroid).label("lon"), func.ST_Y(Pit.centroid).label("lat"))
+             .filter(Pit.job_id == job_id, Pit.pit_id > after, Pit.area_m2 >= min_area_m2))
+    if location:
+        query = query.filter(Pit.location == location)
+    rows = query.order_by(Pit.pit_id).limit(min(limit, MAX_RESULTS)).all()
+    return [dict(row._mapping) for row in rows]
@@ -0,0 +1,283 @@
+import argparse
+import datetime
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import numpy as np
+import shapely
+import shapely.geometry
+
+import pit_vectors
+import result_cache
+from checkpoints import append_record, load_checkpoint, write_json
+from file_processor import reproject, utm_transformers
+from phase1_detection import DEFAULT_END, DEFAULT_START, DETECTION_BACKEND, DETECTION_BACKENDS
+
+# --- CONFIGURATION ---
+SWEEP_DIR = os.getenv("SWEEP_DIR", "static/sweeps")
+SWEEP_CELL_KM = float(os.getenv("SWEEP_CELL_KM", "5"))
+SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", "2"))        # Cells scanned at once
+SWEEP_MAX_CELLS = int(os.getenv("SWEEP_MAX_CELLS", "10000"))
+SWEEP_TOP_HOTSPOTS = 50
+
+# Each cell is scanned with this much context around it: it covers the focal mean
+# (250 m) and mode (10 m) radii, so a pixel's result does not depend on where the
+# cell edges fall and the cells add up to one district-wide run.
+CELL_CONTEXT_M = 300
+# Pits closer than this (e.g. one pit cut by a cell edge) form one hotspot
+HOTSPOT_JOIN_M = 10
+
+# Files in each sweep's directory
+MANIFEST_FILE = "manifest.json"
+CHECKPOINT_FILE = "cells.jsonl"
+HOTSPOTS_FILE = "hotspots.geojson"
+SUMMARY_FILE = "summary.json"
+
+
+def region_geometry(region):
+    """A [min_lon, min_lat, max_lon, max_lat] bbox or a GeoJSON geometry/Feature, as shapely (EPSG:4326)."""
+    if isinstance(region, (list, tuple)):
+        if len(region) != 4:
+            raise ValueError("bbox must be [min_lon, min_lat, max_lon, max_lat]")
+        geom = shapely.box(*map(float, region))
+    else:
+        geom = shapely.geometry.shape(region.get("geometry", region))
+    if geom.is_empty or geom.area == 0:
+        raise ValueError("Sweep region is empty")
+    return shapely.make_valid(geom)
+
+
+def grid_cells(region, cell_km=SWEEP_CELL_KM):
+    """Square cells of cell_km on the region's UTM grid, clipped to the region (EPSG:4326)."""
+    forward, inverse = utm_transformers(region)
+    local = reproject(region, forward)
+    min_x, min_y, max_x, max_y = local.bounds
+    size = cell_km * 1000
+    cols, rows = math.ceil((max_x - min_x) / size), math.ceil((max_y - min_y) / size)
+    if rows * cols > SWEEP_MAX_CELLS:
+        raise ValueError(f"Sweep needs {rows * cols} cells (max {SWEEP_MAX_CELLS}); use larger cells")
+
+    row, col = np.divmod(np.arange(rows * cols), cols)
+    x0, y0 = min_x + col * size, max_y - (row + 1) * size
+    cells = shapely.intersection(shapely.box(x0, y0, x0 + size, y0 + size), local)
+    keep = shapely.area(cells) > 0
+    cells = reproject(cells[keep], inverse)
+    return [{"cell_id": f"r{r:03d}c{c:03d}", "geometry": geom}
+            for r, c, geom in zip(row[keep], col[keep], cells)]
+
+
+def sweep_id(region, start_date, end_date, backend, cell_km):
+    """Same region, window, thresholds and grid -> same sweep (and the same checkpoint to resume)."""
+    key = result_cache.cache_key(shapely.geometry.mapping(region), start_date, end_date, backend)
+    return hashlib.sha256(f"{key}|{cell_km}".encode()).hexdigest()[:16]
+
+
+# --- CELL SCAN ---
+# The cell plays the part of the lease: pits inside it are the "legal" class of a
+# normal run, pits in the context margin belong to the neighbouring cells.
+
+def scan_cell(cell_id, cell_geojson, start_date, end_date, backend):
+    """Runs the triple lock on one cell; returns its checkpoint record."""
+    started = time.perf_counter()
+    if backend == "local":
+        from local_detection import compute_local_metrics
+
+        stats = compute_local_metrics(cell_geojson, workers=1, vectorize=True, search_buffer_m=CELL_CONTEXT_M,
+                                      start_date=start_date, end_date=end_date)
+        pits = stats["vectors"]["legal"]
+    else:
+        stats, pits = _scan_cell_ee(cell_geojson, start_date, end_date)
+    return {
+        "cell_id": cell_id,
+        "mining_area_m2": round(stats["legal_area_m2"], 2),
+        "volume_m3": round(stats["legal_vol_m3"], 2),
+        "pits": json.loads(shapely.to_geojson(pits)) if pits is not None else None,
+        "elapsed_s": round(time.perf_counter() - started, 3),
+    }
+
+
+def _scan_cell_ee(cell_geojson, start_date, end_date):
+    from metrics_engine import compute_metrics
+    from phase1_detection import _ensure_earth_engine, build_detection_layers
+
+    _ensure_earth_engine()
+    layers = build_detection_layers(cell_geojson, start_date, end_date, search_buffer_m=CELL_CONTEXT_M)
+    stats = compute_metrics(layers["status_band"], layers["raw_depth"], layers["smooth_surface"],
+                            layers["search_zone"], vectorize=True)
+    return stats, pit_vectors.from_feature_collection(stats["vectors"])["legal"]
+
+
+# --- HOTSPOTS ---
+
+def merge_hotspots(records, region, registry=None):
+    """
+    Joins the pits of all cells into hotspots (pits within HOTSPOT_JOIN_M of each
+    other, which re-joins pits cut by cell edges), ranked by area. With a
+    lease_registry.LeaseRegistry, each hotspot is also classified as
+    other_licensed or unlicensed.
+    """
+    pits, cells = [], []
+    for record in records:
+        if record.get("pits"):
+            parts = shapely.get_parts(shapely.geometry.shape(record["pits"]))
+            pits.extend(parts)
+            cells.extend([record["cell_id"]] * len(parts))
+    if not pits:
+        return []
+
+    forward, inverse = utm_transformers(region)
+    local = reproject(np.asarray(pits, dtype=object), forward)
+    cells = np.asarray(cells, dtype=object)
+    blobs = shapely.get_parts(shapely.union_all(shapely.buffer(local, HOTSPOT_JOIN_M / 2)))
+    blob_idx, pit_idx = shapely.STRtree(local).query(blobs, predicate="intersects")
+
+    counts = np.bincount(blob_idx, minlength=len(blobs))
+    groups = np.split(pit_idx[np.argsort(blob_idx, kind="stable")], np.cumsum(counts)[:-1])
+    shapes_m = np.array([shapely.union_all(local[group]) for group in groups], dtype=object)
+    shapes = reproject(shapes_m, inverse)
+    areas = shapely.area(shapes_m)
+    centroids = shapely.centroid(shapes)
+
+    hotspots = [{
+        "area_m2": round(float(area), 2),
+        "centroid": [round(point.x, 6), round(point.y, 6)],
+        "pits": len(group),
+        "cells": sorted(set(cells[group])),
+        "geometry": geom,
+    } for area, point, group, geom in zip(areas, centroids, groups, shapes)]
+
+    if registry is not None and len(registry):
+        classes, fractions, matched = registry.classify(shapes)
+        for hotspot, name, fraction, lease_id in zip(hotspots, classes, fractions[:, 1], matched):
+            hotspot.update(legality=name, licensed_fraction=round(float(fraction), 4), lease_id=lease_id)
+
+    # Largest first; ties in a stable geographic order so reruns rank the same way
+    hotspots.sort(key=lambda h: (-h["area_m2"], round(h["centroid"][0], 5), round(h["centroid"][1], 5)))
+    for rank, hotspot in enumerate(hotspots, 1):
+        hotspot["rank"] = rank
+    return hotspots
+
+
+def hotspots_to_geojson(hotspots):
+    return {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "geometry": json.loads(shapely.to_geojson(h["geometry"])),
+         "properties": {k: v for k, v in h.items() if k != "geometry"}}
+        for h in hotspots
+    ]}
+
+
+# --- SWEEP ---
+
+def run_sweep(region, start_date=DEFAULT_START, end_date=DEFAULT_END, cell_km=SWEEP_CELL_KM,
+              backend=None, workers=SWEEP_WORKERS, out_dir=SWEEP_DIR, registry=None,
+              progress=None, limit=None):
+    """
+    Scans a whole region (no lease needed) cell by cell, at most `workers` cells at
+    a time. Every finished cell is appended to the sweep's checkpoint, so running
+    the same sweep again resumes where it stopped; `limit` caps the cells scanned
+    in this run. Writes the ranked hotspots and a summary, and returns the summary.
+    """
+    backend = backend or DETECTION_BACKEND
+    if backend not in DETECTION_BACKENDS:
+        raise ValueError(f"Unknown detection backend '{backend}'")
+    region = region_geometry(region)
+    sid = sweep_id(region, start_date, end_date, backend, cell_km)
+    sweep_dir = os.path.join(out_dir, sid)
+    os.makedirs(sweep_dir, exist_ok=True)
+
+    cells = grid_cells(region, cell_km)
+    write_json(os.path.join(sweep_dir, MANIFEST_FILE), {
+        "sweep_id": sid, "region": shapely.geometry.mapping(region), "cell_km": cell_km,
+        "start_date": start_date, "end_date": end_date, "backend": backend, "cells": len(cells),
+    })
+    checkpoint = os.path.join(sweep_dir, CHECKPOINT_FILE)
+    done = load_checkpoint(checkpoint, key="cell_id")
+    todo = [cell for cell in cells if cell["cell_id"] not in done][:limit]
+    print(f"🗺️ Sweep {sid}: {len(cells)} cells of {cell_km:g} km, {len(done)} already done, "
+          f"{len(todo)} to scan on {workers} workers ({backend})")
+
+    # Local cells are CPU-bound (processes); Earth Engine cells wait on the network (threads)
+    executor = ProcessPoolExecutor if backend == "local" else ThreadPoolExecutor
+    started = time.perf_counter()
+    failed = {}
+    with open(checkpoint, "a") as f, executor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(scan_cell, cell["cell_id"], shapely.geometry.mapping(cell["geometry"]),
+                        start_date, end_date, backend): cell["cell_id"]
+            for cell in todo
+        }
+        for scanned, future in enumerate(as_completed(futures), 1):
+            cell_id = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                failed[cell_id] = str(e)
+                print(f"⚠️ Cell {cell_id} failed (will be retried on resume): {e}")
+                continue
+            append_record(f, record)
+            done[cell_id] = record
+            rate = scanned / (time.perf_counter() - started) * 60
+            print(f"🧭 {len(done)}/{len(cells)} cells | {cell_id}: {record['mining_area_m2']:.0f} m² "
+                  f"| {rate:.1f} cells/min")
+            if progress:
+                progress.stage("sweep_cell", cell_id=cell_id, done=len(done), total=len(cells),
+                               cells_per_minute=round(rate, 2))
+
+    elapsed = time.perf_counter() - started
+    hotspots = merge_hotspots(done.values(), region, registry)
+    write_json(os.path.join(sweep_dir, HOTSPOTS_FILE), hotspots_to_geojson(hotspots))
+    summary = {
+        "sweep_id": sid,
+        "complete": len(done) == len(cells),
+        "cells": len(cells),
+        "cells_done": len(done),
+        "cells_failed": failed,
+        "cells_scanned": len(todo) - len(failed),
+        "elapsed_s": round(elapsed, 2),
+        "cells_per_minute": round((len(todo) - len(failed)) / elapsed * 60, 2) if elapsed > 0 else None,
+        "mining_area_m2": round(sum(r["mining_area_m2"] for r in done.values()), 2),
+        "volume_m3": round(sum(r["volume_m3"] for r in done.values()), 2),
+        "hotspots": len(hotspots),
+        "top_hotspots": [{k: v for k, v in h.items() if k != "geometry"} for h in hotspots[:SWEEP_TOP_HOTSPOTS]],
+        "hotspots_file": os.path.join(sweep_dir, HOTSPOTS_FILE),
+        "finished_at": datetime.datetime.utcnow().isoformat() + "Z",
+    }
+    write_json(os.path.join(sweep_dir, SUMMARY_FILE), summary)
+    print(f"✅ Sweep {sid}: {len(done)}/{len(cells)} cells, {len(hotspots)} hotspots, "
+          f"{summary['cells_per_minute']} cells/min")
+    return summary
+
+
+def load_summary(sid, out_dir=SWEEP_DIR):
+    """The last written summary of a sweep, or None."""
+    path = os.path.join(out_dir, os.path.basename(sid), SUMMARY_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan a district for mining, cell by cell (resumable).")
+    parser.add_argument("--bbox", type=float, nargs=4, metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"))
+    parser.add_argument("--region", help="GeoJSON file with the district polygon")
+    parser.add_argument("--cell-km", type=float, default=SWEEP_CELL_KM)
+    parser.add_argument("--start", default=DEFAULT_START)
+    parser.add_argument("--end", default=DEFAULT_END)
+    parser.add_argument("--backend", choices=DETECTION_BACKENDS, default=DETECTION_BACKEND)
+    parser.add_argument("--workers", type=int, default=SWEEP_WORKERS)
+    parser.add_argument("--limit", type=int, help="scan at most this many cells in this run")
+    args = parser.parse_args()
+    if args.region:
+        with open(args.region) as f:
+            region = json.load(f)
+        region = region["features"][0] if region.get("type") == "FeatureCollection" else region
+    elif args.bbox:
+        region = args.bbox
+    else:
+        parser.error("one of --bbox or --region is required")
+    run_sweep(region, args.start, args.end, args.cell_km, args.backend, args.workers, limit=args.limit)
@@ -0,0 +1,58 @@
+import pytest
+
+from benchmarks import fake_ee
+
+
+@pytest.fixture
+def ee():
+    import metrics_engine
+
+    ee, _ = fake_ee.install(fake_ee.FakeEarthEngine())
+    metrics_engine.ee = ee
+    return ee
+
+
+def ancestor(node, op):
+    while node is not None and node._op != op:
+        node = node._parent
+    assert node is not None, f"no {op} in the graph"
+    return node
+
+
+def projection(node):
+    """(crs, scale) of an ee.Projection(crs).atScale(scale) node."""
+    assert node._op == "atScale" and node._parent._op == "Projection"
+    return node._parent._args[0], node._args[0]
+
+
+def test_refine_mask_reduces_native_pixels_onto_the_coarse_grid(ee):
+    import metrics_engine
+
+    status = ee.Image("status")
+    _, near = metrics_engine.build_coarse_reduction(status, ee.Image("dem"), ee.Image("surface"),
+                                                    ee.Geometry.Polygon([]))
+
+    reduced = ancestor(near, "reduceResolution")
+    default = ancestor(reduced, "setDefaultProjection")
+    assert projection(default._args[0]) == ("EPSG:4326", metrics_engine.METRICS_SCALE)
+
+    # The max over each cell is taken onto the coarse grid, not the mosaic's 1° default
+    reprojected = near._parent
+    while reprojected._parent is not reduced:
+        reprojected = reprojected._parent
+    assert reprojected._op == "reproject"
+    assert projection(reprojected._args[0]) == ("EPSG:4326", metrics_engine.COARSE_SCALE)
+    assert ancestor(near, "focalMax")._parent is reprojected
+
+
+def test_submitted_calls_are_counted_and_timed_for_the_job():
+    import instrumentation
+    import metrics_engine
+
+    counter = metrics_engine.RemoteCallCounter()
+    with instrumentation.job_timings() as job:
+        future = metrics_engine.submit(lambda vis: {"mapid": vis}, "rgb", counter=counter, label="map_id")
+        assert future.result() == {"mapid": "rgb"}
+
+    assert counter.count == 1
+    assert job.timings["ee_fetch_seconds"]["map_id"]["count"] == 1
@@ -0,0 +1,37 @@
+from fastapi.testclient import TestClient
+
+import upload_limits
+
+
+def test_oversized_upload_is_refused_with_cors_headers():
+    import server
+
+    client = TestClient(server.app)
+    body = b"x" * (upload_limits.MAX_UPLOAD_BYTES + 1)
+    response = client.post("/api/analyze", content=body, headers={"Origin": "http://localhost:5173"})
+
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"] in ("*", "http://localhost:5173")
+
+
+def test_every_upload_route_is_capped():
+    import server
+
+    client = TestClient(server.app)
+    headers = {"Content-Length": str(upload_limits.MAX_UPLOAD_BYTES + 1)}
+    for path in ("/api/analyze", "/api/analyze/stream", "/api/leases", "/api/monitoring"):
+        assert client.post(path, content=b"", headers=headers).status_code == 413, path
+
+
+def test_save_upload_records_the_size(tmp_path):
+    import io
+
+    import instrumentation
+
+    def count():
+        histogram = instrumentation._histograms.get(instrumentation._key("upload_size_bytes", {}))
+        return histogram.count if histogram else 0
+
+    before = count()
+    assert upload_limits.save_upload(io.BytesIO(b"x" * 1000), str(tmp_path / "lease.geojson")) == 1000
+    assert count() == before + 1
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# --- CONFIGURATION ---
+# Persistent cache of local-backend input tiles; empty disables it
+TILE_CACHE_DIR = os.getenv("TILE_CACHE_DIR", "")
+TILE_CACHE_MB = float(os.getenv("TILE_CACHE_MB", "4096"))
+TILE_PX = int(os.getenv("TILE_PX", "512"))      # Tiles are TILE_PX squares of the reference (UTM) grid
+# Tiles used this recently are never evicted (they may be memory-mapped by a running job)
+TILE_GRACE_S = 600
+
+# Products: bands stacked in each tile's .npy
+DEPTH_BANDS = ("smooth", "depth")
+COMPOSITE_BANDS = ("B4", "B8", "B11")
+
+_lock = threading.Lock()
+_index = None       # OrderedDict path -> bytes, least recently used first
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+
+def enabled():
+    return bool(TILE_CACHE_DIR)
+
+
+def _file_identity(path):
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def grid_key(scene):
+    """The reference grid: CRS, transform and size of the scene's B8 raster."""
+    return [scene.crs.to_wkt(), list(scene.transform)[:6], scene.width, scene.height]
+
+
+def product_key(name, **params):
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{name}/{digest[:16]}"
+
+
+# --- LRU INDEX (shared by every product, persisted through file mtimes) ---
+
+def _load_index():
+    global _index
+    if _index is None:
+        entries = []
+        for root, _, files in os.walk(TILE_CACHE_DIR):
+            for name in files:
+                if name.endswith(".npy"):
+                    stat = os.stat(os.path.join(root, name))
+                    entries.append((stat.st_mtime, os.path.join(root, name), stat.st_size))
+        _index = OrderedDict((path, size) for _, path, size in sorted(entries))
+    return _index
+
+
+def _touch(path):
+    with _lock:
+        index = _load_index()
+        if path in index:
+            index.move_to_end(path)
+    os.utime(path)
+
+
+def _add(path, size, keep):
+    with _lock:
+        index = _load_index()
+        index[path] = size
+        index.move_to_end(path)
+        _evict(index, keep)
+
+
+def _evict(index, keep=()):
+    """Drops least recently used tiles down to the budget, except `keep` (the running scene's)."""
+    budget = TILE_CACHE_MB * 1024 * 1024
+    total = sum(index.values())
+    now = time.time()
+    for path in list(index):
+        if total <= budget:
+            break
+        if path in keep:
+            continue
+        try:
+            if now - os.stat(path).st_mtime < TILE_GRACE_S:
+                break           # Everything from here on is in use or newer
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= index.pop(path)
+        _stats["evictions"] += 1
+
+
+def get_stats():
+    with _lock:
+        index = _load_index() if enabled() else {}
+        stats = dict(_stats, tiles=len(index), size_mb=round(sum(index.values()) / 1024 / 1024, 1),
+                     budget_mb=TILE_CACHE_MB, enabled=enabled())
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return stats
+
+
+# --- TILE MOSAICS ---
+
+class TileMosaic:
+    """
+    Windowed reads across one product's tiles, memory-mapped (only the pixels
+    read are paged in). Pickles as paths, so pool workers map the files themselves.
+    """
+
+    def __init__(self, key, bands, tile_px, paths):
+        self.key, self.bands, self.tile_px = key, bands, tile_px
+        self.paths = paths          # (tile row, tile col) -> .npy path
+        self._tiles = {}
+
+    def __getstate__(self):
+        return {"key": self.key, "bands": self.bands, "tile_px": self.tile_px, "paths": self.paths}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _tile(self, index):
+        tile = self._tiles.get(index)
+        if tile is None:
+            tile = self._tiles[index] = np.load(self.paths[index], mmap_mode="r")
+        return tile
+
+    def read(self, band, row_off, col_off, height, width):
+        """Scene-pixel window of one band; NaN where no tile covers it (off the raster)."""
+        out = np.full((height, width), np.nan, dtype=np.float64)
+        k, t = self.bands.index(band), self.tile_px
+        for ti in range(max(row_off // t, 0), (row_off + height - 1) // t + 1):
+            for tj in range(max(col_off // t, 0), (col_off + width - 1) // t + 1):
+                if (ti, tj) not in self.paths:
+                    continue
+                tile = self._tile((ti, tj))
+                r0, c0 = max(row_off, ti * t), max(col_off, tj * t)
+                r1, c1 = min(row_off + height, ti * t + tile.shape[1]), min(col_off + width, tj * t + tile.shape[2])
+                if r1 > r0 and c1 > c0:
+                    out[r0 - row_off:r1 - row_off, c0 - col_off:c1 - col_off] = \
+                        tile[k, r0 - ti * t:r1 - ti * t, c0 - tj * t:c1 - tj * t]
+        return out
+
+    def crop(self, row_off, col_off, height, width):
+        """(smooth, depth) like local_detection.DepthLayer.crop()."""
+        return tuple(self.read(band, row_off, col_off, height, width) for band in DEPTH_BANDS)
+
+
+def _tile_path(key, index):
+    return os.path.join(TILE_CACHE_DIR, key, f"{index[0]}_{index[1]}.npy")
+
+
+def _ensure_tiles(key, bands, tiles, compute, keep):
+    """Paths of every tile, computing (and caching) the missing ones."""
+    paths = {}
+    for index in tiles:
+        path = _tile_path(key, index)
+        if os.path.exists(path):
+            with _lock:
+                _stats["hits"] += 1
+            _touch(path)
+        else:
+            with _lock:
+                _stats["misses"] += 1
+            data = np.stack(compute(*index))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, data)
+            os.replace(tmp, path)
+            with _lock:
+                _stats["writes"] += 1
+            _add(path, data.nbytes, keep)
+        paths[index] = path
+    return TileMosaic(key, bands, TILE_PX, paths)
+
+
+def scene_tiles(scene, paths, start_date=None, end_date=None):
+    """
+    Depth and composite mosaics covering the scene's search window (plus halo),
+    built from cached tiles; missing tiles are computed from the rasters first.
+    Cached depth is smoothed over the whole DEM, not a DEM clipped to one lease's
+    search zone (tiles are shared by every lease), so it only differs from an
+    uncached run within one smoothing radius of the search-zone edge.
+    """
+    import focal_kernels
+    from local_detection import DEM_QUANTUM, SMOOTH_KERNEL_BANDS, SMOOTH_RADIUS_M
+    from phase1_detection import CLOUD_THRESHOLD, DEM_SOURCE
+
+    w, h, t = scene.window, scene.halo, TILE_PX
+    row0, col0 = max(int(w.row_off) - h, 0), max(int(w.col_off) - h, 0)
+    row1 = min(int(w.row_off + w.height) + h, scene.height)
+    col1 = min(int(w.col_off + w.width) + h, scene.width)
+    tiles = [(ti, tj) for ti in range(row0 // t, (row1 - 1) // t + 1)
+             for tj in range(col0 // t, (col1 - 1) // t + 1)] if row1 > row0 and col1 > col0 else []
+
+    def tile_window(ti, tj):
+        return ti * t, tj * t, min(t, scene.height - ti * t), min(t, scene.width - tj * t)
+
+    def compute_depth(ti, tj):
+        r, c, height, width = tile_window(ti, tj)
+        pad = scene.smooth_radius_px
+        dem = scene.read("DEM", r - pad, c - pad, height + 2 * pad, width + 2 * pad)
+        smooth = focal_kernels.circular_mean(dem, pad, valid=np.isfinite(dem),
+                                             bands=SMOOTH_KERNEL_BANDS, quantum=DEM_QUANTUM)
+        core = (slice(pad, pad + height), slice(pad, pad + width))
+        return smooth[core], (smooth - dem)[core]
+
+    def compute_composite(ti, tj):
+        return [scene.read(band, *tile_window(ti, tj)).astype(np.float32) for band in COMPOSITE_BANDS]
+
+    grid = grid_key(scene)
+    depth_key = product_key("depth", dem_source=DEM_SOURCE, dem=_file_identity(paths["DEM"]),
+                            radius_m=SMOOTH_RADIUS_M, kernel_bands=SMOOTH_KERNEL_BANDS,
+                            quantum=DEM_QUANTUM, grid=grid, tile_px=t)
+    composite_key = product_key("s2", window=[start_date, end_date], cloud_threshold=CLOUD_THRESHOLD,
+                                bands=[_file_identity(paths[b]) for b in COMPOSITE_BANDS], grid=grid, tile_px=t)
+    keep = {_tile_path(key, index) for key in (depth_key, composite_key) for index in tiles}
+    return {
+        "depth": _ensure_tiles(depth_key, DEPTH_BANDS, tiles, compute_depth, keep),
+        "composite": _ensure_tiles(composite_key, COMPOSITE_BANDS, tiles, compute_composite, keep),
+    }
@@ -0,0 +1,93 @@
+import json
+import os
+
+import instrumentation
+
+# --- CONFIGURATION ---
+MAX_UPLOAD_MB = float(os.getenv("MAX_UPLOAD_MB", "50"))
+MAX_UPLOAD_BYTES = int(MAX_UPLOAD_MB * 1024 * 1024)
+UPLOAD_CHUNK_BYTES = 1 << 20
+# POST routes taking a lease file upload
+UPLOAD_PATHS = ("/api/analyze", "/api/leases", "/api/monitoring")
+
+
+class UploadTooLarge(Exception):
+    """The request body went over MAX_UPLOAD_BYTES."""
+
+
+class UploadSizeLimit:
+    """
+    ASGI middleware capping upload bodies while they stream in. A declared
+    Content-Length over the cap is refused before anything is read; chunked
+    bodies are counted chunk by chunk and cut off as soon as they pass it,
+    so an oversized file is never spooled to disk by the form parser.
+    """
+
+    def __init__(self, app, max_bytes=MAX_UPLOAD_BYTES, path_prefixes=UPLOAD_PATHS):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_prefixes = tuple(path_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] != "POST"
+                or not scope["path"].startswith(self.path_prefixes)):
+            return await self.app(scope, receive, send)
+
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared and declared.isdigit() and int(declared) > self.max_bytes:
+            return await self._reject(send)
+
+        received = 0
+        exceeded = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise UploadTooLarge(f"Upload exceeds {self.max_bytes} bytes")
+            return message
+
+        async def guarded_send(message):
+            # Whatever the app makes of the aborted body (usually a 400), we answer 413
+            if not exceeded:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadTooLarge:
+            pass
+        if exceeded:
+            await self._reject(send)
+
+    async def _reject(self, send):
+        limit_mb = self.max_bytes / (1024 * 1024)
+        body = json.dumps({"detail": f"Upload exceeds the {limit_mb:g} MB limit"}).encode()
+        await send({"type": "http.response.start", "status": 413,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode()),
+                                (b"connection", b"close")]})
+        await send({"type": "http.response.body", "body": body})
+
+
+def save_upload(source, file_path, max_bytes=MAX_UPLOAD_BYTES):
+    """
+    Copies an upload to `file_path` in chunks; UploadTooLarge (and no file) past
+    the cap. Every saved upload is recorded in upload_size_bytes.
+    """
+    written = 0
+    try:
+        with open(file_path, "wb") as buffer:
+            for chunk in iter(lambda: source.read(UPLOAD_CHUNK_BYTES), b""):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {MAX_UPLOAD_MB:g} MB")
+                buffer.write(chunk)
+    except Exception:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    instrumentation.observe("upload_size_bytes", written)
+    return written
@@ -1,12 +1,15 @@
 import { useState, useEffect } from 'react';
 import { Upload, FileText, Map as MapIcon, Box, Activity, CheckCircle, AlertTriangle, Layers, FileOutput, Globe } from 'lucide-react';
-import { uploadFile, fetchHistory } from './api';
+import { analyzeStream, fetchHistory, fetchHistorySummary, fetchJob } from './api';
 
 function App() {
   const [file, setFile] = useState(null);
   const [loading, setLoading] = useState(false);
   const [report, setReport] = useState(null);
   const [history, setHistory] = useState([]);
+  const [historyCursor, setHistoryCursor] = useState(null);
+  const [summary, setSummary] = useState(null);
+  const [stage, setStage] = useState(null);
   
   // DATE PICKER STATE
   const [startDate, setStartDate] = useState("2024-01-01");
@@ -21,11 +24,21 @@ function App() {
 
   const loadHistory = async () => {
     try {
-      const data = await fetchHistory();
-      // Automatically select the most recent report if available
-      if (data && data.length > 0) {
-        setHistory(data);
-      }
+      const [page, totals] = await Promise.all([fetchHistory(), fetchHistorySummary()]);
+      setHistory(page.items);
+      setHistoryCursor(page.next_cursor);
+      setSummary(totals);
+    } catch (error) {
+      console.error("Failed to load history", error);
+    }
+  };
+
+  const loadMoreHistory = async () => {
+    if (!historyCursor) return;
+    try {
+      const page = await fetchHistory(historyCursor);
+      setHistory((items) => [...items, ...page.items]);
+      setHistoryCursor(page.next_cursor);
     } catch (error) {
       console.error("Failed to load history", error);
     }
@@ -39,22 +52,39 @@ function App() {
     if (!file) return;
     setLoading(true);
     setReport(null);
+    setStage(null);
     
     try {
-      // Pass dates to upload function
-      const result = await uploadFile(file, startDate, endDate);
+      // Stream the pipeline: show metrics as soon as they are computed
+      const result = await analyzeStream(file, startDate, endDate, (event) => {
+        setStage(event.stage);
+        if (event.stage === "metrics") {
+          setReport({ status: "running", job_id: null, metrics: event.metrics, urls: {} });
+        }
+      });
       setReport(result);
       loadHistory(); 
     } catch (error) {
       alert("Analysis Failed: " + error.message);
     } finally {
       setLoading(false);
+      setStage(null);
     }
   };
 
   // Allow clicking a history item to load it into the main view
-  const loadFromHistory = (item) => {
-    // Reconstruct the report object from the history item
+  const loadFromHistory = async (item) => {
+    // The history list is a light projection; the full result (URLs included) lives on the job
+    try {
+      const job = await fetchJob(item.job_id);
+      if (job.result) {
+        setReport(job.result);
+        return;
+      }
+    } catch (error) {
+      console.error("Failed to load job", error);
+    }
+    // Older rows without a stored result: show the metrics we have
     setReport({
       status: "success", // History items are always completed
       job_id: item.job_id,
@@ -64,11 +94,7 @@ function App() {
         avg_depth_m: item.avg_depth_m,
         truckloads: item.truckloads
       },
-      urls: {
-        report: item.report_url,
-        map: item.map_url,
-        '3d_model': item.model_url
-      }
+      urls: {}
     });
   };
 
@@ -145,7 +171,7 @@ function App() {
             >
               {loading ? (
                 <span className="flex items-center justify-center gap-2">
-                  <div className="w-4 h-4 border-2 border-white/30 border-t-white rounded-full animate-spin"/> Processing...
+                  <div className="w-4 h-4 border-2 border-white/30 border-t-white rounded-full animate-spin"/> {stage ? `Processing (${stage.replace('_', ' ')})...` : "Processing..."}
                 </span>
               ) : "RUN DETECTION"}
             </button>
@@ -156,6 +182,13 @@ function App() {
             <h3 className="text-sm font-bold text-slate-300 mb-3 flex items-center gap-2 uppercase tracking-wide">
               <Layers size={16} className="text-purple-400"/> Inspection Log
             </h3>
+            {summary && (
+              <div className="text-[10px] text-slate-400 mb-3 flex justify-between">
+                <span>{summary.inspections.toLocaleString()} scans</span>
+                <span>{Math.round(summary.illegal_area_m2).toLocaleString()} m² illegal</span>
+                <span>{summary.truckloads.toLocaleString()} trucks</span>
+              </div>
+            )}
             <div className="overflow-y-auto pr-2 space-y-2 flex-1 custom-scrollbar">
               {history.map((item) => (
                 <div 
@@ -183,6 +216,14 @@ function App() {
                   </div>
                 </div>
               ))}
+              {historyCursor && (
+                <button
+                  onClick={loadMoreHistory}
+                  className="w-full py-2 text-[10px] text-slate-400 hover:text-slate-200 border border-slate-700 rounded-lg"
+                >
+                  Load more
+                </button>
+              )}
             </div>
           </div>
         </div>
@@ -2,21 +2,51 @@ import axios from 'axios';
 
 const API_URL = "http://localhost:8000";
 
-// --- Function 1: Upload File ---
-export const uploadFile = async (file, startDate, endDate) => {
+// --- Function 1: Get a Job (state and, once done, its result) ---
+export const fetchJob = async (jobId) => {
+    const response = await axios.get(`${API_URL}/api/jobs/${jobId}`);
+    return response.data;
+};
+
+// --- Function 2: Streaming Analysis (NDJSON, one event per pipeline stage) ---
+export const analyzeStream = async (file, startDate, endDate, onEvent) => {
     const formData = new FormData();
     formData.append("file", file);
     formData.append("start_date", startDate);
     formData.append("end_date", endDate);
 
-    const response = await axios.post(`${API_URL}/api/analyze`, formData, {
-        headers: { "Content-Type": "multipart/form-data" }
-    });
+    const response = await fetch(`${API_URL}/api/analyze/stream`, { method: "POST", body: formData });
+    if (!response.ok) throw new Error(`Request failed with status ${response.status}`);
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let last = null;
+    for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split("\n");
+        buffer = lines.pop();
+        for (const line of lines) {
+            if (!line.trim()) continue;
+            last = JSON.parse(line);
+            onEvent(last);
+        }
+    }
+    if (!last || last.stage === "failed") throw new Error(last?.error || "Analysis failed");
+    return last.result;
+};
+
+// --- Function 3: Get History (one page; pass next_cursor back for the next) ---
+export const fetchHistory = async (cursor = null, limit = 50) => {
+    const params = { limit };
+    if (cursor) params.cursor = cursor;
+    const response = await axios.get(`${API_URL}/api/history`, { params });
     return response.data;
 };
 
-// --- Function 2: Get History ---
-export const fetchHistory = async () => {
-    const response = await axios.get(`${API_URL}/api/history`);
+export const fetchHistorySummary = async () => {
+    const response = await axios.get(`${API_URL}/api/history/summary`);
     return response.data;
 };
\ No newline at end of file